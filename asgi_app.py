@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Asyncio (ASGI) variant of the web_app endpoints.
+
+Searches run on a bounded thread pool so the event loop stays free, and
+concurrent identical searches share one computation. When too many
+distinct searches are waiting, new ones are refused with 503 instead of
+queueing without bound. Run with an ASGI server, e.g.:
+
+    python asgi_app.py --file inventory.xls      (uses uvicorn)
+    INVENTORY_FILE=inventory.xls uvicorn asgi_app:app
+
+An ASGI server importing app loads the workbook at lifespan startup, as
+configured by the INVENTORY_* environment variables (see ENVIRONMENT).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs
+
+from inventory_manager import InventoryManager
+from inventory_watcher import InventoryWatcher
+from query_cache import QueryCache, CachedInventory
+from metrics import Metrics, InstrumentedInventory
+from web_app import (HTML_TEMPLATE, EXPORT_FORMATS, search_inventory, inventory_status, page_size,
+                     parse_skus, sku_lines, export_request, export_body)
+
+# Global inventory manager; replaced as a whole by the watcher on reload
+inventory = None
+watcher = None
+
+# Memoized search results, shared by the inventories that replace each other
+query_cache = QueryCache()
+
+# Request and search latencies, exposed on /metrics
+metrics = Metrics()
+
+DEFAULT_FILE = "/Users/yujunchen/Documents/Copy of Copy of LBP Updated Inventory Management With Cost-4.xls"
+
+# Settings of the module-level app when an ASGI server imports it: {variable: description}
+ENVIRONMENT = {
+    'INVENTORY_FILE': 'Excel file path',
+    'INVENTORY_NO_CACHE': 'Set to 1 to parse the workbook even if a snapshot is cached',
+    'INVENTORY_COMPACT': 'Set to 1 to keep a single compact copy of the data',
+    'INVENTORY_WATCH_INTERVAL': 'Seconds between checks for a changed workbook (0 disables reloading)',
+}
+
+
+class Overloaded(Exception):
+    """Raised when a search is shed instead of being run."""
+
+
+class StreamAborted(Exception):
+    """Raised when a streamed body fails after its response started.
+
+    No error response can follow the status line that was sent, so the
+    exception goes on to the server, which drops the connection: the
+    client sees a truncated body rather than a complete-looking one.
+    """
+
+
+def _json_body(payload) -> bytes:
+    # Same encoding as Flask's jsonify
+    return (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class InventoryASGIApp:
+    """ASGI application serving the web_app routes.
+
+    get_inventory returns the InventoryManager to use for a request;
+    startup, if given, is run on a thread at lifespan startup, before any
+    request, e.g. to load it.
+    Searches run on a pool of threads; identical searches (same data
+    version, parameters and page, ignoring case) arriving while one is running
+    wait for its result instead of running again. At most max_pending
+    distinct searches may be queued or running, and a search that waited
+    longer than max_queue_wait seconds for a thread is dropped, so under
+    a burst latency stays bounded and the excess gets 503 responses.
+    Request latencies and errors are recorded in metrics and served on
+    /metrics.
+    """
+
+    ROUTES = ('/', '/api/summary', '/api/brands', '/api/suggest', '/api/search', '/api/skus', '/api/export',
+              '/api/status', '/metrics')
+
+    def __init__(self, get_inventory: Callable[[], InventoryManager],
+                 get_watcher: Callable[[], Optional[InventoryWatcher]] = lambda: None,
+                 threads: int = 4, max_pending: int = 64, max_queue_wait: float = 2.0,
+                 metrics: Optional[Metrics] = None, startup: Optional[Callable[[], None]] = None):
+        self.get_inventory = get_inventory
+        self.get_watcher = get_watcher
+        self.startup = startup
+        self.metrics = metrics or Metrics()
+        self.threads = threads
+        self.max_pending = max_pending
+        self.max_queue_wait = max_queue_wait
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='search')
+        self.page = HTML_TEMPLATE.encode('utf-8')
+        # {search key: future of the encoded response body}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.stats = {'computed': 0, 'coalesced': 0, 'shed': 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        route = scope['path'] if scope['path'] in self.ROUTES else 'unmatched'
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_recording(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self._dispatch(scope, receive, send_recording, route)
+        finally:
+            # Unlike the Flask app, streamed bodies are timed until fully sent
+            self.metrics.observe_request(route, status[0], time.perf_counter() - started)
+
+    async def _dispatch(self, scope, receive, send, route: str):
+        path = scope['path']
+        params = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            if path == '/':
+                await self._respond(send, 200, self.page, 'text/html; charset=utf-8')
+            elif path == '/api/summary':
+                await self._respond(send, 200, _json_body(self.get_inventory().get_inventory_summary()))
+            elif path == '/api/brands':
+                await self._respond(send, 200, _json_body(self.get_inventory().get_all_brands()))
+            elif path == '/api/suggest':
+                # Answered inline: a lookup takes well under a millisecond
+                try:
+                    limit = int(params.get('limit', [''])[0] or 8)
+                except ValueError as e:
+                    await self._error(send, route, e, 400)
+                else:
+                    suggestions = self.get_inventory().suggest(params.get('prefix', [''])[0], limit)
+                    await self._respond(send, 200, _json_body(suggestions))
+            elif path == '/api/search':
+                query = params.get('query', [''])[0].strip()
+                brand = params.get('brand', [''])[0].strip()
+                status = params.get('status', [''])[0].strip()
+                cursor = params.get('cursor', [''])[0].strip() or None
+                try:
+                    limit = page_size(params.get('limit', [''])[0].strip())
+                    body = await self.search(query, brand, status, limit, cursor)
+                except ValueError as e:
+                    # Bad limit, status or cursor
+                    await self._error(send, route, e, 400)
+                else:
+                    await self._respond(send, 200, body)
+            elif path == '/api/skus' and scope['method'] == 'POST':
+                await self.skus(scope, receive, send)
+            elif path == '/api/export':
+                await self.export(params, send)
+            elif path == '/api/status':
+                status = inventory_status(self.get_inventory(), self.get_watcher())
+                status['async'] = self.status()
+                await self._respond(send, 200, _json_body(status))
+            elif path == '/metrics':
+                body = self.metrics.render(self.get_inventory(), self.get_watcher()).encode('utf-8')
+                await self._respond(send, 200, body, 'text/plain; version=0.0.4; charset=utf-8')
+            else:
+                await self._respond(send, 404, _json_body({'error': 'Not found'}))
+        except Overloaded as e:
+            self.stats['shed'] += 1
+            await self._error(send, route, e, 503, headers=[(b'retry-after', b'1')])
+        except StreamAborted as e:
+            self.metrics.observe_error(route, e.__cause__)
+            raise
+        except Exception as e:
+            await self._error(send, route, e)
+
+    async def search(self, query: str, brand: str, status: str = '', limit: int = 20,
+                     cursor: Optional[str] = None) -> bytes:
+        """Encoded /api/search response, shared with identical searches in flight."""
+        inv = self.get_inventory()
+        key = (inv.data_version, query.lower(), brand.lower(), status.lower(), limit, cursor)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+        else:
+            if len(self._inflight) >= self.max_pending:
+                raise Overloaded("Server busy, please retry")
+            self.stats['computed'] += 1
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._run_search, inv, time.monotonic(),
+                                          query, brand, status, limit, cursor)
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._inflight.pop(key, None))
+        # A client that disconnects must not cancel the search for the others
+        return await asyncio.shield(future)
+
+    def _run_search(self, inv: InventoryManager, queued_at: float, *params) -> bytes:
+        if time.monotonic() - queued_at > self.max_queue_wait:
+            raise Overloaded("Server busy, please retry")
+        return _json_body(search_inventory(inv, *params))
+
+    async def skus(self, scope, receive, send):
+        """Stream the /api/skus lines, resolving each batch of SKUs on the thread pool."""
+        headers = dict(scope.get('headers', []))
+        try:
+            skus = parse_skus(await self._read_body(receive), headers.get(b'content-type', b'').decode('latin-1'))
+        except ValueError as e:
+            await self._error(send, '/api/skus', e, 400)
+            return
+
+        await self._stream(send, sku_lines(self.get_inventory(), skus), 'application/x-ndjson',
+                           [(b'cache-control', b'no-store')])
+
+    async def export(self, params: Dict, send):
+        """Stream an /api/export body, encoding each chunk on the thread pool."""
+        args = {name: values[0] for name, values in params.items()}
+        try:
+            chunks, columns, fmt = export_request(self.get_inventory(), args)
+        except ValueError as e:
+            await self._error(send, '/api/export', e, 400)
+            return
+        disposition = f'attachment; filename=inventory.{fmt}'.encode('latin-1')
+        await self._stream(send, export_body(chunks, columns, fmt), EXPORT_FORMATS[fmt],
+                           [(b'content-disposition', disposition)])
+
+    async def _stream(self, send, chunks, content_type: str, headers=()):
+        """Send a 200 response whose body is produced by the iterator chunks on the thread pool.
+
+        Raises StreamAborted if chunks fails once the response has started.
+        """
+        loop = asyncio.get_running_loop()
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', content_type.encode('latin-1')), *headers],
+        })
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        except Exception as e:
+            raise StreamAborted(f"Response body failed: {e}") from e
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def status(self) -> Dict:
+        """Coalescing and load-shedding counters."""
+        return dict(self.stats, in_flight=len(self._inflight), threads=self.threads,
+                    max_pending=self.max_pending)
+
+    async def _respond(self, send, status: int, body: bytes,
+                       content_type: str = 'application/json', headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode('latin-1')),
+                        (b'content-length', str(len(body)).encode('latin-1')), *headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _error(self, send, route: str, error: Exception, status: int = 500, headers=()):
+        """JSON error response for an exception, counted in the metrics."""
+        self.metrics.observe_error(route, error)
+        await self._respond(send, status, _json_body({'error': str(error)}), headers=headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.startup is not None:
+                        await asyncio.get_running_loop().run_in_executor(None, self.startup)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _serving(loaded):
+    """A loaded InventoryManager wrapped for request handlers: instrumented, then cached."""
+    metrics.observe_load(loaded)
+    return CachedInventory(InstrumentedInventory(loaded, metrics), query_cache)
+
+
+def _swap_inventory(new_inventory):
+    """Publish a reloaded inventory to request handlers."""
+    global inventory
+    inventory = _serving(new_inventory)
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def load_from_environment():
+    """Load the inventory as configured by ENVIRONMENT, unless main() already did.
+
+    Startup hook of the module-level app, for ASGI servers that import it.
+    """
+    global inventory, watcher
+    if inventory is not None:
+        return
+    print("Loading inventory data...")
+    loaded = InventoryManager(os.environ.get('INVENTORY_FILE', DEFAULT_FILE),
+                              use_cache=not _env_flag('INVENTORY_NO_CACHE'),
+                              compact=_env_flag('INVENTORY_COMPACT'))
+    inventory = _serving(loaded)
+    print(f"📊 Loaded {inventory.get_inventory_summary()['total_items']} items")
+    interval = float(os.environ.get('INVENTORY_WATCH_INTERVAL', 5.0))
+    if interval > 0:
+        watcher = InventoryWatcher(loaded, interval=interval, on_reload=_swap_inventory)
+        watcher.start()
+
+
+app = InventoryASGIApp(lambda: inventory, lambda: watcher, metrics=metrics, startup=load_from_environment)
+
+
+def main():
+    """Load the inventory and serve the ASGI app with uvicorn."""
+    global inventory, watcher, app, query_cache
+
+    parser = argparse.ArgumentParser(description="Inventory Management async web app")
+    parser.add_argument('--file', default=DEFAULT_FILE, help='Excel file path')
+    parser.add_argument('--no-cache', action='store_true', help='Parse the workbook even if a snapshot is cached')
+    parser.add_argument('--compact', action='store_true', help='Keep a single compact copy of the data (for large catalogs)')
+    parser.add_argument('--watch-interval', type=float, default=5.0, help='Seconds between checks for a changed workbook (0 disables reloading)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    parser.add_argument('--threads', type=int, default=4, help='Threads running searches')
+    parser.add_argument('--max-pending', type=int, default=64, help='Distinct searches queued or running before new ones get 503')
+    parser.add_argument('--max-queue-wait', type=float, default=2.0, help='Seconds a search may wait for a thread before it is dropped')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Search results kept in memory (0 disables the cache)')
+    parser.add_argument('--cache-ttl', type=float, default=300.0, help='Seconds a cached search result is kept')
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is required to serve the async app: pip install uvicorn")
+        return 1
+
+    print("Loading inventory data...")
+    try:
+        loaded = InventoryManager(args.file, use_cache=not args.no_cache, compact=args.compact)
+        query_cache = QueryCache(args.cache_size, args.cache_ttl)
+        inventory = _serving(loaded)
+        print(f"📊 Loaded {inventory.get_inventory_summary()['total_items']} items")
+        if args.watch_interval > 0:
+            watcher = InventoryWatcher(loaded, interval=args.watch_interval, on_reload=_swap_inventory)
+            watcher.start()
+        app = InventoryASGIApp(lambda: inventory, lambda: watcher, threads=args.threads,
+                               max_pending=args.max_pending, max_queue_wait=args.max_queue_wait,
+                               metrics=metrics)
+        uvicorn.run(app, host=args.host, port=args.port)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Inventory Management System
+Usage: python benchmark.py [--scales 1000,10000,100000] [--baseline FILE]
+
+Generates synthetic multi-sheet workbooks with the same column layout as the
+real inventory file, times every InventoryManager operation, the export and
+the Flask endpoints at each scale, records peak memory, writes the results as
+JSON and compares them with a stored baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from inventory_manager import InventoryManager, MAIN_SHEET_NAME
+
+# Brands and a few product words for each, to give realistic names and SKU prefixes
+BRANDS = {
+    'Balenciaga': ('BB', ['City', 'Hourglass', 'Le Cagole', 'logo-plaque card holder', 'Everyday tote']),
+    'Bottega Veneta': ('BV', ['Jodie', 'Cassette', 'Pouch', 'Intrecciato wallet', 'Arco tote']),
+    'Burberry': ('BU', ['Lola', 'TB bag', 'check wallet', 'Pocket bag', 'vintage check tote']),
+    'Bvlgari ': ('BG', ['Serpenti Forever', 'Serpenti wallet', 'Bvlgari Bvlgari clutch', 'Divas Dream']),
+    'Celine': ('CE', ['Triomphe', 'Luggage', 'Belt bag', 'Ava', 'card holder']),
+    'Chanel': ('CH', ['Classic Flap', 'Boy bag', '2.55', 'WOC', 'caviar card holder', 'Deauville tote']),
+    'Chloe': ('CL', ['Marcie', 'Faye', 'Tess', 'Woody tote', 'Nile']),
+    'Dior': ('DI', ['Saddle', 'Lady Dior', 'Book Tote', 'Caro', 'Oblique wallet']),
+    'Fendi': ('FE', ['Baguette', 'Peekaboo', 'First', 'FF wallet', 'Sunshine tote']),
+    'Ferragamo': ('FR', ['Vara', 'Gancini wallet', 'Studio', 'Wanda']),
+    'Givenchy': ('GV', ['Antigona', 'Pandora', 'Cut Out', '4G wallet']),
+    'Gucci': ('GC', ['Marmont', 'Dionysus', 'Jackie 1961', 'Horsebit', 'Ophidia wallet']),
+    'Hermes': ('HE', ['Birkin', 'Kelly', 'Constance', 'Evelyne', 'Bearn wallet']),
+    'Loewe': ('LO', ['Puzzle', 'Hammock', 'Flamenco', 'Gate']),
+    'MCM': ('MC', ['Stark backpack', 'Visetos wallet', 'Aren tote']),
+    'MiuMiu': ('MM', ['Wander', 'Arcadie', 'Matelasse wallet']),
+    'Saint Laurent': ('SL', ['Loulou', 'Sac de Jour', 'Kate', 'Niki', 'monogram wallet']),
+    'Valentino': ('VT', ['Rockstud wallet', 'Roman Stud', 'Locò', 'Garavani crossbody']),
+}
+MAIN_SHARE = 0.15
+ADJECTIVES = ['black', 'beige', 'red', 'mini', 'small', 'medium', 'large', 'leather', 'caviar',
+              'lambskin', 'canvas', 'vintage', 'quilted', 'gold hardware']
+COLUMNS = ['SKU', 'Bag Name', 'Bag Cost', 'Bag Price ', 'Sold Date', 'Entrupy', 'Gross Profit']
+
+# The .xls format holds at most this many rows per sheet
+XLS_MAX_ROWS = 65535
+
+
+def _synthetic_rows(rows: int, seed: int):
+    """Yield (sheet_name, [row values]) for a workbook of about `rows` rows."""
+    rnd = random.Random(seed)
+    brand_names = list(BRANDS)
+    main_rows = int(rows * MAIN_SHARE)
+    per_brand = (rows - main_rows) // len(brand_names)
+    counters = {brand: 0 for brand in brand_names}
+    base_date = datetime(2023, 1, 1)
+
+    def make_row(brand):
+        prefix, models = BRANDS[brand]
+        counters[brand] += 1
+        cost = round(rnd.uniform(80, 6000), 2)
+        price = round(cost * rnd.uniform(1.1, 2.2), 2) if rnd.random() < 0.85 else None
+        sold = rnd.random()
+        if sold < 0.6:
+            sold_date = base_date + timedelta(days=rnd.randint(0, 900))
+        elif sold < 0.7:
+            sold_date = 'SOLD'
+        else:
+            sold_date = None
+        gross = round(price - cost - 8.75, 2) if price and sold_date else None
+        name = f"{brand.strip()} {rnd.choice(ADJECTIVES)} {rnd.choice(models)}"
+        return [f"{prefix}{counters[brand]:02d}", name, cost, price, sold_date, 8.75, gross]
+
+    yield MAIN_SHEET_NAME, [make_row(rnd.choice(brand_names)) for _ in range(main_rows)]
+    for brand in brand_names:
+        yield brand, [make_row(brand) for _ in range(per_brand)]
+
+
+def generate_workbook(path: str, rows: int, seed: int = 0):
+    """Write a synthetic inventory workbook (.xls or .xlsx, by extension)."""
+    sheets = list(_synthetic_rows(rows, seed))
+
+    if path.lower().endswith('.xlsx'):
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        for sheet_name, sheet_rows in sheets:
+            sheet = workbook.create_sheet(sheet_name)
+            sheet.append(COLUMNS)
+            for row in sheet_rows:
+                sheet.append(row)
+        sheet = workbook.create_sheet('Notes')
+        sheet.append(['Note'])
+        sheet.append(['Synthetic benchmark data'])
+        workbook.save(path)
+        return
+
+    import xlwt
+    if max(len(sheet_rows) for _, sheet_rows in sheets) > XLS_MAX_ROWS:
+        raise ValueError(f"{rows} rows do not fit in .xls sheets; use an .xlsx path")
+    workbook = xlwt.Workbook()
+    date_style = xlwt.easyxf(num_format_str='YYYY-MM-DD')
+    for sheet_name, sheet_rows in sheets:
+        sheet = workbook.add_sheet(sheet_name)
+        for col, header in enumerate(COLUMNS):
+            sheet.write(0, col, header)
+        for r, row in enumerate(sheet_rows, 1):
+            for col, value in enumerate(row):
+                if value is None:
+                    continue
+                if isinstance(value, datetime):
+                    sheet.write(r, col, value, date_style)
+                else:
+                    sheet.write(r, col, value)
+    sheet = workbook.add_sheet('Notes')
+    sheet.write(0, 0, 'Note')
+    sheet.write(1, 0, 'Synthetic benchmark data')
+    workbook.save(path)
+
+
+def measure(func, repeat: int = 1):
+    """Time func (mean seconds over repeat calls), then rerun it once for peak memory."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        seconds = (time.perf_counter() - start) / repeat
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {'seconds': seconds, 'peak_mb': round(peak / 1024 / 1024, 3), 'repeat': repeat}
+
+
+def run_scale(path: str, cache_dir: str, repeat: int, compact: bool = False) -> dict:
+    """Time every operation against one workbook."""
+    results = {}
+    rnd = random.Random(1)
+
+    def load(use_cache):
+        return InventoryManager(path, use_cache=use_cache, cache_dir=cache_dir, compact=compact)
+
+    inventory, results['load_cold'] = measure(lambda: load(False))
+    load(True)
+    _, results['load_warm'] = measure(lambda: load(True))
+    inventory = load(True)
+
+    skus = inventory.data['SKU'].tolist()
+    sample = [rnd.choice(skus) for _ in range(200)] + ['NOSUCHSKU']
+    keywords = ['wallet', 'black caviar', 'tote', 'kelly', 'zzz', 'card holder', 'mini', 'GC1']
+    brands = inventory.get_all_brands()
+
+    _, results['search_by_sku'] = measure(lambda: [inventory.search_by_sku(s) for s in sample], repeat)
+    results['search_by_sku']['seconds'] /= len(sample)
+    batch = [rnd.choice(skus) for _ in range(1000)]
+    _, results['search_by_skus_1000'] = measure(lambda: inventory.search_by_skus(batch), repeat)
+    _, results['search_by_keyword'] = measure(lambda: [inventory.search_by_keyword(k) for k in keywords], repeat)
+    results['search_by_keyword']['seconds'] /= len(keywords)
+    _, results['search_by_brand_page'] = measure(lambda: inventory.search_by_brand('Mixed', limit=20), repeat)
+    _, results['search_by_brand_all'] = measure(lambda: inventory.search_by_brand(brands[0]), repeat)
+    _, results['get_inventory_summary'] = measure(inventory.get_inventory_summary, repeat)
+
+    import extract_data
+    with tempfile.TemporaryDirectory() as tmp:
+        # A fresh site per call: an up-to-date one is not exported again
+        _, results['extract_data'] = measure(lambda: extract_data.main(path, tempfile.mkdtemp(dir=tmp)))
+
+    import web_app
+    web_app.inventory = inventory
+    client = web_app.app.test_client()
+    endpoints = {
+        'http_summary': '/api/summary',
+        'http_brands': '/api/brands',
+        'http_search_sku': f'/api/search?query={sample[0]}',
+        'http_search_keyword': '/api/search?query=wallet',
+        'http_search_brand': '/api/search?brand=Mixed',
+        'http_search_keyword_brand': '/api/search?query=wallet&brand=Chanel',
+    }
+    for name, url in endpoints.items():
+        _, results[name] = measure(lambda: client.get(url).get_data(), repeat)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """List of regressions: timings more than tolerance slower than the baseline."""
+    regressions = []
+    for scale, operations in results['results'].items():
+        for operation, stats in operations.items():
+            base = baseline.get('results', {}).get(scale, {}).get(operation)
+            if not base or not base['seconds']:
+                continue
+            ratio = stats['seconds'] / base['seconds']
+            if ratio > 1 + tolerance:
+                regressions.append(f"{scale} rows {operation}: {base['seconds'] * 1e3:.2f}ms -> "
+                                   f"{stats['seconds'] * 1e3:.2f}ms ({ratio:.2f}x)")
+    return regressions
+
+
+def print_table(results: dict):
+    for scale, operations in results['results'].items():
+        print(f"\n{'='*60}")
+        print(f"{scale} rows")
+        print(f"{'='*60}")
+        for operation, stats in operations.items():
+            print(f"  {operation:<28} {stats['seconds'] * 1e3:>10.3f} ms  {stats['peak_mb']:>9.2f} MB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory Management System benchmarks")
+    parser.add_argument('--scales', default='1000,10000,100000',
+                        help='Comma-separated row counts (1000000 is supported with --format xlsx)')
+    parser.add_argument('--format', choices=['xls', 'xlsx'], default='xls', help='Workbook format to generate')
+    parser.add_argument('--workdir', default='bench_data', help='Where generated workbooks and snapshots are kept')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per query operation')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before flagging (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', help='Also write the results to this baseline file')
+    parser.add_argument('--compact', action='store_true', help='Load the inventory in compact memory mode')
+
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    cache_dir = os.path.join(args.workdir, 'cache-compact' if args.compact else 'cache')
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'format': args.format,
+            'seed': args.seed,
+            'compact': args.compact,
+        },
+        'results': {},
+    }
+
+    for scale in [int(s) for s in args.scales.split(',') if s.strip()]:
+        path = os.path.join(args.workdir, f'inventory_{scale}_{args.seed}.{args.format}')
+        if not os.path.exists(path):
+            print(f"Generating {path}...")
+            start = time.perf_counter()
+            generate_workbook(path, scale, args.seed)
+            print(f"  generated in {time.perf_counter() - start:.1f}s")
+        print(f"Benchmarking {scale} rows...")
+        results['results'][str(scale)] = run_scale(path, cache_dir, args.repeat, args.compact)
+
+    print_table(results)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+A warm InventoryManager behind a Unix socket, for search_cli.
+
+`search_cli.py --serve` loads the workbook once and answers InventoryManager
+calls on a socket; the other search_cli commands find it there and call it
+through RemoteInventory instead of loading the workbook themselves. Only
+the standard library is imported here, so a client starts without pandas.
+
+Requests and responses are single lines of JSON:
+{"method": ..., "args": [...], "kwargs": {...}} is answered with
+{"result": ...} or {"error": message, "type": exception class name}.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from typing import Dict, Optional
+
+# InventoryManager methods clients may call
+DAEMON_METHODS = ('search_by_sku', 'search_by_skus', 'search_by_keyword', 'search_by_brand', 'count_by_brand',
+                  'query', 'suggest', 'get_inventory_summary', 'get_all_brands', 'memory_report')
+
+# Seconds a client waits for the daemon to accept its connection
+CONNECT_TIMEOUT = 1.0
+
+# Seconds a client waits for an answer, which can wait for a reload of the workbook
+DAEMON_TIMEOUT = 60.0
+
+# InventoryManager load settings the daemon reports in its status
+LOAD_SETTINGS = ('workers', 'use_cache', 'compact')
+
+# Exceptions raised again on the client side under their own type
+_ERROR_TYPES = {'ValueError': ValueError, 'KeyError': KeyError, 'TypeError': TypeError}
+
+
+def socket_path(file_path: str) -> str:
+    """The default socket of the daemon serving a workbook: one per user and workbook."""
+    digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+    user = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(), f'inventory-cli-{user}-{digest}.sock')
+
+
+class RemoteInventory:
+    """InventoryManager calls answered by a running daemon.
+
+    Offers the DAEMON_METHODS of an InventoryManager, so the CLI uses it in
+    place of one; every call is one request on the connection.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._file = sock.makefile('rwb')
+
+    @classmethod
+    def connect(cls, path: str, timeout: Optional[float] = None) -> Optional['RemoteInventory']:
+        """A client of the daemon at path, or None if no daemon is running there.
+
+        A call the daemon does not answer within timeout seconds (default
+        DAEMON_TIMEOUT) raises TimeoutError.
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            return None
+        sock.settimeout(DAEMON_TIMEOUT if timeout is None else timeout)
+        return cls(sock)
+
+    def call(self, method: str, *args, **kwargs):
+        """Call method on the daemon's inventory and return its result."""
+        request = json.dumps({'method': method, 'args': args, 'kwargs': kwargs})
+        self._file.write(request.encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The inventory daemon closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise _ERROR_TYPES.get(response['type'], RuntimeError)(response['error'])
+        return response['result']
+
+    def status(self) -> Dict:
+        """The daemon's workbook, load settings, data version and reload statistics."""
+        return self.call('status')
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __getattr__(self, name):
+        if name not in DAEMON_METHODS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.inventory_daemon
+        # A command started after the workbook changed gets the new data
+        daemon.refresh()
+        for line in self.rfile:
+            self.wfile.write(daemon.answer(line))
+            self.wfile.flush()
+
+
+class InventoryDaemon:
+    """Answers clients on a Unix socket from the inventory of an InventoryWatcher.
+
+    The workbook is checked every watcher.interval seconds and whenever a
+    client connects; a changed one is reloaded before the client is
+    answered; an interval of 0 disables reloading. Each client runs on its
+    own thread and reads the current inventory for every call.
+    """
+
+    def __init__(self, watcher, path: str):
+        self.watcher = watcher
+        self.path = path
+        self.requests = 0
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def refresh(self):
+        """Reload the inventory if the workbook changed (unless reloading is disabled)."""
+        if self.watcher.interval <= 0:
+            return
+        with self._reload_lock:
+            self.watcher.check()
+
+    def answer(self, line: bytes) -> bytes:
+        """The response line to a request line."""
+        self.requests += 1
+        try:
+            request = json.loads(line)
+            method = request['method']
+            if method == 'status':
+                current = self.watcher.current
+                result = dict(self.watcher.status(), file_path=current.file_path, requests=self.requests,
+                              settings={name: getattr(current, name) for name in LOAD_SETTINGS})
+            elif method in DAEMON_METHODS:
+                result = getattr(self.watcher.current, method)(*request.get('args', ()), **request.get('kwargs', {}))
+            else:
+                raise ValueError(f"Unknown method {method!r}")
+            response = {'result': result}
+        except Exception as e:
+            response = {'error': str(e), 'type': type(e).__name__}
+        return json.dumps(response, default=str).encode('utf-8') + b'\n'
+
+    def _poll(self):
+        while not self._stop.wait(self.watcher.interval):
+            self.refresh()
+
+    def serve_forever(self):
+        """Serve until interrupted, then remove the socket.
+
+        Raises RuntimeError if another daemon already answers on the socket;
+        a socket file left behind by one that died is replaced.
+        """
+        if os.path.exists(self.path):
+            other = RemoteInventory.connect(self.path)
+            if other is not None:
+                other.close()
+                raise RuntimeError(f"A daemon is already serving on {self.path}")
+            os.unlink(self.path)
+
+        # Only the user running the daemon may connect
+        umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(self.path, _Handler)
+        finally:
+            os.umask(umask)
+        server.daemon_threads = True
+        server.inventory_daemon = self
+
+        if self.watcher.interval > 0:
+            threading.Thread(target=self._poll, name='inventory-daemon-poll', daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            self._stop.set()
+            server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
@@ -3,42 +3,298 @@
 Extract inventory data to JSON for static website
 """
 
-from inventory_manager import InventoryManager
+from inventory_manager import InventoryManager, RESULT_FIELDS, TOKEN_PATTERN
+from itertools import chain, groupby
+import snapshot_cache
+import argparse
+import hashlib
 import json
+import os
+import re
+import numpy as np
+import pandas as pd
 
-def main():
-    # Load the inventory data
-    file_path = "/Users/yujunchen/Documents/Copy of Copy of LBP Updated Inventory Management With Cost-4.xls"
+DEFAULT_FILE = "/Users/yujunchen/Documents/Copy of Copy of LBP Updated Inventory Management With Cost-4.xls"
+
+# The page loads the manifest, which names the per-brand shards in SHARD_DIR
+MANIFEST_FILE = 'inventory_manifest.json'
+SHARD_DIR = 'data'
+
+# Single-file data of sites exported before the manifest; the page falls back to it
+LEGACY_FILE = 'inventory_data.json'
+
+# Bump when the manifest, shard or search index layout changes
+EXPORT_FORMAT = 2
+
+# Change report categories, and how many SKUs of each main() lists
+CHANGE_KINDS = ('added', 'removed', 'sold', 'repriced')
+REPORT_SKUS = 10
+
+# Shard columns and the export fields they are filled from; money stays numeric.
+# The brand is stored once per shard rather than in every row.
+SHARD_COLUMNS = {
+    'sku': 'sku',
+    'product_name': 'product_name',
+    'status': 'status',
+    'sold_date': 'sold_date',
+    'cost': 'cost_value',
+    'price': 'price_value',
+    'entrupy_cost': 'entrupy_cost_value',
+    'gross_profit': 'gross_profit_value',
+}
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+_minify = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode
+
+def _encode_column(values):
+    """JSON text of each value, encoding every distinct value once."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    # Missing values get code -1, which picks the trailing null
+    return np.array([_encode(value) for value in uniques] + ['null'], dtype=object)[codes]
+
+def _encode_rows(rows):
+    """JSON objects for a chunk of RESULT_FIELDS rows, built column by column."""
+    lines = None
+    for i, (field, values) in enumerate(zip(RESULT_FIELDS, zip(*rows))):
+        prefix = ('{' if i == 0 else ', ') + _encode(field) + ': '
+        encoded = prefix + _encode_column(values)
+        lines = encoded if lines is None else lines + encoded
+    return (lines + '}').tolist()
+
+def write_inventory_json(inventory, output_path, last_updated='2024-07-13'):
+    """Stream the single-file data of LEGACY_FILE, one item per line; returns the number of items.
     
-    try:
-        print("Loading inventory data...")
-        inventory = InventoryManager(file_path)
-        
-        # Get all data
-        all_items = []
-        brands = inventory.get_all_brands()
+    Items are grouped by brand and each row is written exactly once.
+    """
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('{\n  "items": [')
+        for rows in inventory.export_rows(by_brand=True):
+            separator = '\n    ' if count == 0 else ',\n    '
+            f.write(separator + ',\n    '.join(_encode_rows(rows)))
+            count += len(rows)
+        f.write('\n  ],\n')
         
-        for brand in brands:
-            brand_items = inventory.search_by_brand(brand)
-            all_items.extend(brand_items)
+        tail = {
+            'brands': inventory.get_all_brands(),
+            'summary': inventory.get_inventory_summary(),
+            'last_updated': last_updated,
+        }
+        f.write(',\n'.join(f'  {_encode(key)}: {_encode(value)}' for key, value in tail.items()))
+        f.write('\n}\n')
+    return count
+
+def _hashed_name(stem, content):
+    """File name of a data file: a slug of stem and a hash of the content."""
+    slug = re.sub(r'[^a-z0-9]+', '-', (stem or '').lower()).strip('-') or 'unbranded'
+    return f"{slug}.{hashlib.sha256(content).hexdigest()[:12]}.json"
+
+def _write_data_file(shard_dir, stem, data):
+    """Write data minified under its content-hashed name; returns (name, bytes)."""
+    content = _minify(data).encode('utf-8')
+    name = _hashed_name(stem, content)
+    path = os.path.join(shard_dir, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(content)
+    return name, len(content)
+
+def _search_text(value):
+    """The lowercase text InventoryManager matches keywords against for a SKU or name."""
+    return 'nan' if value is None else str(value).lower()
+
+def build_search_index(positions, shard_numbers, skus, names):
+    """The page's keyword index over the exported rows.
+    
+    Rows are identified by their position in inventory order. 'runs' gives
+    each position's shard as (shard number, run length) pairs; within a
+    shard, rows are in position order. 'tokens' are the sorted distinct
+    words of the lowercase SKUs and names, and 'postings' the positions of
+    the rows holding each, delta-encoded. 'names' has the search text of
+    the names the page cannot lowercase itself, such as missing ones.
+    """
+    order = np.argsort(positions)
+    shard_of = np.asarray(shard_numbers)[order]
+    starts = np.flatnonzero(np.diff(shard_of, prepend=-1))
+    lengths = np.diff(np.append(starts, len(shard_of)))
+    
+    skus = np.asarray(skus, dtype=object)[order]
+    names = np.asarray(names, dtype=object)[order]
+    texts = pd.Series([_search_text(value) for value in chain(skus, names)], dtype=object)
+    words = texts.str.findall(TOKEN_PATTERN).explode().dropna()
+    pairs = pd.DataFrame({'token': words.to_numpy(), 'position': words.index.to_numpy() % len(skus)})
+    pairs = pairs.drop_duplicates().sort_values(['token', 'position'])
+    
+    tokens, starts = np.unique(pairs['token'].to_numpy(), return_index=True)
+    deltas = np.diff(pairs['position'].to_numpy(), prepend=0)
+    deltas[starts] = pairs['position'].to_numpy()[starts]
+    postings = np.split(deltas, starts[1:])
+    # The page binary-searches the tokens in its own string order, by UTF-16 code unit
+    order = sorted(range(len(tokens)), key=lambda i: tokens[i].encode('utf-16-be'))
+    return {
+        'rows': len(skus),
+        'runs': np.column_stack([shard_of[np.flatnonzero(np.diff(shard_of, prepend=-1))], lengths]).tolist(),
+        'tokens': [tokens[i] for i in order],
+        'postings': [postings[i].tolist() for i in order],
+        'names': {str(position): _search_text(name) for position, name in enumerate(names.tolist())
+                  if not isinstance(name, str)},
+    }
+
+def read_manifest(output_dir='.'):
+    """The manifest of the previous export in output_dir, or None."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_current(manifest, data_version, output_dir='.'):
+    """Whether manifest was exported from this workbook version and all its files are present."""
+    if not manifest or manifest.get('source') != {'data_version': data_version, 'format': EXPORT_FORMAT}:
+        return False
+    urls = [shard['url'] for shard in manifest['shards']] + [manifest['search_index']['url']]
+    return all(os.path.exists(os.path.join(output_dir, url)) for url in urls)
+
+def _keyed_rows(rows):
+    """{(sku, occurrence): row}, so that duplicated SKUs are told apart."""
+    seen = {}
+    keyed = {}
+    for row in rows:
+        seen[row['sku']] = seen.get(row['sku'], 0) + 1
+        keyed[(row['sku'], seen[row['sku']])] = row
+    return keyed
+
+def row_changes(old_rows, new_rows):
+    """SKUs added, removed, sold and repriced between two lists of shard row dicts."""
+    old, new = _keyed_rows(old_rows), _keyed_rows(new_rows)
+    changes = {kind: [] for kind in CHANGE_KINDS}
+    for key, row in new.items():
+        before = old.get(key)
+        if before is None:
+            changes['added'].append(key[0])
+            continue
+        if before['status'] != 'SOLD' and row['status'] == 'SOLD':
+            changes['sold'].append(key[0])
+        if before['price'] != row['price']:
+            changes['repriced'].append(key[0])
+    changes['removed'] = [key[0] for key in old if key not in new]
+    return changes
+
+def _read_shard_rows(output_dir, manifest, shard):
+    """A previous export's shard as row dicts."""
+    with open(os.path.join(output_dir, shard['url']), encoding='utf-8') as f:
+        data = json.load(f)
+    return [dict(zip(manifest['columns'], row), brand=data['brand']) for row in data['rows']]
+
+def write_sharded(inventory, output_dir='.', last_updated='2024-07-13'):
+    """Write the static site's data as a manifest, one minified shard per brand and a search index.
+    
+    Shard rows are arrays in the manifest's column order, with money as
+    numbers. Data file names carry a hash of their content, so a shard
+    whose rows did not change keeps its name and is not rewritten; the
+    manifest is written last and data files it no longer names are
+    removed. Returns the manifest and the changes from the previous
+    export, found by comparing the rows of the shards that changed.
+    """
+    shard_dir = os.path.join(output_dir, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    columns = list(SHARD_COLUMNS)
+    status_at = columns.index('status')
+    previous = read_manifest(output_dir)
+    previous_urls = {shard['url'] for shard in previous['shards']} if previous else set()
+    
+    shards = []
+    changed_rows = []
+    positions, shard_numbers, skus, names = [], [], [], []
+    export_columns = ['position', 'brand', *SHARD_COLUMNS.values()]
+    rows = chain.from_iterable(inventory.export_rows(columns=export_columns, by_brand=True))
+    for brand, group in groupby(rows, key=lambda row: row[1]):
+        group = list(group)
+        positions.extend(row[0] for row in group)
+        shard_numbers.extend([len(shards)] * len(group))
+        group = [row[2:] for row in group]
+        skus.extend(row[0] for row in group)
+        names.extend(row[1] for row in group)
         
-        # Get summary
-        summary = inventory.get_inventory_summary()
+        name, size = _write_data_file(shard_dir, brand, {'brand': brand, 'rows': group})
+        if f'{SHARD_DIR}/{name}' not in previous_urls:
+            changed_rows.extend(dict(zip(columns, row), brand=brand) for row in group)
+        shards.append({
+            'brand': brand,
+            'url': f'{SHARD_DIR}/{name}',
+            'rows': len(group),
+            'available': sum(row[status_at] == 'AVAILABLE' for row in group),
+            'bytes': size,
+        })
+    
+    index = build_search_index(positions, shard_numbers, skus, names)
+    index_name, index_size = _write_data_file(shard_dir, 'search-index', index)
+    manifest = {
+        'source': {'data_version': inventory.data_version, 'format': EXPORT_FORMAT},
+        'last_updated': last_updated,
+        'summary': inventory.get_inventory_summary(),
+        'brands': inventory.get_all_brands(),
+        'columns': columns,
+        'shards': shards,
+        'search_index': {'url': f'{SHARD_DIR}/{index_name}', 'bytes': index_size, 'words': len(index['tokens'])},
+    }
+    
+    # Rows of shards that were replaced, compared with the rows that replaced them
+    urls = {shard['url'] for shard in shards}
+    replaced_rows = []
+    if previous and previous.get('columns') == columns:
+        for shard in previous['shards']:
+            if shard['url'] not in urls and os.path.exists(os.path.join(output_dir, shard['url'])):
+                replaced_rows.extend(_read_shard_rows(output_dir, previous, shard))
+    changes = row_changes(replaced_rows, changed_rows)
+    changes['shards_written'] = sum(shard['url'] not in previous_urls for shard in shards)
+    
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(_minify(manifest))
+    os.replace(manifest_path + '.tmp', manifest_path)
+    
+    current = {url.rsplit('/', 1)[1] for url in urls} | {index_name}
+    for name in os.listdir(shard_dir):
+        if name.endswith('.json') and name not in current:
+            os.remove(os.path.join(shard_dir, name))
+    return manifest, changes
+
+def print_changes(changes, shard_count):
+    """Print the change report of an export."""
+    counts = ', '.join(f"{len(changes[kind])} {kind}" for kind in CHANGE_KINDS)
+    print(f"📝 Changes: {counts}; rewrote {changes['shards_written']} of {shard_count} shards")
+    for kind in CHANGE_KINDS:
+        skus = changes[kind]
+        if skus:
+            more = f" and {len(skus) - REPORT_SKUS} more" if len(skus) > REPORT_SKUS else ''
+            print(f"   {kind.capitalize()}: {', '.join(map(str, skus[:REPORT_SKUS]))}{more}")
+
+def main(file_path=DEFAULT_FILE, output_dir='.', legacy_json=False):
+    """Export the site data to output_dir; with legacy_json, also rewrite its LEGACY_FILE."""
+    try:
+        # An unchanged workbook needs neither loading nor exporting
+        data_version = snapshot_cache.file_sha256(file_path)[:12]
+        if not legacy_json and is_current(read_manifest(output_dir), data_version, output_dir):
+            print(f"✅ No changes: {os.path.join(output_dir, MANIFEST_FILE)} is up to date")
+            return
         
-        # Create the data structure for the static site
-        data = {
-            'items': all_items,
-            'brands': brands,
-            'summary': summary,
-            'last_updated': '2024-07-13'
-        }
+        print("Loading inventory data...")
+        inventory = InventoryManager(file_path)
         
-        # Save to JSON file
-        with open('inventory_data.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        manifest, changes = write_sharded(inventory, output_dir)
+        summary = manifest['summary']
+        count = sum(shard['rows'] for shard in manifest['shards'])
         
-        print(f"✅ Exported {len(all_items)} items to inventory_data.json")
-        print(f"📊 Brands: {len(brands)}")
+        print(f"✅ Exported {count} items to {os.path.join(output_dir, MANIFEST_FILE)} "
+              f"and {len(manifest['shards'])} shards in {os.path.join(output_dir, SHARD_DIR)}")
+        print_changes(changes, len(manifest['shards']))
+        print(f"🔎 Search index: {manifest['search_index']['words']} words, "
+              f"{manifest['search_index']['bytes']:,} bytes")
+        if legacy_json:
+            legacy_path = os.path.join(output_dir, LEGACY_FILE)
+            print(f"📄 Wrote {write_inventory_json(inventory, legacy_path)} items to {legacy_path}")
+        print(f"📊 Brands: {summary['brands']}")
         print(f"📈 Summary: {summary}")
         
     except Exception as e:
@@ -46,4 +302,10 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Export the inventory for the static site")
+    parser.add_argument('--file', default=DEFAULT_FILE, help='Excel file path')
+    parser.add_argument('--output-dir', default='.', help='Directory of the site')
+    parser.add_argument('--legacy-json', action='store_true',
+                        help=f'Also write {LEGACY_FILE}, which the page reads when there is no manifest')
+    args = parser.parse_args()
+    main(args.file, args.output_dir, args.legacy_json)
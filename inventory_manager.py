@@ -1,53 +1,694 @@
+import numpy as np
 import pandas as pd
+import base64
+import hashlib
+import json
+import os
 import re
-from typing import Optional, List, Dict
+import struct
+import sys
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Iterator
 from datetime import datetime
 
+import snapshot_cache
+from profiling import phase
+
+# Sheet holding the mixed-brand inventory; every other sheet is named after its brand
+MAIN_SHEET_NAME = 'Copy of Copy of LBP Updated Inv'
+
+# Fields of a formatted search result, in order
+RESULT_FIELDS = ['sku', 'product_name', 'brand', 'cost', 'price', 'entrupy_cost', 'gross_profit', 'status', 'sold_date']
+
+# Currency result fields and the numeric columns they are formatted from
+CURRENCY_FIELDS = {'cost': 'Cost', 'price': 'Price', 'entrupy_cost': 'Entrupy', 'gross_profit': 'Gross_Profit'}
+
+# Workbooks smaller than this are parsed in-process; a pool costs more than it saves
+PARALLEL_MIN_BYTES = 1024 * 1024
+
+# Raw workbook columns and the standardized names clean_data gives them
+COLUMN_MAPPING = {
+    'Bag Name': 'Product_Name',
+    'Bag Cost': 'Cost',
+    'Bag Price': 'Price',
+    'Bag Price ': 'Price',  # Handle extra space
+    'Sold Date': 'Sold_Date',
+    'Gross Profit': 'Gross_Profit'
+}
+
+# Fields export_rows can produce: the search result fields, the numbers
+# behind the currency ones (e.g. 'cost_value') and the row's position in
+# inventory order
+EXPORT_FIELDS = RESULT_FIELDS + [f'{field}_value' for field in CURRENCY_FIELDS] + ['position']
+
+# Rows per chunk yielded by export_rows
+EXPORT_CHUNK_SIZE = 1000
+
+# Product name words offered by suggest(): runs of letters and digits
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+# Most completions suggest() returns, and the prefix length up to which
+# its rankings are kept once computed (short prefixes match many keys)
+MAX_SUGGESTIONS = 20
+SUGGEST_MEMO_LENGTH = 2
+
+# Values of query()'s status filter
+STATUS_FILTERS = ('available', 'sold')
+
+# In compact mode, text columns with at most this share of distinct values
+# are stored as categoricals
+CATEGORICAL_MAX_RATIO = 0.5
+
+# Version of the derived structures stored with a snapshot (see
+# _derived_structures); snapshots with another version rebuild them
+DERIVED_FORMAT = 1
+
+# Result fields whose preformatted values are stored with a snapshot
+STORED_DISPLAY_FIELDS = ['cost', 'price', 'entrupy_cost', 'gross_profit', 'sold_date']
+
+# Workbook opened once per pool worker by _init_sheet_worker
+_worker_excel = None
+
+
+def _open_workbook(file_path: str) -> pd.ExcelFile:
+    """Open the workbook once; sheets are decoded lazily as they are parsed."""
+    if file_path.lower().endswith(('.xlsx', '.xlsm')):
+        return pd.ExcelFile(file_path, engine='openpyxl')
+    import xlrd
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    return pd.ExcelFile(book, engine='xlrd')
+
+
+# BIFF records that hold absolute stream offsets, which shift whenever an
+# earlier sheet changes size: BOUNDSHEET (globals) and INDEX (sheet header)
+_BIFF_OFFSET_RECORDS = (0x0085, 0x020B)
+
+# xlrd Book attributes _sheet_fingerprints reads the raw stream through;
+# _sh_abs_posn (each sheet's stream offset) is private to xlrd
+_XLRD_LAYOUT_ATTRS = ('mem', 'base', 'stream_len', '_sh_abs_posn')
+
+
+def _biff_records(mem, start: int, end: int):
+    """Yield (record_type, record_start, record_end) for a BIFF substream."""
+    pos = start
+    while pos + 4 <= end:
+        record_type, length = struct.unpack_from('<HH', mem, pos)
+        yield record_type, pos, pos + 4 + length
+        pos += 4 + length
+
+
+def _sheet_fingerprints(excel_file: pd.ExcelFile) -> Dict[str, str]:
+    """Content hash of each sheet's raw records, without decoding any sheet.
+
+    Every hash also covers the workbook globals (shared strings, formats),
+    so in practice sheets are only reused after numeric-only edits: any
+    edit that adds a new string changes the globals and marks every sheet
+    changed. Offset-only records are skipped so resizing one sheet does not
+    dirty the others.
+
+    Only .xls workbooks opened with xlrd can be fingerprinted, and only
+    through xlrd's private sheet offsets; for xlsx workbooks, or an xlrd
+    without them, this returns {} and callers treat every sheet as changed,
+    i.e. a reload parses the whole workbook.
+    """
+    book = excel_file.book
+    if not all(hasattr(book, attr) for attr in _XLRD_LAYOUT_ATTRS):
+        return {}
+    try:
+        mem, positions = book.mem, list(book._sh_abs_posn)
+        if len(positions) != book.nsheets or not all(isinstance(pos, int) for pos in positions):
+            return {}
+        stream_end = book.base + book.stream_len
+
+        globals_hash = hashlib.sha1()
+        for record_type, start, end in _biff_records(mem, book.base, min(positions)):
+            if record_type not in _BIFF_OFFSET_RECORDS:
+                globals_hash.update(mem[start:end])
+        globals_digest = globals_hash.digest()
+
+        bounds = sorted(positions) + [stream_end]
+        fingerprints = {}
+        for name, start in zip(book.sheet_names(), positions):
+            end = bounds[bounds.index(start) + 1]
+            sheet_hash = hashlib.sha1(globals_digest)
+            # INDEX, when present, directly follows the sheet's BOF record;
+            # everything after it is hashed in one piece, minus the zero
+            # padding that follows the last sheet in the stream
+            records = _biff_records(mem, start, end)
+            _, bof_start, bof_end = next(records)
+            sheet_hash.update(mem[bof_start:bof_end])
+            for record_type, record_start, _ in records:
+                if record_type not in _BIFF_OFFSET_RECORDS:
+                    sheet_hash.update(mem[record_start:end].rstrip(b'\x00'))
+                    break
+            fingerprints[name] = sheet_hash.hexdigest()
+        return fingerprints
+    except Exception:
+        return {}
+
+
+def _pack_trigram(gram: str) -> int:
+    """The integer key of a trigram: its code points (< 2**21 each) packed together."""
+    return (ord(gram[0]) << 42) | (ord(gram[1]) << 21) | ord(gram[2])
+
+
+class _TrigramIndex:
+    """The ascending positions of the texts containing each 3-character substring.
+
+    Held as three flat arrays so it can be stored in a snapshot and memory-
+    mapped back as is: keys are the packed trigrams in ascending order, and
+    the positions for keys[i] are rows[starts[i]:starts[i + 1]].
+    """
+
+    def __init__(self, keys: np.ndarray, starts: np.ndarray, rows: np.ndarray):
+        self.keys = keys
+        self.starts = starts
+        self.rows = rows
+
+    def get(self, gram: str) -> Optional[np.ndarray]:
+        """The positions of the texts containing gram, or None if there are none."""
+        key = _pack_trigram(gram)
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return self.rows[self.starts[i]:self.starts[i + 1]]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'keys': self.keys, 'starts': self.starts, 'rows': self.rows}
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.starts.nbytes + self.rows.nbytes
+
+
+def _build_trigram_index(texts: List[str]) -> _TrigramIndex:
+    """Index every 3-character substring of texts.
+
+    Built with array operations over the code points of all texts joined by
+    NUL separators, so the cost does not involve a Python loop per trigram.
+    """
+    if not texts:
+        return _TrigramIndex(np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32))
+    joined = '\x00'.join(texts) + '\x00'
+    chars = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths + 1)[:-2]
+
+    # Pack each trigram into its key (see _pack_trigram), dropping trigrams
+    # that span a separator
+    first, second, third = chars[:-2], chars[1:-1], chars[2:]
+    valid = (first != 0) & (second != 0) & (third != 0)
+    keys = ((first << 42) | (second << 21) | third)[valid]
+    rows = rows[valid]
+
+    # A stable sort by key keeps each key's rows in ascending order
+    order = np.argsort(keys, kind='stable')
+    keys, rows = keys[order], rows[order]
+    distinct = np.ones(len(keys), dtype=bool)
+    distinct[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+    keys, rows = keys[distinct], rows[distinct]
+
+    gram_keys, starts = np.unique(keys, return_index=True)
+    return _TrigramIndex(gram_keys, np.append(starts, len(keys)), rows.astype(np.int32))
+
+
+def _category_values(values: pd.Series) -> np.ndarray:
+    """A categorical column as an object array sharing one object per category; missing values are None."""
+    labels = np.append(values.cat.categories.to_numpy(dtype=object), None)
+    return labels[values.cat.codes.to_numpy()]
+
+
+def _substring_positions(texts: List[str], index: _TrigramIndex, keyword: str,
+                         limit: int, exclude=frozenset(), allowed: Optional[np.ndarray] = None,
+                         after: int = -1) -> List[int]:
+    """Ascending positions of up to limit texts containing keyword.
+
+    Only positions greater than after and, if given, in the ascending array
+    allowed are considered. Candidates are taken from the shortest of the
+    keyword's trigram posting lists and allowed in growing chunks, narrowed
+    by membership in the others and verified with a plain substring test,
+    stopping as soon as limit hits are found. Keywords shorter than a
+    trigram are checked against every candidate text.
+    """
+    postings = [] if allowed is None else [allowed]
+    if len(keyword) >= 3:
+        for gram in {keyword[i:i + 3] for i in range(len(keyword) - 2)}:
+            posting = index.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+    if not postings:
+        return _verify_positions(texts, range(after + 1, len(texts)), keyword, limit, exclude, [])
+    postings.sort(key=len)
+    base, others = postings[0], postings[1:]
+
+    hits = []
+    start, chunk_size = int(np.searchsorted(base, after, side='right')), 256
+    while start < len(base) and len(hits) < limit:
+        candidates = base[start:start + chunk_size]
+        for posting in others:
+            found = np.searchsorted(posting, candidates)
+            found[found == len(posting)] = 0
+            candidates = candidates[posting[found] == candidates]
+            if not len(candidates):
+                break
+        _verify_positions(texts, candidates.tolist(), keyword, limit, exclude, hits)
+        start += chunk_size
+        chunk_size = min(chunk_size * 4, 65536)
+    return hits
+
+
+class _ContainsKeyword:
+    """The positions whose text contains keyword, usable as exclude above."""
+
+    def __init__(self, texts: List[str], keyword: str):
+        self.texts = texts
+        self.keyword = keyword
+
+    def __contains__(self, position: int) -> bool:
+        return self.keyword in self.texts[position]
+
+
+def _verify_positions(texts: List[str], candidates, keyword: str, limit: int,
+                      exclude, hits: List[int]) -> List[int]:
+    """Append candidates whose text contains keyword to hits, up to limit."""
+    for position in candidates:
+        if keyword in texts[position] and position not in exclude:
+            hits.append(position)
+            if len(hits) >= limit:
+                break
+    return hits
+
+
+def _intern_strings(values: np.ndarray) -> np.ndarray:
+    """Copy of an object array in which equal strings are one shared object."""
+    is_text = np.fromiter((type(value) is str for value in values), dtype=bool, count=len(values))
+    codes, uniques = pd.factorize(values[is_text])
+    interned = values.copy()
+    interned[is_text] = uniques[codes]
+    return interned
+
+
+def _compact_text(values: pd.Series) -> pd.Series:
+    """Store a text column with each distinct string held once.
+
+    Columns of repeated strings become categoricals; other object columns
+    keep their values with equal strings shared, and Arrow-backed strings,
+    which have no per-value objects, are left as they are.
+    """
+    present = values.dropna()
+    if values.dtype == object and not all(type(value) is str for value in present):
+        return pd.Series(_intern_strings(values.to_numpy()), index=values.index, dtype=object)
+    if present.nunique() <= len(values) * CATEGORICAL_MAX_RATIO:
+        return values.astype('category')
+    if values.dtype == object:
+        return pd.Series(_intern_strings(values.to_numpy()), index=values.index, dtype=object)
+    return values
+
+
+def _values_bytes(values, seen: set) -> int:
+    """Bytes held by a Series, array or list; objects whose id is in seen are not counted again."""
+    if isinstance(values, pd.Series):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return (_values_bytes(values.cat.codes.to_numpy(), seen)
+                    + _values_bytes(values.cat.categories.to_series(), seen))
+        if not isinstance(values.dtype, np.dtype):
+            return int(values.array.nbytes)
+        values = values.to_numpy()
+    if isinstance(values, np.ndarray):
+        total = values.nbytes
+        if values.dtype != object:
+            return total
+        items = values.ravel().tolist()
+    else:
+        total = sys.getsizeof(values)
+        items = values
+    for item in items:
+        if id(item) not in seen:
+            seen.add(id(item))
+            total += sys.getsizeof(item)
+    return total
+
+
+def _frame_bytes(df: pd.DataFrame, seen: set) -> int:
+    """Bytes held by a DataFrame's columns, counting shared objects once."""
+    if df is None:
+        return 0
+    return sum(_values_bytes(df.iloc[:, i], seen) for i in range(df.shape[1]))
+
+
+def _init_sheet_worker(file_path: str):
+    """Open the workbook in a pool worker so its sheets share one decoded book."""
+    global _worker_excel
+    _worker_excel = _open_workbook(file_path)
+
+
+def _parse_sheet(sheet_name: str):
+    """Parse one sheet in a pool worker, returning it with its parse time."""
+    start = time.perf_counter()
+    df_sheet = _worker_excel.parse(sheet_name)
+    return sheet_name, df_sheet, time.perf_counter() - start
+
+
 class InventoryManager:
-    def __init__(self, excel_file_path: str):
-        """Initialize the inventory manager with Excel data."""
+    def __init__(self, excel_file_path: str, workers: Optional[int] = None,
+                 use_cache: bool = True, cache_dir: str = snapshot_cache.DEFAULT_CACHE_DIR,
+                 previous: Optional['InventoryManager'] = None, compact: bool = False):
+        """Initialize the inventory manager with Excel data.
+
+        workers sets the number of processes used to parse sheets; None picks
+        one per CPU for large workbooks and parses small ones in-process.
+        With use_cache, the cleaned data is loaded from a snapshot in cache_dir
+        when the workbook is unchanged, and a snapshot is written after parsing.
+        previous is an already loaded manager for the same workbook whose
+        sheets are reused when their content is unchanged.
+        compact keeps a single copy of the data for large catalogs: the raw
+        columns are dropped once mapped, repeated strings are stored once,
+        and all_sheets_data holds slices of data (see sheet_rows) instead of
+        the parsed sheets, which also means its sheets cannot be reused by a
+        later reload.
+        """
         self.file_path = excel_file_path
+        self.workers = workers
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.compact = compact
+        self.cache_status = 'disabled'
+        self.source_sha256 = None
+        self.data_version = None
+        self.loaded_at = None
+        self.source_mtime = None
         self.data = None
         self.all_sheets_data = {}
-        self.load_data()
+        # Compact mode: {sheet_name: (start, stop)} row range of each sheet in data
+        self.sheet_rows = {}
+        self.sheet_fingerprints = {}
+        self.load_timings = {}
+        # Built by _build_indexes once the data is loaded
+        self._sku_index = {}
+        self.duplicate_skus = {}
+        self._sku_lower = []
+        self._name_lower = []
+        self._sku_trigrams = None
+        self._name_trigrams = None
+        self._brand_rows = {}
+        self._sold = None
+        self._suggest_keys = []
+        self._suggest_memo = {}
+        self._display = None
+        self._records = None
+        self._brand_stats = None
+        self._summary = None
+        # Per-brand stats of a previous load that are still valid; see _build_summary
+        self._reusable_brand_stats = None
+        self.load_data(previous)
     
-    def load_data(self):
-        """Load data from all sheets in the Excel file."""
+    def load_data(self, previous: Optional['InventoryManager'] = None):
+        """Load data from all sheets in the Excel file.
+
+        With previous, only sheets whose content changed since it was loaded
+        are parsed again; the others are taken from previous as they are.
+        """
         try:
-            # Read all sheets
-            excel_file = pd.ExcelFile(self.file_path, engine='xlrd')
-            
-            # Combine all sheet data
+            total_start = time.perf_counter()
+
+            source_key = self._find_snapshot()
+            if self.cache_status == 'hit':
+                self._set_version()
+                return
+
+            # Open the workbook once; sheets are decoded as they are parsed
+            start = time.perf_counter()
+            excel_file = _open_workbook(self.file_path)
+            self.sheet_fingerprints = _sheet_fingerprints(excel_file)
+            self.load_timings = {'open': time.perf_counter() - start}
+
+            reused = self._reusable_sheets(previous)
+            self._reusable_brand_stats = self._carry_brand_stats(previous, reused)
+            changed = [name for name in excel_file.sheet_names if name not in reused]
+
+            start = time.perf_counter()
+            parsed = self._read_sheets(excel_file, changed)
+            self.load_timings['parse'] = time.perf_counter() - start
+            self.load_timings['sheets'] = {name: secs for name, (_, secs) in parsed.items()}
+            self.load_timings['reused_sheets'] = len(reused)
+
+            # Combine all sheet data, keeping the workbook's sheet order
             all_data = []
+            data_sheets = []
             for sheet_name in excel_file.sheet_names:
-                try:
-                    df_sheet = pd.read_excel(self.file_path, sheet_name=sheet_name, engine='xlrd')
+                if sheet_name in reused:
+                    df_sheet = reused[sheet_name]
+                elif sheet_name in parsed:
+                    df_sheet = parsed[sheet_name][0]
                     # Add brand/sheet info if not main sheet
-                    if sheet_name != 'Copy of Copy of LBP Updated Inv':
+                    if sheet_name != MAIN_SHEET_NAME:
                         df_sheet['Brand'] = sheet_name
                     else:
                         df_sheet['Brand'] = 'Mixed'
-                    
-                    # Store individual sheet data
-                    self.all_sheets_data[sheet_name] = df_sheet
-                    
-                    # Add to combined data if it has SKU column
-                    if 'SKU' in df_sheet.columns:
-                        all_data.append(df_sheet)
-                except Exception as e:
-                    print(f"Error reading sheet {sheet_name}: {e}")
-            
+                else:
+                    continue
+
+                # Store individual sheet data
+                self.all_sheets_data[sheet_name] = df_sheet
+
+                # Add to combined data if it has SKU column
+                if 'SKU' in df_sheet.columns:
+                    all_data.append(df_sheet)
+                    data_sheets.append(sheet_name)
+
             # Combine all data
             if all_data:
+                start = time.perf_counter()
                 self.data = pd.concat(all_data, ignore_index=True)
+                self.load_timings['concat'] = time.perf_counter() - start
+                if self.compact:
+                    # Let the parsed sheets go; they are replaced by slices of data below
+                    sheet_starts = np.cumsum([0] + [len(df_sheet) for df_sheet in all_data])
+                    all_data = None
+                    for sheet_name in data_sheets:
+                        self.all_sheets_data[sheet_name] = None
+
+                start = time.perf_counter()
                 self.clean_data()
+                self.load_timings['clean_data'] = time.perf_counter() - start
+                if self.compact:
+                    # Rows keep their concatenated position as index label through cleaning
+                    bounds = np.searchsorted(self.data.index.to_numpy(), sheet_starts).tolist()
+                    self.sheet_rows = {name: (bounds[i], bounds[i + 1]) for i, name in enumerate(data_sheets)}
+                    self._attach_sheet_rows()
             else:
                 raise Exception("No valid data found")
-                
+
+            self.load_timings['total'] = time.perf_counter() - total_start
+            self._report_timings()
+            self._set_version()
+
+            if source_key is not None:
+                self._save_snapshot(source_key)
+
         except Exception as e:
             print(f"Error loading data: {e}")
             raise
+
+    def _reusable_sheets(self, previous: Optional['InventoryManager']) -> Dict[str, pd.DataFrame]:
+        """Sheets of previous whose fingerprint matches the workbook on disk.
+
+        A compact manager only holds cleaned rows, not the parsed sheets, so
+        nothing of it is reusable; see _sheet_fingerprints for which edits
+        leave sheets reusable at all.
+        """
+        if previous is None or previous.compact or not self.sheet_fingerprints:
+            return {}
+        reused = {}
+        for name, fingerprint in self.sheet_fingerprints.items():
+            if name not in previous.all_sheets_data or previous.sheet_fingerprints.get(name) != fingerprint:
+                continue
+            try:
+                # Sheets of a snapshot are read on first access here
+                reused[name] = previous.all_sheets_data[name]
+            except Exception as e:
+                print(f"Error reading sheet {name} from snapshot, parsing it again: {e}")
+        return reused
+
+    def _carry_brand_stats(self, previous: Optional['InventoryManager'], reused: Dict[str, pd.DataFrame]):
+        """Per-brand stats of previous for the brands whose sheets are reused.
+        
+        Returned with previous's column layout: they only stay valid if the
+        new data ends up with the same columns, since the column mapping in
+        clean_data depends on every sheet's columns.
+        """
+        if previous is None or previous._brand_stats is None or not reused:
+            return None
+        brands = ['Mixed' if name == MAIN_SHEET_NAME else name for name in reused]
+        stats = previous._brand_stats[previous._brand_stats.index.isin(brands)]
+        return tuple(previous.data.columns), stats
     
+    def _attach_sheet_rows(self):
+        """Point all_sheets_data at the slices of data given by sheet_rows."""
+        for sheet_name, (start, stop) in self.sheet_rows.items():
+            self.all_sheets_data[sheet_name] = self.data.iloc[start:stop]
+
+    def _set_version(self):
+        """Stamp the loaded data with the workbook's content hash and modification time."""
+        if self.source_sha256 is None:
+            self.source_sha256 = snapshot_cache.file_sha256(self.file_path)
+        self.data_version = self.source_sha256[:12]
+        self.source_mtime = os.path.getmtime(self.file_path)
+        self.loaded_at = time.time()
+
+    def _find_snapshot(self) -> Optional[Dict]:
+        """Load the data from a snapshot if the workbook is unchanged.
+
+        Sets cache_status to 'hit', 'miss' or 'disabled'. Returns the source
+        key to save a snapshot under after a miss, otherwise None.
+        """
+        if not self.use_cache:
+            self.cache_status = 'disabled'
+            return None
+        if not snapshot_cache.cache_available():
+            self.cache_status = 'disabled'
+            print("Snapshot cache disabled: pyarrow is not installed")
+            return None
+
+        start = time.perf_counter()
+        try:
+            entry_dir, source_key = snapshot_cache.find_snapshot(self.file_path, self.cache_dir)
+            self.source_sha256 = source_key['sha256']
+            if entry_dir is not None:
+                data, sheets, manifest = snapshot_cache.load_snapshot(entry_dir)
+                if manifest.get('compact', False) == self.compact:
+                    self.data = data
+                    self.sheet_fingerprints = manifest.get('sheet_fingerprints', {})
+                    if self.compact:
+                        self.sheet_rows = {name: tuple(rows) for name, rows in manifest['sheet_rows'].items()}
+                        self.all_sheets_data = {name: sheets.get(name) for name in manifest['sheet_names']}
+                        self._attach_sheet_rows()
+                    else:
+                        self.all_sheets_data = sheets
+                    self._build_indexes(self._load_derived(entry_dir, manifest))
+                    self.cache_status = 'hit'
+                    self.load_timings = {'snapshot': time.perf_counter() - start}
+                    print(f"Snapshot cache hit: {len(self.data)} records from {len(self.all_sheets_data)} sheets "
+                          f"in {self.load_timings['snapshot']:.2f}s")
+                    return None
+                print("Snapshot was written in the other memory mode")
+        except Exception as e:
+            print(f"Error reading snapshot cache: {e}")
+            self.data = None
+            self.all_sheets_data = {}
+            source_key = None
+
+        self.cache_status = 'miss'
+        print("Snapshot cache miss: parsing workbook")
+        return source_key
+
+    def _load_derived(self, entry_dir: str, manifest: Dict) -> Optional[Dict]:
+        """The derived structures stored with a snapshot, or None to rebuild them."""
+        if manifest.get('derived_format') != DERIVED_FORMAT:
+            return None
+        try:
+            derived = snapshot_cache.load_derived(entry_dir, manifest)
+        except Exception as e:
+            print(f"Error reading derived structures from snapshot, rebuilding them: {e}")
+            return None
+        if len(derived.get('display', ())) != len(self.data) or 'suggest' not in derived:
+            return None
+        return derived
+
+    def _derived_structures(self) -> Dict:
+        """The lookup structures that are slow to build, as frames and arrays for a snapshot.
+
+        The preformatted display fields are stored as categoricals, so each
+        distinct label is one object again once restored.
+        """
+        derived = {}
+        for name, index in (('sku', self._sku_trigrams), ('name', self._name_trigrams)):
+            for part, values in index.arrays().items():
+                derived[f'{name}_trigrams_{part}'] = values
+        derived['display'] = pd.DataFrame({
+            field: pd.Categorical(self._records[:, RESULT_FIELDS.index(field)])
+            for field in STORED_DISPLAY_FIELDS
+        })
+        derived['suggest'] = pd.DataFrame({
+            'key': self._suggest_keys,
+            'kind': pd.Categorical(self._suggest_kinds),
+            'text': self._suggest_texts,
+            'rows': self._suggest_rows,
+            'free': self._suggest_free,
+            'rank': self._suggest_rank,
+        })
+        return derived
+
+    def _save_snapshot(self, source_key: Dict):
+        """Write the loaded data to the snapshot cache; failures only skip caching."""
+        start = time.perf_counter()
+        extra = {'sheet_fingerprints': self.sheet_fingerprints, 'derived_format': DERIVED_FORMAT}
+        sheets = self.all_sheets_data
+        if self.compact:
+            # Sheets that are slices of data are restored from their row ranges
+            extra.update(compact=True, sheet_rows=self.sheet_rows, sheet_names=list(sheets))
+            sheets = {name: df_sheet for name, df_sheet in sheets.items() if name not in self.sheet_rows}
+        try:
+            snapshot_cache.save_snapshot(source_key, self.data, sheets, self.cache_dir, extra=extra,
+                                         derived=self._derived_structures())
+            print(f"Snapshot saved in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"Error writing snapshot cache: {e}")
+
+    def _worker_count(self, sheet_count: int) -> int:
+        """Number of processes to parse sheet_count sheets with."""
+        if self.workers is not None:
+            workers = self.workers
+        elif os.path.getsize(self.file_path) < PARALLEL_MIN_BYTES:
+            workers = 1
+        else:
+            workers = os.cpu_count() or 1
+        return max(1, min(workers, sheet_count))
+
+    def _read_sheets(self, excel_file: pd.ExcelFile, sheet_names: List[str]) -> Dict:
+        """Parse sheets into DataFrames, in parallel when more than one worker is used.
+
+        Returns {sheet_name: (DataFrame, parse_seconds)}; sheets that fail to
+        parse are reported and left out.
+        """
+        parsed = {}
+        workers = self._worker_count(len(sheet_names))
+        self.load_timings['workers'] = workers
+
+        if workers == 1:
+            for sheet_name in sheet_names:
+                start = time.perf_counter()
+                try:
+                    parsed[sheet_name] = (excel_file.parse(sheet_name), time.perf_counter() - start)
+                except Exception as e:
+                    print(f"Error reading sheet {sheet_name}: {e}")
+            return parsed
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sheet_worker,
+                                 initargs=(self.file_path,)) as pool:
+            futures = {pool.submit(_parse_sheet, name): name for name in sheet_names}
+            for future, sheet_name in futures.items():
+                try:
+                    _, df_sheet, secs = future.result()
+                    parsed[sheet_name] = (df_sheet, secs)
+                except Exception as e:
+                    print(f"Error reading sheet {sheet_name}: {e}")
+        return parsed
+
+    def _report_timings(self):
+        """Print where the load time went."""
+        t = self.load_timings
+        print(f"Load timings: open {t['open']:.2f}s, parse {t['parse']:.2f}s "
+              f"({len(t['sheets'])} sheets, {t['reused_sheets']} reused, workers: {t['workers']}), "
+              f"concat {t['concat']:.2f}s, "
+              f"clean_data {t['clean_data']:.2f}s, total {t['total']:.2f}s")
+        slowest = sorted(t['sheets'].items(), key=lambda item: item[1], reverse=True)
+        print("  Sheet parse times: " + ", ".join(f"{name} {secs:.2f}s" for name, secs in slowest))
+
     def clean_data(self):
         """Clean and standardize the data."""
         if self.data is not None:
@@ -58,129 +699,617 @@ class InventoryManager:
             self.data['SKU'] = self.data['SKU'].astype(str).str.strip()
             
             # Standardize column names
-            column_mapping = {
-                'Bag Name': 'Product_Name',
-                'Bag Cost': 'Cost',
-                'Bag Price': 'Price',
-                'Bag Price ': 'Price',  # Handle extra space
-                'Sold Date': 'Sold_Date',
-                'Gross Profit': 'Gross_Profit'
-            }
-            
-            for old_col, new_col in column_mapping.items():
+            for old_col, new_col in COLUMN_MAPPING.items():
                 if old_col in self.data.columns:
                     self.data[new_col] = self.data[old_col]
             
+            if self.compact:
+                # Keep the mapped columns only under their standardized names
+                self.data = self.data.drop(columns=[col for col in COLUMN_MAPPING if col in self.data.columns])
+            
             # Convert numeric columns
             numeric_columns = ['Cost', 'Price', 'Entrupy', 'Gross_Profit']
             for col in numeric_columns:
                 if col in self.data.columns:
                     self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
             
-            # Create search-friendly product name
-            if 'Product_Name' in self.data.columns:
+            # Create search-friendly product name; compact mode derives it for the index only
+            if 'Product_Name' in self.data.columns and not self.compact:
                 self.data['Product_Name_Lower'] = self.data['Product_Name'].astype(str).str.lower()
             
+            if self.compact:
+                self._compact_columns()
+            
+            self._build_indexes()
+            
             print(f"Data loaded successfully: {len(self.data)} records from {len(self.all_sheets_data)} sheets")
     
+    def _compact_columns(self):
+        """Store Brand as a categorical and every text column with its repeated strings held once."""
+        for col in self.data.columns:
+            values = self.data[col]
+            if col == 'Brand':
+                self.data[col] = values.astype('category')
+            elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+                self.data[col] = _compact_text(values)
+    
+    def _build_indexes(self, derived: Optional[Dict] = None):
+        """Build the lookup structures over the cleaned data.
+
+        derived holds the structures stored with a snapshot (see
+        _derived_structures); they are taken from it instead of rebuilt.
+        """
+        derived = derived or {}
+        self._build_sku_index()
+        self._build_keyword_index(derived)
+        self._build_brand_index()
+        self._build_display(derived.get('display'))
+        self._build_suggest_index(derived.get('suggest'))
+        self._build_summary()
+    
+    def _build_sku_index(self):
+        """Map each normalized SKU to its row position.
+        
+        Lookups resolve to the first row carrying a SKU; SKUs that appear on
+        more than one row (e.g. across sheets) are also listed with all their
+        positions in duplicate_skus.
+        """
+        keys = self.data['SKU'].str.upper().to_numpy(dtype=object)
+        positions = np.arange(len(keys))
+        
+        # Assigning in reverse leaves the first position for each key
+        self._sku_index = dict(zip(keys[::-1].tolist(), positions[::-1].tolist()))
+        
+        duplicated = pd.Series(keys).duplicated(keep=False).to_numpy()
+        self.duplicate_skus = {
+            key: group.tolist()
+            for key, group in pd.Series(positions[duplicated]).groupby(keys[duplicated])
+        }
+    
+    def _build_keyword_index(self, derived: Dict):
+        """Build trigram indexes over lowercase SKUs and product names, or restore them from derived."""
+        self._sku_lower = self.data['SKU'].str.lower().tolist()
+        if 'Product_Name_Lower' in self.data.columns:
+            self._name_lower = self.data['Product_Name_Lower'].tolist()
+        elif 'Product_Name' in self.data.columns:
+            names = self.data['Product_Name'].astype(str).str.lower().to_numpy(dtype=object)
+            self._name_lower = _intern_strings(names).tolist()
+        else:
+            self._name_lower = [''] * len(self.data)
+        if 'sku_trigrams_keys' in derived:
+            self._sku_trigrams, self._name_trigrams = (
+                _TrigramIndex(*(derived[f'{name}_trigrams_{part}'] for part in ('keys', 'starts', 'rows')))
+                for name in ('sku', 'name'))
+        else:
+            self._sku_trigrams = _build_trigram_index(self._sku_lower)
+            self._name_trigrams = _build_trigram_index(self._name_lower)
+    
+    def _build_brand_index(self):
+        """Partition the row positions by brand."""
+        self._brand_rows = {
+            brand: np.asarray(positions)
+            for brand, positions in self.data.groupby('Brand', sort=True, observed=True).indices.items()
+        }
+    
+    def _brand_positions(self, brand: str) -> np.ndarray:
+        """Row positions for a brand, in inventory order.
+        
+        Brands are matched case-insensitively: an exact name wins, otherwise
+        every brand starting with the text, otherwise every brand containing it.
+        """
+        key = brand.strip().lower()
+        names = [name for name in self._brand_rows if name.strip().lower() == key]
+        if not names:
+            names = [name for name in self._brand_rows if name.strip().lower().startswith(key)]
+        if not names:
+            names = [name for name in self._brand_rows if key in name.lower()]
+        
+        if not names:
+            return np.empty(0, dtype=np.int64)
+        if len(names) == 1:
+            return self._brand_rows[names[0]]
+        return np.sort(np.concatenate([self._brand_rows[name] for name in names]))
+    
+    def _build_suggest_index(self, stored: Optional[pd.DataFrame] = None):
+        """Build the sorted completion keys used by suggest(), or restore them from stored.
+        
+        Keys are the lowercase brands, product name words and SKUs. Each has
+        its kind, display text, number of rows and of available rows, and a
+        rank (0 is best) by available rows, then rows, then key, so the best
+        completions of a prefix are the lowest ranks in its key range.
+        """
+        self._suggest_memo = {}
+        if stored is not None:
+            self._suggest_keys = stored['key'].tolist()
+            self._suggest_kinds = _category_values(stored['kind'])
+            self._suggest_texts = stored['text'].to_numpy(dtype=object)
+            self._suggest_rows = stored['rows'].to_numpy(dtype=np.int64)
+            self._suggest_free = stored['free'].to_numpy(dtype=np.int64)
+            self._suggest_rank = stored['rank'].to_numpy(dtype=np.int64)
+            return
+        
+        available = ~self._sold
+        parts = []  # (keys, kind, texts, rows, available rows) per kind
+        
+        brands = list(self._brand_rows)
+        parts.append(([brand.strip().lower() for brand in brands], 'brand', [brand.strip() for brand in brands],
+                      [len(self._brand_rows[brand]) for brand in brands],
+                      [int(available[self._brand_rows[brand]].sum()) for brand in brands]))
+        
+        # Count each word once per row, going through the distinct names only
+        codes, names = pd.factorize(np.asarray(self._name_lower, dtype=object))
+        name_rows = np.bincount(codes, minlength=len(names))
+        name_free = np.bincount(codes, weights=available, minlength=len(names)).astype(np.int64)
+        word_rows, word_free = defaultdict(int), defaultdict(int)
+        for name, rows, free in zip(names.tolist(), name_rows.tolist(), name_free.tolist()):
+            for word in set(TOKEN_PATTERN.findall(name)):
+                word_rows[word] += rows
+                word_free[word] += free
+        words = list(word_rows)
+        parts.append((words, 'name', words, list(word_rows.values()), [word_free[word] for word in words]))
+        
+        codes, skus = pd.factorize(np.asarray(self._sku_lower, dtype=object))
+        first = np.unique(codes, return_index=True)[1]
+        parts.append((skus, 'sku', self._records[first, RESULT_FIELDS.index('sku')],
+                      np.bincount(codes, minlength=len(skus)),
+                      np.bincount(codes, weights=available, minlength=len(skus)).astype(np.int64)))
+        
+        def column(i, dtype=object):
+            return np.concatenate([np.asarray(part[i], dtype=dtype) for part in parts])
+        
+        keys = column(0)
+        # A stable sort keeps equal keys in kind order
+        order = np.argsort(keys.astype(str), kind='stable')
+        self._suggest_keys = keys[order].tolist()
+        self._suggest_kinds = np.concatenate([np.full(len(part[0]), part[1], dtype=object) for part in parts])[order]
+        self._suggest_texts = column(2)[order]
+        self._suggest_rows = column(3, np.int64)[order]
+        self._suggest_free = column(4, np.int64)[order]
+        ranking = np.lexsort((np.arange(len(order)), -self._suggest_rows, -self._suggest_free))
+        self._suggest_rank = np.empty(len(order), dtype=np.int64)
+        self._suggest_rank[ranking] = np.arange(len(order))
+    
+    def _build_display(self, stored: Optional[pd.DataFrame] = None):
+        """Format every row's display fields once, column by column.
+        
+        _records holds the result fields as an object array, so results are
+        sliced out of it without formatting anything per request; _display
+        holds the brand and status as categoricals plus the raw numeric value
+        behind each currency field (e.g. 'cost_value'). The formatted fields
+        in stored (see _derived_structures) are used as they are.
+        """
+        data = self.data
+        n = len(data)
+        columns = {}
+        
+        columns['sku'] = data['SKU'].to_numpy(dtype=object)
+        if 'Product_Name' in data.columns:
+            columns['product_name'] = data['Product_Name'].to_numpy(dtype=object)
+        else:
+            columns['product_name'] = np.full(n, 'N/A', dtype=object)
+        columns['brand'] = data['Brand'].to_numpy(dtype=object)
+        
+        values = {}
+        for field, column in CURRENCY_FIELDS.items():
+            if column in data.columns:
+                values[f'{field}_value'] = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)
+            else:
+                values[f'{field}_value'] = np.full(n, np.nan)
+            if stored is None:
+                columns[field] = self._format_currency_column(values[f'{field}_value'])
+        
+        if 'Sold_Date' in data.columns:
+            sold_date = data['Sold_Date'].reset_index(drop=True)
+        else:
+            sold_date = pd.Series(np.nan, index=pd.RangeIndex(n))
+        sold = sold_date.notna().to_numpy()
+        self._sold = sold
+        status_codes = sold.astype(np.int8)
+        columns['status'] = np.array(['AVAILABLE', 'SOLD'], dtype=object)[status_codes]
+        if stored is None:
+            columns['sold_date'] = np.full(n, None, dtype=object)
+            codes, dates = pd.factorize(sold_date[sold])
+            labels = np.array([self._format_sold_date(date) for date in dates], dtype=object)
+            columns['sold_date'][sold] = labels[codes]
+        else:
+            for field in STORED_DISPLAY_FIELDS:
+                columns[field] = _category_values(stored[field])
+        
+        self._records = np.empty((n, len(RESULT_FIELDS)), dtype=object)
+        for i, field in enumerate(RESULT_FIELDS):
+            self._records[:, i] = columns[field]
+        self._display = pd.DataFrame({
+            'brand': pd.Categorical(data['Brand']),
+            'status': pd.Categorical.from_codes(status_codes, ['AVAILABLE', 'SOLD']),
+            **values,
+        })
+    
+    def _sku_positions(self, sku: str) -> List[int]:
+        """Row positions of every row carrying a SKU."""
+        key = str(sku).strip().upper()
+        if key in self.duplicate_skus:
+            return self.duplicate_skus[key]
+        position = self._sku_index.get(key)
+        return [] if position is None else [position]
+    
+    def _format_rows(self, positions: List[int]) -> List[Dict]:
+        """Formatted results for the rows at the given positions."""
+        return [dict(zip(RESULT_FIELDS, row)) for row in self._records[positions].tolist()]
+    
     def search_by_sku(self, sku: str) -> Optional[Dict]:
-        """Search for a specific SKU."""
-        sku = str(sku).strip().upper()
+        """Search for a specific SKU.
         
-        # Search in main data
-        matches = self.data[self.data['SKU'].str.upper() == sku]
+        Returns the first row carrying the SKU. When the SKU appears on
+        several rows, the result's 'duplicate_count' says how many; use
+        search_by_skus to get all of them.
+        """
+        positions = self._sku_positions(sku)
         
-        if matches.empty:
+        if not positions:
             return None
         
-        # Return the first match as a dictionary
-        result = matches.iloc[0].to_dict()
+        result = self._format_rows(positions[:1])[0]
+        if len(positions) > 1:
+            result['duplicate_count'] = len(positions)
+        return result
+    
+    def search_by_skus(self, skus: List[str]) -> Dict[str, List[Dict]]:
+        """Look up many SKUs at once.
+        
+        Returns {sku: matches} in input order, keyed by the SKUs as given;
+        matches is empty for a miss and holds every row for a duplicated SKU.
+        """
+        with phase('sku_lookup'):
+            lookups = {sku: self._sku_positions(sku) for sku in skus}
         
-        # Clean up the result
-        return self._format_result(result)
+        # Format every matched row in one pass, then hand them out per SKU
+        with phase('format'):
+            wanted = sorted({position for positions in lookups.values() for position in positions})
+            formatted = dict(zip(wanted, self._format_rows(wanted)))
+        
+        return {sku: [formatted[position] for position in positions] for sku, positions in lookups.items()}
     
     def search_by_keyword(self, keyword: str, max_results: int = 10) -> List[Dict]:
-        """Search for products by keyword in product name or SKU."""
+        """Search for products by keyword in product name or SKU.
+        
+        SKU matches come first, then product name matches, each in inventory
+        order; the keyword is matched as a plain case-insensitive substring.
+        """
         keyword = keyword.lower().strip()
         
-        if not keyword:
+        if not keyword or max_results <= 0:
             return []
         
         # Search in SKU and Product Name
-        sku_matches = self.data[self.data['SKU'].str.lower().str.contains(keyword, na=False)]
-        name_matches = self.data[self.data['Product_Name_Lower'].str.contains(keyword, na=False, regex=False)]
+        with phase('keyword_scan'):
+            positions = _substring_positions(self._sku_lower, self._sku_trigrams, keyword, max_results)
+            if len(positions) < max_results:
+                positions += _substring_positions(self._name_lower, self._name_trigrams, keyword,
+                                                  max_results - len(positions), exclude=set(positions))
         
-        # Combine and remove duplicates
-        all_matches = pd.concat([sku_matches, name_matches]).drop_duplicates()
+        with phase('format'):
+            return self._format_rows(positions)
+    
+    def search_by_brand(self, brand: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Search for products by brand.
         
-        # Limit results
-        results = []
-        for _, row in all_matches.head(max_results).iterrows():
-            results.append(self._format_result(row.to_dict()))
+        Returns the page of limit items (all if None) starting at offset;
+        only that page is formatted.
+        """
+        with phase('brand_lookup'):
+            positions = self._brand_positions(brand)
+        end = None if limit is None else offset + limit
+        with phase('format'):
+            return self._format_rows(positions[offset:end].tolist())
+    
+    def count_by_brand(self, brand: str) -> int:
+        """Number of items search_by_brand would return without a limit."""
+        return len(self._brand_positions(brand))
+    
+    def query(self, keyword: str = '', brand: str = '', status: str = '', limit: int = 20,
+              cursor: Optional[str] = None) -> Dict:
+        """Search with any combination of keyword, brand and status, a page at a time.
         
-        return results
+        keyword matches as in search_by_keyword (SKU matches first, then
+        product name matches), brand as in search_by_brand, and status is
+        'available' or 'sold'. Brand and status narrow the rows before the
+        keyword is looked up, and the scan for a page stops once it is full.
+        Returns {'results', 'total', 'next_cursor'}; passing next_cursor
+        back, with the same filters, resumes after the last row returned.
+        Raises ValueError for an unknown status or a cursor that does not
+        belong to this query and data version.
+        """
+        keyword = keyword.lower().strip()
+        filters = [keyword, brand.strip().lower(), status.strip().lower()]
+        if cursor:
+            state = self._decode_cursor(cursor, filters)
+        else:
+            state = {'phase': 0, 'after': -1, 'total': None, 'offset': 0}
+        with phase('filter'):
+            allowed = self._filter_positions(brand, status)
+        
+        if keyword:
+            if state['total'] is None:
+                with phase('count'):
+                    state['total'] = len(self._keyword_positions(keyword, allowed, 0, -1, len(self.data))[0])
+            with phase('keyword_scan'):
+                positions, state['phase'], state['after'] = self._keyword_positions(
+                    keyword, allowed, state['phase'], state['after'], limit)
+        else:
+            rows = allowed if allowed is not None else np.arange(len(self.data))
+            start = int(np.searchsorted(rows, state['after'], side='right'))
+            positions = rows[start:start + limit].tolist()
+            state['total'] = len(rows)
+            if positions:
+                state['after'] = positions[-1]
+        
+        state['offset'] += len(positions)
+        more = bool(positions) and state['offset'] < state['total']
+        with phase('format'):
+            results = self._format_rows(positions)
+        return {
+            'results': results,
+            'total': state['total'],
+            'next_cursor': self._encode_cursor(state, filters) if more else None,
+        }
     
-    def search_by_brand(self, brand: str) -> List[Dict]:
-        """Search for products by brand."""
-        brand_matches = self.data[self.data['Brand'].str.lower().str.contains(brand.lower(), na=False)]
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict]:
+        """Completions of prefix among SKUs, product name words and brands.
         
-        results = []
-        for _, row in brand_matches.iterrows():
-            results.append(self._format_result(row.to_dict()))
+        Returns up to limit (at most MAX_SUGGESTIONS) {'text', 'kind',
+        'count', 'available'}, ranked by available items, then items, then
+        alphabetically; kind is 'sku', 'name' or 'brand'.
+        """
+        key = prefix.strip().lower()
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not key or limit <= 0:
+            return []
         
-        return results
+        if len(key) <= SUGGEST_MEMO_LENGTH:
+            ranked = self._suggest_memo.get(key)
+            if ranked is None:
+                ranked = self._suggest_memo[key] = self._rank_suggestions(key, MAX_SUGGESTIONS)
+            ranked = ranked[:limit]
+        else:
+            ranked = self._rank_suggestions(key, limit)
+        
+        return [
+            {'text': text, 'kind': kind, 'count': count, 'available': free}
+            for text, kind, count, free in zip(self._suggest_texts[ranked].tolist(), self._suggest_kinds[ranked].tolist(),
+                                               self._suggest_rows[ranked].tolist(), self._suggest_free[ranked].tolist())
+        ]
     
-    def get_all_brands(self) -> List[str]:
-        """Get all available brands."""
-        return sorted(self.data['Brand'].unique().tolist())
+    def _rank_suggestions(self, key: str, limit: int) -> List[int]:
+        """Positions in the completion keys of the best limit keys starting with key."""
+        start = bisect_left(self._suggest_keys, key)
+        end = bisect_left(self._suggest_keys, key + '\U0010ffff', start)
+        ranks = self._suggest_rank[start:end]
+        if len(ranks) > limit:
+            best = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            best = np.arange(len(ranks))
+        best = best[np.argsort(ranks[best])]
+        return (start + best).tolist()
     
-    def get_inventory_summary(self) -> Dict:
-        """Get summary statistics of the inventory."""
-        total_items = len(self.data)
-        brands = self.data['Brand'].nunique()
+    def _filter_positions(self, brand: str, status: str) -> Optional[np.ndarray]:
+        """Ascending row positions passing the brand and status filters; None if neither is set."""
+        positions = self._brand_positions(brand) if brand.strip() else None
+        key = status.strip().lower()
+        if key:
+            if key not in STATUS_FILTERS:
+                raise ValueError(f"Unknown status '{status}'; use 'available' or 'sold'")
+            wanted = self._sold if key == 'sold' else ~self._sold
+            positions = np.flatnonzero(wanted) if positions is None else positions[wanted[positions]]
+        return positions
+    
+    def _keyword_positions(self, keyword: str, allowed: Optional[np.ndarray], phase: int,
+                           after: int, limit: int):
+        """Up to limit keyword matches in query order, resuming at (phase, after).
         
-        # Cost and price statistics
-        avg_cost = self.data['Cost'].mean()
-        avg_price = self.data['Price'].mean()
+        Phase 0 holds the SKU matches and phase 1 the product name matches of
+        rows whose SKU does not match. Returns (positions, phase, after) with
+        the point to resume from.
+        """
+        phases = [
+            (self._sku_lower, self._sku_trigrams, frozenset()),
+            (self._name_lower, self._name_trigrams, _ContainsKeyword(self._sku_lower, keyword)),
+        ]
+        positions = []
+        while phase < len(phases) and len(positions) < limit:
+            texts, index, exclude = phases[phase]
+            found = _substring_positions(texts, index, keyword, limit - len(positions), exclude, allowed, after)
+            positions += found
+            if len(positions) < limit:
+                phase, after = phase + 1, -1
+            else:
+                after = found[-1]
+        return positions, phase, after
+    
+    def _encode_cursor(self, state: Dict, filters: List[str]) -> str:
+        payload = json.dumps(dict(state, version=self.data_version, filters=filters), separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    def _decode_cursor(self, cursor: str, filters: List[str]) -> Dict:
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            state = {key: state[key] for key in ('phase', 'after', 'total', 'offset', 'version', 'filters')}
+        except (ValueError, TypeError, KeyError):
+            raise ValueError("Invalid cursor")
+        if state.pop('version') != self.data_version:
+            raise ValueError("The inventory changed since this cursor was issued; search again")
+        if state.pop('filters') != filters:
+            raise ValueError("The cursor belongs to a different search")
+        return state
+    
+    def export_rows(self, brand: str = '', status: str = '', columns: Optional[List[str]] = None,
+                    chunk_size: int = EXPORT_CHUNK_SIZE, by_brand: bool = False) -> Iterator[List[tuple]]:
+        """Stream the inventory, optionally filtered, as chunks of rows.
         
-        # Sold items
-        sold_items = len(self.data[self.data['Sold_Date'].notna()])
-        available_items = total_items - sold_items
+        brand and status filter as in query(). Each row is a tuple of the
+        values of columns (default RESULT_FIELDS; any of EXPORT_FIELDS),
+        with None for a missing value. Rows come in inventory order, or
+        with by_brand grouped by brand in get_all_brands() order; either
+        way every row is exported once. Rows are built one chunk at a time,
+        so memory use does not grow with the export. Raises ValueError for
+        an unknown column or status right away.
+        """
+        columns = list(RESULT_FIELDS if columns is None else columns)
+        unknown = [column for column in columns if column not in EXPORT_FIELDS]
+        if unknown or not columns:
+            raise ValueError(f"Unknown export columns {unknown}; choose from {', '.join(EXPORT_FIELDS)}")
+        positions = self._filter_positions(brand, status)
+        if by_brand:
+            grouped = np.concatenate([np.empty(0, dtype=np.int64), *self._brand_rows.values()])
+            # Rows without a brand go last
+            grouped = np.concatenate([grouped, np.setdiff1d(np.arange(len(self.data)), grouped)])
+            positions = grouped if positions is None else grouped[np.isin(grouped, positions)]
+        return self._export_chunks(positions, columns, chunk_size)
+    
+    def _export_chunks(self, positions: Optional[np.ndarray], columns: List[str], chunk_size: int):
+        total = len(self.data) if positions is None else len(positions)
+        # Formatted fields are views into _records; numbers come from _display
+        sources = [self._records[:, RESULT_FIELDS.index(column)] if column in RESULT_FIELDS
+                   else np.arange(len(self.data)) if column == 'position'
+                   else self._display[column].to_numpy() for column in columns]
         
-        return {
+        for start in range(0, total, chunk_size):
+            if positions is None:
+                rows = slice(start, start + chunk_size)
+            else:
+                rows = positions[start:start + chunk_size]
+            values = []
+            for source in sources:
+                chunk = source[rows]
+                missing = pd.isna(chunk)
+                if missing.any():
+                    chunk = np.where(missing, None, chunk)
+                values.append(chunk.tolist())
+            yield list(zip(*values))
+    
+    def _build_summary(self):
+        """Compute the inventory summary once per load.
+        
+        Per-brand partial sums are kept in _brand_stats; the totals are
+        combined from them, so a reload only aggregates the rows of brands
+        whose sheets changed and reuses the rest.
+        """
+        display = self._display
+        carried = self._reusable_brand_stats
+        self._reusable_brand_stats = None
+        if carried is not None and carried[0] == tuple(self.data.columns):
+            reused_stats = carried[1]
+        else:
+            reused_stats = None
+        
+        frame = pd.DataFrame({
+            'brand': display['brand'],
+            'sold': (display['status'] == 'SOLD').astype(int),
+            'cost': display['cost_value'],
+            'price': display['price_value'],
+        })
+        if reused_stats is not None:
+            frame = frame[~frame['brand'].isin(reused_stats.index)]
+        
+        grouped = frame.groupby('brand', sort=True, observed=True)
+        stats = pd.DataFrame({
+            'items': grouped.size(),
+            'sold': grouped['sold'].sum(),
+            'cost_total': grouped['cost'].sum(),
+            'cost_count': grouped['cost'].count(),
+            'price_total': grouped['price'].sum(),
+            'price_count': grouped['price'].count(),
+        })
+        if reused_stats is not None:
+            stats = pd.concat([stats, reused_stats]).sort_index()
+        self._brand_stats = stats
+        
+        totals = stats.sum()
+        total_items = int(totals['items'])
+        sold_items = int(totals['sold'])
+        avg_cost = totals['cost_total'] / totals['cost_count'] if totals['cost_count'] else 0
+        avg_price = totals['price_total'] / totals['price_count'] if totals['price_count'] else 0
+        
+        self._summary = {
             'total_items': total_items,
-            'brands': brands,
-            'available_items': available_items,
+            'brands': len(stats),
+            'available_items': total_items - sold_items,
             'sold_items': sold_items,
-            'avg_cost': round(avg_cost, 2) if pd.notna(avg_cost) else 0,
-            'avg_price': round(avg_price, 2) if pd.notna(avg_price) else 0,
-            'brand_list': self.get_all_brands()
+            'avg_cost': round(float(avg_cost), 2),
+            'avg_price': round(float(avg_price), 2),
+            'total_cost': round(float(totals['cost_total']), 2),
+            'total_price': round(float(totals['price_total']), 2),
+            'brand_list': stats.index.tolist(),
+            'brand_breakdown': {
+                brand: {
+                    'total_items': int(row['items']),
+                    'available_items': int(row['items'] - row['sold']),
+                    'sold_items': int(row['sold']),
+                    'total_cost': round(float(row['cost_total']), 2),
+                    'total_price': round(float(row['price_total']), 2),
+                }
+                for brand, row in stats.iterrows()
+            },
         }
     
-    def _format_result(self, result: Dict) -> Dict:
-        """Format a single result for display."""
-        formatted = {}
-        
-        # Core fields
-        formatted['sku'] = result.get('SKU', 'N/A')
-        formatted['product_name'] = result.get('Product_Name', 'N/A')
-        formatted['brand'] = result.get('Brand', 'N/A')
-        
-        # Financial info
-        formatted['cost'] = self._format_currency(result.get('Cost'))
-        formatted['price'] = self._format_currency(result.get('Price'))
-        formatted['entrupy_cost'] = self._format_currency(result.get('Entrupy'))
-        formatted['gross_profit'] = self._format_currency(result.get('Gross_Profit'))
-        
-        # Status
-        sold_date = result.get('Sold_Date')
-        if pd.notna(sold_date) and sold_date is not None:
-            formatted['status'] = 'SOLD'
-            formatted['sold_date'] = sold_date.strftime('%Y-%m-%d') if hasattr(sold_date, 'strftime') else str(sold_date)
-        else:
-            formatted['status'] = 'AVAILABLE'
-            formatted['sold_date'] = None
+    def memory_report(self) -> Dict:
+        """Approximate bytes held by the data and by each lookup structure.
+
+        Objects shared between structures, such as interned strings or the
+        sheet slices of compact mode, are counted once, under the first
+        structure listed that holds them.
+        """
+        seen = set()
+        sheets = self.all_sheets_data
+        if isinstance(sheets, snapshot_cache.LazySheets):
+            # Sheets not read from the snapshot yet take no memory
+            sheets = sheets.loaded()
+        components = {
+            'data': _frame_bytes(self.data, seen),
+            'sheets': sum(_frame_bytes(df_sheet, seen) for name, df_sheet in sheets.items()
+                          if name not in self.sheet_rows),
+            'display': _frame_bytes(self._display, seen),
+            'records': _values_bytes(self._records, seen),
+            'sku_index': (_values_bytes(list(self._sku_index), seen) + sys.getsizeof(self._sku_index)
+                          + _values_bytes(list(self.duplicate_skus), seen)),
+            'keyword_index': (_values_bytes(self._sku_lower, seen) + _values_bytes(self._name_lower, seen)
+                              + self._sku_trigrams.nbytes + self._name_trigrams.nbytes),
+            'brand_index': sum(positions.nbytes for positions in self._brand_rows.values()),
+            'suggest_index': (_values_bytes(self._suggest_keys, seen)
+                              + sum(_values_bytes(values, seen) for values in (
+                                  self._suggest_kinds, self._suggest_texts, self._suggest_rows,
+                                  self._suggest_free, self._suggest_rank))),
+        }
+        return {
+            'compact': self.compact,
+            'rows': len(self.data),
+            'total_bytes': sum(components.values()),
+            'components': components,
+        }
+    
+    def get_all_brands(self) -> List[str]:
+        """Get all available brands."""
+        return list(self._summary['brand_list'])
+    
+    def get_inventory_summary(self) -> Dict:
+        """Get summary statistics of the inventory.
         
+        Computed once per load; the brand list and breakdown are shared with
+        later calls and must not be modified.
+        """
+        return dict(self._summary)
+    
+    def _format_sold_date(self, sold_date) -> str:
+        """Format a sale date for display."""
+        return sold_date.strftime('%Y-%m-%d') if hasattr(sold_date, 'strftime') else str(sold_date)
+    
+    def _format_currency_column(self, values: np.ndarray) -> np.ndarray:
+        """Format a float array the way _format_currency formats one value."""
+        formatted = np.full(len(values), "N/A", dtype=object)
+        present = ~np.isnan(values)
+        # Prices repeat a lot; format each distinct amount once
+        amounts, inverse = np.unique(values[present], return_inverse=True)
+        labels = np.array(list(map("${:,.2f}".format, amounts.tolist())), dtype=object)
+        formatted[present] = labels[inverse]
         return formatted
     
     def _format_currency(self, value) -> str:
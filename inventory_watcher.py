@@ -0,0 +1,114 @@
+"""
+Background reloading of an InventoryManager when its workbook changes.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import snapshot_cache
+from inventory_manager import InventoryManager
+
+
+class InventoryWatcher:
+    """Poll a workbook and swap in a freshly loaded InventoryManager when it changes.
+
+    The new manager is built on the watcher thread, reusing the unchanged
+    sheets of the current one (unless it is compact), and only replaces it
+    once fully loaded, so readers of `current` always see a complete data set.
+    A workbook whose size or mtime changed but whose content hash did not
+    (e.g. touched, or copied over with the same file) is not reloaded.
+    """
+
+    def __init__(self, inventory: InventoryManager, interval: float = 5.0,
+                 on_reload: Optional[Callable[[InventoryManager], None]] = None):
+        self.current = inventory
+        self.interval = interval
+        self.on_reload = on_reload
+        self.reloads = 0
+        self.last_reload_seconds = None
+        self.last_reload_at = None
+        self.last_error = None
+        self._stat = self._file_stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.current.file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def start(self):
+        """Start polling in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name='inventory-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for an in-progress reload to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> bool:
+        """Reload if the workbook changed since the last check; True if reloaded."""
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return False
+
+        # Wait for the writer to finish before parsing a half-written file
+        time.sleep(min(self.interval, 1.0))
+        if self._file_stat() != stat:
+            return False
+
+        current = self.current
+        try:
+            data_version = snapshot_cache.file_sha256(current.file_path)[:12]
+        except OSError:
+            return False
+        if data_version == current.data_version:
+            self._stat = stat
+            return False
+
+        start = time.perf_counter()
+        try:
+            inventory = InventoryManager(current.file_path, workers=current.workers,
+                                         use_cache=current.use_cache, cache_dir=current.cache_dir,
+                                         previous=current, compact=current.compact)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error reloading inventory: {e}")
+            self._stat = stat
+            return False
+
+        self._stat = stat
+        self.current = inventory
+        self.reloads += 1
+        self.last_reload_seconds = time.perf_counter() - start
+        self.last_reload_at = time.time()
+        self.last_error = None
+        print(f"Inventory reloaded in {self.last_reload_seconds:.2f}s (version {inventory.data_version})")
+        if self.on_reload is not None:
+            self.on_reload(inventory)
+        return True
+
+    def status(self) -> Dict:
+        """Current data version and reload statistics."""
+        inventory = self.current
+        return {
+            'data_version': inventory.data_version,
+            'loaded_at': inventory.loaded_at,
+            'total_items': len(inventory.data),
+            'reloads': self.reloads,
+            'last_reload_seconds': self.last_reload_seconds,
+            'last_reload_at': self.last_reload_at,
+            'reused_sheets': inventory.load_timings.get('reused_sheets'),
+            'cache_status': inventory.cache_status,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,209 @@
+"""
+Prometheus-style instrumentation of the web app and InventoryManager.
+
+Metrics collects request and method latencies, result sizes and error
+counts in memory and renders them, together with the loaded inventory's
+load phases, row count and memory, in the Prometheus text format.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional
+
+from inventory_manager import InventoryManager
+
+# Histogram bucket upper bounds: seconds, and rows per result
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESULT_SIZE_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000, 10000)
+LOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# InventoryManager methods timed by InstrumentedInventory
+INSTRUMENTED_METHODS = ('search_by_sku', 'search_by_skus', 'search_by_keyword', 'search_by_brand',
+                        'count_by_brand', 'query', 'suggest', 'get_inventory_summary', 'get_all_brands')
+
+# Rows in the result of the instrumented methods that return rows
+RESULT_SIZES = {
+    'search_by_sku': lambda result: 0 if result is None else 1,
+    'search_by_skus': lambda result: sum(len(matches) for matches in result.values()),
+    'search_by_keyword': len,
+    'search_by_brand': len,
+    'query': lambda result: len(result['results']),
+    'suggest': len,
+    'get_all_brands': len,
+}
+
+# {metric name: (type, help)}
+FAMILIES = {
+    'inventory_http_request_duration_seconds': ('histogram', 'Time to build a response, by route'),
+    'inventory_http_requests_total': ('counter', 'Requests answered, by route and status code'),
+    'inventory_http_errors_total': ('counter', 'Requests that failed with an exception, by route and type'),
+    'inventory_call_duration_seconds': ('histogram', 'Duration of InventoryManager calls, by method'),
+    'inventory_call_results': ('histogram', 'Rows returned by InventoryManager calls, by method'),
+    'inventory_call_errors_total': ('counter', 'InventoryManager calls that raised, by method and type'),
+    'inventory_load_duration_seconds': ('histogram', 'Time to load the inventory, over all loads'),
+    'inventory_load_phase_seconds': ('gauge', 'Duration of each phase of the current inventory load'),
+    'inventory_sheet_parse_seconds': ('gauge', 'Parse time of each sheet in the current inventory load'),
+    'inventory_rows': ('gauge', 'Rows in the loaded inventory'),
+    'inventory_memory_bytes': ('gauge', 'Approximate memory held by the loaded inventory, by component'),
+    'inventory_reloads_total': ('counter', 'Reloads of the inventory after the workbook changed'),
+    'inventory_info': ('gauge', 'Data version and memory mode of the loaded inventory'),
+}
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Thread-safe collection of counters and histograms.
+
+    Series are keyed by metric name and a tuple of (label, value) pairs.
+    Each process has its own: with the pre-forking server every worker
+    counts the requests it answered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, _Histogram] = {}
+        self._counters: Dict[tuple, float] = {}
+        # (data version, memory_report()) of the last inventory loaded
+        self._memory = (None, None)
+
+    def observe(self, name: str, labels: tuple, value: float, buckets=LATENCY_BUCKETS):
+        """Add value to the histogram name{labels}."""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, labels: tuple = (), amount: float = 1):
+        """Increase the counter name{labels}."""
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def observe_request(self, route: str, status: int, seconds: float):
+        """Record a request answered by one of the web app's routes."""
+        self.observe('inventory_http_request_duration_seconds', (('route', route),), seconds)
+        self.inc('inventory_http_requests_total', (('route', route), ('status', str(status))))
+
+    def observe_error(self, route: str, error: BaseException):
+        """Record an exception turned into an error response."""
+        self.inc('inventory_http_errors_total', (('route', route), ('error', type(error).__name__)))
+
+    def observe_load(self, inventory: InventoryManager):
+        """Record a freshly loaded inventory's total load time and memory use.
+
+        Measuring memory walks every stored string, so it is done here, on
+        the thread that loaded the inventory (and before the prefork server
+        forks), rather than by render on a request thread.
+        """
+        timings = inventory.load_timings
+        seconds = timings.get('total', timings.get('snapshot'))
+        if seconds is not None:
+            self.observe('inventory_load_duration_seconds', (), seconds, LOAD_BUCKETS)
+        self._memory = (inventory.data_version, inventory.memory_report())
+
+    def render(self, inventory: Optional[InventoryManager] = None, watcher=None) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        samples = {name: [] for name in FAMILIES}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples[name].append((name, labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    samples[name].append((f'{name}_bucket', labels + (('le', bound),), cumulative))
+                samples[name].append((f'{name}_sum', labels, histogram.sum))
+                samples[name].append((f'{name}_count', labels, histogram.count))
+
+        if inventory is not None:
+            self._inventory_samples(inventory, samples)
+        if watcher is not None:
+            samples['inventory_reloads_total'].append(('inventory_reloads_total', (), watcher.reloads))
+
+        lines = []
+        for name, (kind, help_text) in FAMILIES.items():
+            if not samples[name]:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample, labels, value in samples[name]:
+                lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _inventory_samples(self, inventory: InventoryManager, samples: Dict[str, list]):
+        for phase, seconds in inventory.load_timings.items():
+            if isinstance(seconds, float):
+                samples['inventory_load_phase_seconds'].append(
+                    ('inventory_load_phase_seconds', (('phase', phase),), seconds))
+        for sheet, seconds in inventory.load_timings.get('sheets', {}).items():
+            samples['inventory_sheet_parse_seconds'].append(
+                ('inventory_sheet_parse_seconds', (('sheet', sheet),), seconds))
+
+        # Memory is only reported as measured by observe_load
+        version, report = self._memory
+        if version == inventory.data_version:
+            samples['inventory_rows'].append(('inventory_rows', (), report['rows']))
+            for component, size in report['components'].items():
+                samples['inventory_memory_bytes'].append(('inventory_memory_bytes', (('component', component),), size))
+        samples['inventory_info'].append(
+            ('inventory_info', (('version', inventory.data_version), ('compact', str(inventory.compact).lower())), 1))
+
+
+class InstrumentedInventory:
+    """An InventoryManager whose search and summary methods are timed.
+
+    Every call of INSTRUMENTED_METHODS records its duration, result size
+    and any exception in metrics. Every other attribute is the wrapped
+    manager's. Wrap it in CachedInventory to time only the searches the
+    cache does not answer.
+    """
+
+    def __init__(self, inventory: InventoryManager, metrics: Metrics):
+        self.inventory = inventory
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attribute = getattr(self.inventory, name)
+        if name not in INSTRUMENTED_METHODS:
+            return attribute
+
+        def timed(*args, **kwargs):
+            labels = (('method', name),)
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                self.metrics.inc('inventory_call_errors_total', labels + (('error', type(e).__name__),))
+                raise
+            finally:
+                self.metrics.observe('inventory_call_duration_seconds', labels, time.perf_counter() - start)
+            if name in RESULT_SIZES:
+                self.metrics.observe('inventory_call_results', labels, RESULT_SIZES[name](result),
+                                     RESULT_SIZE_BUCKETS)
+            return result
+        return timed
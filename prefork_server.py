@@ -0,0 +1,245 @@
+"""
+Pre-forking WSGI server for production use of web_app.
+
+The master process loads everything once and forks the workers, which
+share the loaded inventory copy-on-write and accept connections from one
+listening socket. Each worker answers requests on a fixed pool of threads.
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+# Seconds workers get to finish in-flight requests when the server stops
+GRACEFUL_TIMEOUT = 30.0
+
+# A worker exiting within this many seconds of being started failed at
+# startup. Its slot is started again after a delay doubling from
+# RESPAWN_DELAY up to RESPAWN_DELAY_MAX; after CRASH_LOOP_LIMIT such
+# failures in a row the generation is crash-looping and the server stops
+WORKER_STARTUP_SECONDS = 10.0
+RESPAWN_DELAY = 0.5
+RESPAWN_DELAY_MAX = 30.0
+CRASH_LOOP_LIMIT = 5
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # One request per connection, so an idle keep-alive client cannot hold
+    # one of a worker's threads
+    protocol_version = 'HTTP/1.0'
+
+
+class _PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles requests on a bounded thread pool."""
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host: str, port: int, app, threads: int, fd: int):
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self._slots = threading.BoundedSemaphore(threads)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+    def process_request(self, request, client_address):
+        # Stop accepting while every thread is busy, which leaves new
+        # connections to the other workers
+        self._slots.acquire()
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+
+class PreforkServer:
+    """Serve a WSGI app from forked worker processes.
+
+    Whatever the master loaded before serve_forever is inherited by the
+    workers. poll, if given, is called in the master every poll_interval
+    seconds and on SIGHUP; when it returns True (e.g. after reloading the
+    data) the workers are replaced. SIGHUP always replaces them. Workers
+    are replaced gracefully: the new ones start first and the old ones
+    finish their in-flight requests before exiting. SIGTERM or SIGINT stop
+    the server the same way. Workers that keep failing at startup stop it
+    too, with a RuntimeError from serve_forever.
+    """
+
+    def __init__(self, app, host: str = '127.0.0.1', port: int = 5000, workers: Optional[int] = None,
+                 threads: int = 4, backlog: int = 1024, poll: Optional[Callable[[], bool]] = None,
+                 poll_interval: float = 5.0):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.backlog = backlog
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.generation = 0
+        # {pid: (generation, slot, start time)} of the running workers
+        self._workers: Dict[int, Tuple[int, int, float]] = {}
+        # Per slot of the current generation: startup failures in a row, and
+        # when to start a worker in it again
+        self._failures: Dict[int, int] = {}
+        self._respawn_at: Dict[int, float] = {}
+        self._socket = None
+        self._stopping = False
+        self._restart = False
+
+    def _listen(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def serve_forever(self):
+        """Listen, fork the workers and supervise them until stopped."""
+        self._socket = self._listen()
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+        print(f"Master {os.getpid()} serving on http://{self.host}:{self.port} "
+              f"with {self.workers} workers x {self.threads} threads")
+
+        try:
+            self._spawn_workers()
+            next_poll = time.monotonic() + self.poll_interval
+            while not self._stopping:
+                time.sleep(0.2)
+                self._reap_workers()
+
+                restart, self._restart = self._restart, False
+                if self.poll is not None and (restart or time.monotonic() >= next_poll):
+                    restart = self.poll() or restart
+                    next_poll = time.monotonic() + self.poll_interval
+                if restart and not self._stopping:
+                    self._replace_workers()
+        finally:
+            self._stop_workers()
+            self._socket.close()
+            print("Server stopped")
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_restart(self, signum, frame):
+        self._restart = True
+
+    def _spawn_workers(self):
+        """Fork a full set of workers for a new generation."""
+        self.generation += 1
+        # Keep the collector from touching (and so copying) the shared objects in the workers
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        self._failures = {}
+        self._respawn_at = {}
+        for slot in range(self.workers):
+            self._spawn_worker(slot)
+
+    def _spawn_worker(self, slot: int):
+        # Flush first, or the child would print the master's buffered output again
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker()
+            except BaseException as e:
+                print(f"Worker {os.getpid()} failed: {e}", flush=True)
+                code = 1
+            finally:
+                os._exit(code)
+        self._workers[pid] = (self.generation, slot, time.monotonic())
+
+    def _run_worker(self):
+        """Serve requests in a forked worker until SIGTERM."""
+        # The master coordinates shutdown and restarts; a terminal Ctrl+C reaches it too
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        server = _PooledWSGIServer(self.host, self.port, self.app, self.threads, self._socket.fileno())
+        # shutdown() waits for serve_forever, so it cannot run in the handler itself
+        signal.signal(signal.SIGTERM,
+                      lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+        print(f"Worker {os.getpid()} started (generation {self.generation})", flush=True)
+        server.serve_forever()
+        # Finish the requests already accepted
+        server.pool.shutdown(wait=True)
+
+    def _reap_workers(self):
+        """Collect exited workers and start new ones in the current generation's slots.
+
+        A slot whose worker failed at startup is started again with
+        exponential backoff; raises RuntimeError once a slot has failed
+        CRASH_LOOP_LIMIT times in a row.
+        """
+        now = time.monotonic()
+        for pid, (generation, slot, started) in list(self._workers.items()):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if not done:
+                continue
+            del self._workers[pid]
+            if generation != self.generation or self._stopping:
+                continue
+            if now - started >= WORKER_STARTUP_SECONDS:
+                self._failures[slot] = 0
+                self._respawn_at[slot] = now
+                print(f"Worker {pid} exited with status {status}; starting a new one")
+                continue
+            failures = self._failures[slot] = self._failures.get(slot, 0) + 1
+            if failures >= CRASH_LOOP_LIMIT:
+                raise RuntimeError(f"Workers of generation {generation} keep failing at startup "
+                                   f"({failures} times in a row)")
+            delay = min(RESPAWN_DELAY * 2 ** (failures - 1), RESPAWN_DELAY_MAX)
+            self._respawn_at[slot] = now + delay
+            print(f"Worker {pid} failed at startup with status {status}; starting a new one in {delay:g}s")
+
+        for slot, respawn_at in list(self._respawn_at.items()):
+            if respawn_at <= now and not self._stopping:
+                del self._respawn_at[slot]
+                self._spawn_worker(slot)
+
+    def _replace_workers(self):
+        """Start a new generation of workers, then let the old one drain and exit."""
+        old = list(self._workers)
+        self._spawn_workers()
+        for pid in old:
+            self._signal(pid, signal.SIGTERM)
+        print(f"Workers restarted (generation {self.generation})")
+
+    def _stop_workers(self):
+        """Stop every worker, killing the ones still busy after GRACEFUL_TIMEOUT."""
+        for pid in self._workers:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self._workers and time.monotonic() < deadline:
+            for pid in list(self._workers):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    del self._workers[pid]
+            time.sleep(0.1)
+        for pid in self._workers:
+            self._signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self._workers.clear()
+
+    def _signal(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
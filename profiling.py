@@ -0,0 +1,181 @@
+"""
+Opt-in timing breakdowns and cProfile captures of requests and commands.
+
+Code marks the phases of its work with `with phase('name'):`. Outside a
+profiled request or command phase() hands back a shared no-op context,
+so instrumented code only pays for one context-variable lookup.
+"""
+
+import cProfile
+import contextvars
+import io
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+_active = contextvars.ContextVar('profile', default=None)
+_NO_PROFILE = nullcontext()
+
+
+def phase(name: str):
+    """Context manager adding the time spent in it to the active profile's phase name."""
+    profile = _active.get()
+    return _NO_PROFILE if profile is None else profile.phase(name)
+
+
+class Profile:
+    """Timing breakdown of one request or command, optionally under cProfile.
+
+    Used as a context manager around the work (or with start and stop);
+    the phases entered inside it add up their time by name, and whatever
+    they do not cover is reported as 'other'. Phases should not nest.
+    """
+
+    def __init__(self, cprofile: bool = False):
+        self.phases: Dict[str, float] = {}
+        self.total = None
+        self.profiler = cProfile.Profile() if cprofile else None
+        self._token = None
+        self._start = None
+
+    def start(self):
+        self._token = _active.set(self)
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is running in this process (Python 3.12+)
+                self.profiler = None
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.total = time.perf_counter() - self._start
+        if self.profiler is not None:
+            self.profiler.disable()
+        _active.reset(self._token)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def breakdown(self) -> Dict:
+        """{'total_ms', 'phases': {name: ms}} with the uncovered time as phase 'other'."""
+        phases = {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+        phases['other'] = round(max(self.total - sum(self.phases.values()), 0.0) * 1000, 3)
+        return {'total_ms': round(self.total * 1000, 3), 'phases': phases}
+
+    def server_timing(self) -> str:
+        """The breakdown as a Server-Timing header value."""
+        breakdown = self.breakdown()
+        entries = [f'{name};dur={ms}' for name, ms in breakdown['phases'].items()]
+        return ', '.join(entries + [f"total;dur={breakdown['total_ms']}"])
+
+    def report(self) -> str:
+        """The breakdown as printable lines."""
+        breakdown = self.breakdown()
+        lines = [f"Total: {breakdown['total_ms']:.1f} ms"]
+        for name, ms in breakdown['phases'].items():
+            lines.append(f"  - {name}: {ms:.1f} ms ({ms / max(breakdown['total_ms'], 1e-9):.0%})")
+        return '\n'.join(lines)
+
+    def stats(self, limit: int = 25) -> Optional[str]:
+        """The cProfile functions with the most cumulative time, if run under cProfile."""
+        if self.profiler is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def dump(self, path: str) -> bool:
+        """Write the cProfile data to path (for pstats or snakeviz); False if not run under cProfile."""
+        if self.profiler is None:
+            return False
+        self.profiler.dump_stats(path)
+        return True
+
+
+class SlowRequestSampler:
+    """Keeps the profiles of the slowest percent of requests.
+
+    Every request is timed with a phase breakdown; one whose total is at
+    or above the percentile of the last window requests is kept, up to
+    keep of them (the oldest go first). A cprofile_rate fraction of the
+    requests also runs under cProfile so that slow ones come with their
+    hottest functions.
+    """
+
+    def __init__(self, percent: float, keep: int = 50, window: int = 1000, cprofile_rate: float = 0.0):
+        self.percent = percent
+        self.cprofile_rate = cprofile_rate
+        self.requests = 0
+        self._window = window
+        # The last window totals in arrival order, and the same totals kept
+        # sorted so the percentile is a lookup rather than a sort per request
+        self._totals = deque()
+        self._sorted_totals = []
+        self._kept = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def profile(self) -> Profile:
+        """A new Profile for a request."""
+        return Profile(cprofile=random.random() < self.cprofile_rate)
+
+    def threshold(self) -> Optional[float]:
+        """Total seconds from which a request counts as slow, once enough requests were seen."""
+        ordered = self._sorted_totals
+        if len(ordered) < 100 / self.percent:
+            return None
+        return ordered[min(int(len(ordered) * (1 - self.percent / 100)), len(ordered) - 1)]
+
+    def _add_total(self, total: float):
+        if len(self._totals) == self._window:
+            oldest = self._totals.popleft()
+            del self._sorted_totals[bisect_left(self._sorted_totals, oldest)]
+        self._totals.append(total)
+        insort(self._sorted_totals, total)
+
+    def observe(self, profile: Profile, request: str):
+        """Record a finished request's profile, keeping it if it is among the slowest."""
+        with self._lock:
+            self.requests += 1
+            self._add_total(profile.total)
+            threshold = self.threshold()
+            if threshold is None or profile.total < threshold:
+                return
+            entry = {'request': request, 'at': time.time(), **profile.breakdown()}
+            if profile.profiler is not None:
+                entry['stats'] = profile.stats(20)
+            self._kept.append(entry)
+
+    def entries(self) -> List[Dict]:
+        """The kept profiles, slowest first."""
+        with self._lock:
+            return sorted(self._kept, key=lambda entry: entry['total_ms'], reverse=True)
+
+    def status(self) -> Dict:
+        """Sampling settings and counters."""
+        with self._lock:
+            threshold = self.threshold()
+        return {
+            'percent': self.percent,
+            'cprofile_rate': self.cprofile_rate,
+            'requests': self.requests,
+            'threshold_ms': None if threshold is None else round(threshold * 1000, 3),
+            'kept': len(self._kept),
+        }
@@ -0,0 +1,156 @@
+"""
+Memoization of InventoryManager searches.
+
+Search traffic concentrates on a few popular SKUs, keywords and brands;
+CachedInventory answers repeats of those from a bounded LRU cache instead
+of searching again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+from inventory_manager import InventoryManager
+
+_MISSING = object()
+
+
+class QueryCache:
+    """Bounded LRU cache with a time-to-live, holding results of one data version.
+
+    set_version switches the cache to a new data version, dropping every
+    entry at once; lookups for any other version always miss and are not
+    stored, so results of an outgoing manager never mix with the new one.
+    A maxsize of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # {key: (expires_at, value)}
+        self._lock = threading.Lock()
+
+    def set_version(self, version: str):
+        """Start caching results of a new data version."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+            self._entries = OrderedDict()
+
+    def get(self, version: str, key: Hashable):
+        """Cached value for key, or _MISSING."""
+        with self._lock:
+            entry = self._entries.get(key) if version == self.version else None
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, version: str, key: Hashable, value):
+        """Store value for key, evicting the least recently used entries over maxsize."""
+        with self._lock:
+            if version != self.version or self.maxsize <= 0:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, version: str, key: Hashable, compute):
+        """Cached value for key, computing and storing it on a miss."""
+        value = self.get(version, key)
+        if value is _MISSING:
+            value = compute()
+            self.put(version, key, value)
+        return value
+
+    def stats(self) -> Dict:
+        """Hit, miss and eviction counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            'version': self.version,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+class CachedInventory:
+    """An InventoryManager whose search methods are memoized in a QueryCache.
+
+    Results are cached under the normalized arguments (SKUs trimmed and
+    upper-cased, keywords and brands trimmed and lower-cased), so lookups
+    differing only in case or spacing share an entry. Creating one switches
+    the cache to the manager's data version. Cached results are shared
+    between callers and must not be modified. Every other attribute is the
+    wrapped manager's.
+    """
+
+    def __init__(self, inventory: InventoryManager, cache: QueryCache):
+        self.inventory = inventory
+        self.cache = cache
+        cache.set_version(inventory.data_version)
+
+    def __getattr__(self, name):
+        return getattr(self.inventory, name)
+
+    def _cached(self, key: tuple, compute):
+        return self.cache.get_or_compute(self.inventory.data_version, key, compute)
+
+    def search_by_sku(self, sku: str) -> Optional[Dict]:
+        """Cached InventoryManager.search_by_sku."""
+        key = ('sku', str(sku).strip().upper())
+        return self._cached(key, lambda: self.inventory.search_by_sku(sku))
+
+    def search_by_skus(self, skus: List[str]) -> Dict[str, List[Dict]]:
+        """InventoryManager.search_by_skus, not cached.
+
+        Each SKU is a single hash probe, and caching a bulk request's SKUs
+        would evict the popular searches the cache is there for.
+        """
+        return self.inventory.search_by_skus(skus)
+
+    def search_by_keyword(self, keyword: str, max_results: int = 10) -> List[Dict]:
+        """Cached InventoryManager.search_by_keyword."""
+        key = ('keyword', keyword.lower().strip(), max_results)
+        return self._cached(key, lambda: self.inventory.search_by_keyword(keyword, max_results))
+
+    def search_by_brand(self, brand: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Cached InventoryManager.search_by_brand."""
+        key = ('brand', brand.strip().lower(), limit, offset)
+        return self._cached(key, lambda: self.inventory.search_by_brand(brand, limit, offset))
+
+    def count_by_brand(self, brand: str) -> int:
+        """Cached InventoryManager.count_by_brand."""
+        key = ('brand_count', brand.strip().lower())
+        return self._cached(key, lambda: self.inventory.count_by_brand(brand))
+
+    def query(self, keyword: str = '', brand: str = '', status: str = '', limit: int = 20,
+              cursor: Optional[str] = None) -> Dict:
+        """Cached InventoryManager.query."""
+        key = ('query', keyword.lower().strip(), brand.strip().lower(), status.strip().lower(), limit, cursor)
+        return self._cached(key, lambda: self.inventory.query(keyword, brand, status, limit, cursor))
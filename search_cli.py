@@ -6,7 +6,14 @@ Usage: python search_cli.py [command] [arguments]
 
 import sys
 import argparse
-from inventory_manager import InventoryManager
+import signal
+import cli_daemon
+from profiling import Profile, phase
+
+def ask(prompt):
+    """Read an answer; time spent waiting for it is its own profile phase."""
+    with phase('input'):
+        return input(prompt)
 
 def format_item_display(item):
     """Format an item for console display."""
@@ -28,7 +35,12 @@ def format_item_display(item):
 def search_by_sku(inventory, sku):
     """Search for a specific SKU."""
     result = inventory.search_by_sku(sku)
-    if result:
+    if result and result.get('duplicate_count'):
+        matches = inventory.search_by_skus([sku])[sku]
+        print(f"\nFound {len(matches)} items for SKU: {sku} (the SKU is used more than once)")
+        for item in matches:
+            format_item_display(item)
+    elif result:
         print(f"\nFound item for SKU: {sku}")
         format_item_display(result)
     else:
@@ -44,11 +56,11 @@ def search_by_keyword(inventory, keyword, max_results=10):
         
         # Ask if user wants details
         if len(results) == 1:
-            choice = input("\nShow full details? (y/n): ").strip().lower()
+            choice = ask("\nShow full details? (y/n): ").strip().lower()
             if choice == 'y':
                 format_item_display(results[0])
         else:
-            choice = input(f"\nShow details for which item? (1-{len(results)}, 'all', or 'none'): ").strip().lower()
+            choice = ask(f"\nShow details for which item? (1-{len(results)}, 'all', or 'none'): ").strip().lower()
             if choice == 'all':
                 for item in results:
                     format_item_display(item)
@@ -59,17 +71,18 @@ def search_by_keyword(inventory, keyword, max_results=10):
 
 def search_by_brand(inventory, brand):
     """Search by brand."""
-    results = inventory.search_by_brand(brand)
+    results = inventory.search_by_brand(brand, limit=20)  # Limit to 20 for display
     if results:
-        print(f"\nFound {len(results)} items for brand '{brand}':")
-        for i, item in enumerate(results[:20], 1):  # Limit to 20 for display
+        total = inventory.count_by_brand(brand)
+        print(f"\nFound {total} items for brand '{brand}':")
+        for i, item in enumerate(results, 1):
             print(f"{i}. {item['sku']}: {item['product_name']} - {item['status']}")
         
-        if len(results) > 20:
-            print(f"... and {len(results) - 20} more items")
+        if total > 20:
+            print(f"... and {total - 20} more items")
             
-        choice = input(f"\nShow details for which item? (1-{min(20, len(results))}, or 'none'): ").strip()
-        if choice.isdigit() and 1 <= int(choice) <= min(20, len(results)):
+        choice = ask(f"\nShow details for which item? (1-{len(results)}, or 'none'): ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(results):
             format_item_display(results[int(choice) - 1])
     else:
         print(f"\nNo items found for brand '{brand}'")
@@ -88,7 +101,86 @@ def show_summary(inventory):
     print(f"Average Price: ${summary['avg_price']}")
     print(f"\nAvailable Brands:")
     for brand in summary['brand_list']:
-        print(f"  - {brand}")
+        stats = summary['brand_breakdown'][brand]
+        print(f"  - {brand}: {stats['total_items']} items "
+              f"({stats['available_items']} available, {stats['sold_items']} sold)")
+
+def show_memory(inventory):
+    """Show the memory taken by the loaded data and its indexes."""
+    report = inventory.memory_report()
+    mode = "compact" if report['compact'] else "standard"
+    print(f"\nMemory for {report['rows']} items ({mode} mode): {report['total_bytes'] / 1024 / 1024:.1f} MB")
+    for name, size in report['components'].items():
+        print(f"  - {name}: {size / 1024 / 1024:.1f} MB")
+
+def show_profile(profile, dump_path=None):
+    """Show where the time of the command went."""
+    print(f"\n{'='*40}")
+    print("PROFILE")
+    print(f"{'='*40}")
+    print(profile.report())
+    if dump_path:
+        print(profile.stats(15))
+        profile.dump(dump_path)
+        print(f"cProfile data written to {dump_path} (view with: python -m pstats {dump_path})")
+
+def load_inventory(args):
+    """Load the workbook in this process."""
+    # Imported here so that commands answered by the daemon do not load pandas
+    from inventory_manager import InventoryManager
+    return InventoryManager(args.file, workers=args.workers, use_cache=not args.no_cache, compact=args.compact)
+
+def daemon_differences(args, settings):
+    """The load options given on the command line that the daemon was not started with."""
+    requested = {
+        'workers': args.workers,
+        'use_cache': False if args.no_cache else None,
+        'compact': True if args.compact else None,
+    }
+    options = {'workers': '--workers', 'use_cache': '--no-cache', 'compact': '--compact'}
+    return [options[name] for name, value in requested.items()
+            if value is not None and settings.get(name) != value]
+
+def connect_daemon(args):
+    """The running daemon for the workbook, if it can answer this command as asked; else None."""
+    inventory = cli_daemon.RemoteInventory.connect(args.socket or cli_daemon.socket_path(args.file))
+    if inventory is None:
+        return None
+    try:
+        status = inventory.status()
+        data_version = status['data_version']
+    except (OSError, ValueError, RuntimeError, KeyError) as e:
+        # Timeouts and dropped connections, a malformed reply, or a daemon
+        # that failed or does not know the status call
+        inventory.close()
+        print(f"The inventory daemon did not answer properly ({e}); loading here instead")
+        return None
+    differences = daemon_differences(args, status.get('settings', {}))
+    if differences:
+        inventory.close()
+        print(f"The inventory daemon was started without {', '.join(differences)}; loading here instead")
+        return None
+    print(f"Using the inventory daemon (data version {data_version})")
+    return inventory
+
+def serve(args):
+    """Keep the inventory loaded and answer other search_cli commands on a Unix socket."""
+    from inventory_watcher import InventoryWatcher
+    path = args.socket or cli_daemon.socket_path(args.file)
+    
+    print("Loading inventory data...")
+    watcher = InventoryWatcher(load_inventory(args), interval=args.watch_interval)
+    daemon = cli_daemon.InventoryDaemon(watcher, path)
+    print(f"Serving {args.file} on {path}")
+    if args.watch_interval > 0:
+        print(f"Watching it for changes every {args.watch_interval:g}s; press Ctrl+C to stop")
+    
+    # Stop cleanly, removing the socket, on kill as on Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("\nDaemon stopped")
 
 def interactive_mode(inventory):
     """Run interactive mode."""
@@ -107,7 +199,7 @@ def interactive_mode(inventory):
     
     while True:
         try:
-            command = input("\nEnter command: ").strip().lower()
+            command = ask("\nEnter command: ").strip().lower()
             
             if command == 'exit' or command == 'quit':
                 print("Goodbye!")
@@ -164,13 +256,41 @@ def main():
     parser.add_argument('--brand', help='Search by brand')
     parser.add_argument('--summary', action='store_true', help='Show inventory summary')
     parser.add_argument('--interactive', action='store_true', help='Run in interactive mode')
+    parser.add_argument('--serve', action='store_true', help='Keep the inventory loaded and answer other commands from it')
+    parser.add_argument('--socket', help='Unix socket of the daemon (default: one per workbook in the temp directory)')
+    parser.add_argument('--no-daemon', action='store_true', help='Load the workbook even if a daemon is running')
+    parser.add_argument('--watch-interval', type=float, default=5.0, help='Seconds between the daemon\'s checks for a changed workbook (0 disables reloading)')
+    parser.add_argument('--workers', type=int, help='Processes used to parse sheets (default: one per CPU for large workbooks)')
+    parser.add_argument('--no-cache', action='store_true', help='Parse the workbook even if a snapshot is cached')
+    parser.add_argument('--compact', action='store_true', help='Keep a single compact copy of the data (for large catalogs)')
+    parser.add_argument('--memory', action='store_true', help='Show how much memory the loaded data takes')
+    parser.add_argument('--profile', action='store_true', help='Show where the time of the command went')
+    parser.add_argument('--profile-dump', metavar='FILE', help='Also run the command under cProfile and save its data to FILE')
     
     args = parser.parse_args()
     
+    if args.serve:
+        try:
+            serve(args)
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    
+    profile = None
+    if args.profile or args.profile_dump:
+        profile = Profile(cprofile=args.profile_dump is not None)
+        profile.start()
+    
+    inventory = None
     try:
-        print("Loading inventory data...")
-        inventory = InventoryManager(args.file)
-        print("Data loaded successfully!")
+        with phase('load'):
+            if not args.no_daemon:
+                inventory = connect_daemon(args)
+            if inventory is None:
+                print("Loading inventory data...")
+                inventory = load_inventory(args)
+                print("Data loaded successfully!")
         
         if args.sku:
             search_by_sku(inventory, args.sku)
@@ -180,6 +300,8 @@ def main():
             search_by_brand(inventory, args.brand)
         elif args.summary:
             show_summary(inventory)
+        elif args.memory:
+            show_memory(inventory)
         elif args.interactive or len(sys.argv) == 1:
             interactive_mode(inventory)
         else:
@@ -188,6 +310,12 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if isinstance(inventory, cli_daemon.RemoteInventory):
+            inventory.close()
+        if profile is not None:
+            profile.stop()
+            show_profile(profile, args.profile_dump)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,345 @@
+"""
+On-disk columnar snapshots of loaded inventory data.
+
+A snapshot holds the cleaned DataFrame and the per-sheet data as Feather
+files, keyed by the source workbook's content hash and mtime, so a warm
+start can skip parsing the workbook. It can also hold derived structures
+(frames as Feather, numeric arrays as .npy files), so a warm start need not
+rebuild them either. Requires pyarrow; without it the cache is disabled and
+every load parses the workbook.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Optional, Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.inventory_cache')
+
+MANIFEST_NAME = 'manifest.json'
+
+# Entries being written are left behind when their writer dies; they are
+# removed once older than this, or as soon as their writer is gone
+STALE_TMP_SECONDS = 3600
+
+# Bump when the snapshot layout or clean_data output changes
+SNAPSHOT_FORMAT = 3
+
+
+def cache_available() -> bool:
+    """Whether snapshots can be read and written (pyarrow is installed)."""
+    return pa is not None
+
+
+def file_sha256(file_path: str) -> str:
+    """Content hash of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(entry_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(entry_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        return None
+    return manifest
+
+
+def _write_manifest(entry_dir: str, manifest: Dict):
+    tmp_path = os.path.join(entry_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(entry_dir, MANIFEST_NAME))
+
+
+def _is_stale_tmp(tmp_dir: str) -> bool:
+    """Whether an entry being written (named {entry}.tmp{pid}) was abandoned by its writer."""
+    try:
+        if time.time() - os.path.getmtime(tmp_dir) > STALE_TMP_SECONDS:
+            return True
+        pid = int(tmp_dir.rsplit('.tmp', 1)[1])
+    except (OSError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _iter_entries(cache_dir: str):
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        # Entries being written by save_snapshot; abandoned ones are removed
+        if '.tmp' in name:
+            tmp_dir = os.path.join(cache_dir, name)
+            if _is_stale_tmp(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            continue
+        entry_dir = os.path.join(cache_dir, name)
+        manifest = _read_manifest(entry_dir)
+        if manifest is not None:
+            yield entry_dir, manifest
+
+
+def source_key(file_path: str, sha256: Optional[str] = None) -> Dict:
+    """Identify a workbook by path, size, mtime and (optionally) content hash."""
+    stat = os.stat(file_path)
+    return {
+        'source': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256,
+    }
+
+
+def find_snapshot(file_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Tuple[Optional[str], Dict]:
+    """Find the snapshot for a workbook.
+
+    An entry whose recorded path, size and mtime match is used without
+    hashing; otherwise the file is hashed and matched by content, so a
+    touched-but-unchanged workbook still hits. Returns (entry_dir or None,
+    source key); the key carries the content hash when one was computed.
+    """
+    key = source_key(file_path)
+    for entry_dir, manifest in _iter_entries(cache_dir):
+        if (manifest['source'] == key['source'] and manifest['size'] == key['size']
+                and manifest['mtime_ns'] == key['mtime_ns']):
+            key['sha256'] = manifest['sha256']
+            return entry_dir, key
+
+    key['sha256'] = file_sha256(file_path)
+    entry_dir = os.path.join(cache_dir, key['sha256'][:16])
+    manifest = _read_manifest(entry_dir)
+    if manifest is not None and manifest['sha256'] == key['sha256']:
+        # Same content under a new mtime or path; remember it for the fast path
+        manifest.update(source=key['source'], size=key['size'], mtime_ns=key['mtime_ns'])
+        _write_manifest(entry_dir, manifest)
+        return entry_dir, key
+    return None, key
+
+
+def _is_datetime(value) -> bool:
+    return isinstance(value, (datetime, np.datetime64))
+
+
+def _is_integer(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (float, np.floating))
+
+
+def _split_mixed(values: pd.Series) -> Dict[str, pd.Series]:
+    """Split an object column Arrow cannot type into datetime, integer, number and text parts.
+
+    Integers are kept apart from floats so that they come back as integers:
+    clean_data turns an integer SKU 4242 into '4242', a float into '4242.0'.
+    """
+    present = values.notna()
+    is_datetime = present & values.map(_is_datetime).astype(bool)
+    is_integer = present & ~is_datetime & values.map(_is_integer).astype(bool)
+    is_number = present & ~is_datetime & values.map(_is_number).astype(bool)
+    is_text = present & ~is_datetime & ~is_integer & ~is_number
+    return {
+        'datetime': pd.to_datetime(values.where(is_datetime), errors='coerce'),
+        'integer': pd.array(values.where(is_integer).tolist(), dtype='Int64'),
+        'number': pd.to_numeric(values.where(is_number), errors='coerce'),
+        'text': values.where(is_text).map(lambda v: str(v) if pd.notna(v) else None).astype(object),
+    }
+
+
+def _join_mixed(parts: Dict[str, pd.Series]) -> pd.Series:
+    """Rebuild a column split by _split_mixed."""
+    values = np.full(len(parts['text']), np.nan, dtype=object)
+    for part in ('text', 'integer', 'number', 'datetime'):
+        column = parts[part]
+        present = column.notna().to_numpy()
+        column = column[present]
+        if part == 'integer':
+            # Arrow hands integers with gaps back as floats
+            column = column.astype(np.int64)
+        values[present] = column.astype(object).to_numpy()
+    return pd.Series(values, dtype=object)
+
+
+def _to_arrow_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+    """Make a DataFrame Feather-writable; returns it and the mixed-column layout."""
+    frame = df.reset_index(drop=True)
+    frame.columns = [str(col) for col in frame.columns]
+    columns = {}
+    mixed = {}
+    for i, col in enumerate(frame.columns):
+        values = frame.iloc[:, i]
+        if values.dtype == object:
+            try:
+                pa.array(values, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                mixed[col] = {}
+                for part, part_values in _split_mixed(values).items():
+                    stored_name = f'__mixed_{i}_{part}'
+                    mixed[col][part] = stored_name
+                    columns[stored_name] = part_values
+                continue
+        columns[col] = values
+    return pd.DataFrame(columns), {'columns': list(frame.columns), 'mixed': mixed}
+
+
+def _from_arrow_frame(df: pd.DataFrame, layout: Dict) -> pd.DataFrame:
+    """Undo _to_arrow_frame."""
+    columns = {}
+    for col in layout['columns']:
+        if col in layout['mixed']:
+            parts = {part: df[stored] for part, stored in layout['mixed'][col].items()}
+            columns[col] = _join_mixed(parts)
+        else:
+            columns[col] = df[col]
+    return pd.DataFrame(columns)
+
+
+def _write_frame(df: pd.DataFrame, path: str) -> Dict:
+    frame, layout = _to_arrow_frame(df)
+    # Uncompressed so numeric columns can be memory-mapped without a copy
+    feather.write_feather(frame, path, compression='uncompressed')
+    return layout
+
+
+def _read_frame(path: str, layout: Dict) -> pd.DataFrame:
+    table = feather.read_table(path, memory_map=True)
+    return _from_arrow_frame(table.to_pandas(), layout)
+
+
+class LazySheets(Mapping):
+    """The per-sheet data of a snapshot entry, each sheet read on first access.
+
+    Only a reload that reuses unchanged sheets needs them, so a warm start
+    does not read them. Raises OSError for a sheet whose entry was removed
+    before it was read.
+    """
+
+    def __init__(self, entry_dir: str, sheets: list):
+        self._entry_dir = entry_dir
+        self._sheets = {sheet['name']: sheet for sheet in sheets}
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        with self._lock:
+            if name not in self._loaded:
+                sheet = self._sheets[name]
+                self._loaded[name] = _read_frame(os.path.join(self._entry_dir, sheet['file']), sheet['layout'])
+            return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self._sheets)
+
+    def __len__(self) -> int:
+        return len(self._sheets)
+
+    def loaded(self) -> Dict[str, pd.DataFrame]:
+        """The sheets read so far."""
+        with self._lock:
+            return dict(self._loaded)
+
+
+def load_snapshot(entry_dir: str) -> Tuple[pd.DataFrame, LazySheets, Dict]:
+    """Read a snapshot entry: (cleaned data, per-sheet data read on access, manifest)."""
+    manifest = _read_manifest(entry_dir)
+    data = _read_frame(os.path.join(entry_dir, manifest['data']['file']), manifest['data']['layout'])
+    return data, LazySheets(entry_dir, manifest['sheets']), manifest
+
+
+def load_derived(entry_dir: str, manifest: Dict) -> Dict[str, Union[pd.DataFrame, np.ndarray]]:
+    """The derived structures saved with a snapshot entry; arrays are memory-mapped read-only."""
+    derived = {}
+    for name, stored in manifest.get('derived', {}).items():
+        path = os.path.join(entry_dir, stored['file'])
+        if stored['layout'] is None:
+            derived[name] = np.load(path, mmap_mode='r')
+        else:
+            derived[name] = _read_frame(path, stored['layout'])
+    return derived
+
+
+def save_snapshot(key: Dict, data: pd.DataFrame, sheets: Dict[str, pd.DataFrame],
+                  cache_dir: str = DEFAULT_CACHE_DIR, extra: Optional[Dict] = None,
+                  derived: Optional[Dict[str, Union[pd.DataFrame, np.ndarray]]] = None) -> str:
+    """Write a snapshot for the workbook identified by key (from find_snapshot).
+
+    derived maps names to DataFrames or numeric arrays to store alongside,
+    returned by load_derived. Older snapshots of the same workbook are
+    removed. Returns the entry dir; if another process wrote the same entry
+    first, its entry is kept.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, key['sha256'][:16])
+    tmp_dir = f'{entry_dir}.tmp{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        _write_entry(tmp_dir, key, data, sheets, extra, derived)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    for old_dir, old_manifest in list(_iter_entries(cache_dir)):
+        if old_manifest['source'] == key['source']:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    # Entries of another format are not listed, but may hold this entry's name
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        manifest = _read_manifest(entry_dir)
+        if manifest is None or manifest['sha256'] != key['sha256']:
+            raise
+        # Another process saved the same workbook between the rmtree and the rename
+    return entry_dir
+
+
+def _write_entry(tmp_dir: str, key: Dict, data: pd.DataFrame, sheets: Dict[str, pd.DataFrame],
+                 extra: Optional[Dict], derived: Optional[Dict[str, Union[pd.DataFrame, np.ndarray]]]):
+    """Write the files and manifest of a snapshot entry into tmp_dir."""
+    manifest = dict(key, format=SNAPSHOT_FORMAT, created=time.time(), sheets=[])
+    manifest['data'] = {'file': 'data.feather', 'layout': _write_frame(data, os.path.join(tmp_dir, 'data.feather'))}
+    for i, (name, df_sheet) in enumerate(sheets.items()):
+        file_name = f'sheet_{i:03d}.feather'
+        layout = _write_frame(df_sheet, os.path.join(tmp_dir, file_name))
+        manifest['sheets'].append({'name': name, 'file': file_name, 'layout': layout})
+    manifest['derived'] = {}
+    for name, value in (derived or {}).items():
+        if isinstance(value, pd.DataFrame):
+            file_name = f'derived_{name}.feather'
+            layout = _write_frame(value, os.path.join(tmp_dir, file_name))
+        else:
+            file_name, layout = f'derived_{name}.npy', None
+            np.save(os.path.join(tmp_dir, file_name), np.asarray(value))
+        manifest['derived'][name] = {'file': file_name, 'layout': layout}
+    manifest.update(extra or {})
+    _write_manifest(tmp_dir, manifest)
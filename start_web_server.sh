@@ -8,7 +8,17 @@ cd "$(dirname "$0")"
 echo "📁 Working directory: $(pwd)"
 echo "📊 Loading inventory data..."
 
-python3 web_app.py
+# ./start_web_server.sh production [extra web_app.py options]
+# runs the pre-forking server; WEB_WORKERS, WEB_THREADS, WEB_HOST and
+# WEB_PORT configure it. kill -HUP the master to restart its workers.
+if [ "$1" = "production" ]; then
+    shift
+    echo "🏭 Production mode: ${WEB_WORKERS:-one per CPU} workers, ${WEB_THREADS:-4} threads each"
+    python3 web_app.py --production --threads "${WEB_THREADS:-4}" ${WEB_WORKERS:+--workers "$WEB_WORKERS"} \
+        --host "${WEB_HOST:-127.0.0.1}" --port "${WEB_PORT:-5000}" "$@"
+else
+    python3 web_app.py "$@"
+fi
 
 echo ""
 echo "✅ Server stopped. Goodbye!"
@@ -0,0 +1,104 @@
+"""The ASGI app driven directly, without a server."""
+
+import asyncio
+import json
+
+import pytest
+
+import asgi_app
+
+xlwt = pytest.importorskip('xlwt')
+
+
+def _write_workbook(path):
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet('Chanel')
+    for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+        sheet.write(0, column, header)
+    for row in range(1, 4):
+        sheet.write(row, 0, f'CH{row:02d}')
+        sheet.write(row, 1, f'Flap bag {row}')
+        sheet.write(row, 2, 100.0 * row)
+    workbook.save(str(path))
+
+
+async def _request(app, path, messages=None):
+    """Run one GET request; returns the messages the app sent."""
+    sent = [] if messages is None else messages
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': []}
+    await app(scope, receive, send)
+    return sent
+
+
+def test_lifespan_startup_loads_the_workbook_from_the_environment(tmp_path, monkeypatch):
+    _write_workbook(tmp_path / 'inventory.xls')
+    monkeypatch.setenv('INVENTORY_FILE', str(tmp_path / 'inventory.xls'))
+    monkeypatch.setenv('INVENTORY_NO_CACHE', '1')
+    monkeypatch.setenv('INVENTORY_WATCH_INTERVAL', '0')
+    monkeypatch.setattr(asgi_app, 'inventory', None)
+    monkeypatch.setattr(asgi_app, 'watcher', None)
+    app = asgi_app.InventoryASGIApp(lambda: asgi_app.inventory, startup=asgi_app.load_from_environment)
+
+    async def run():
+        events = asyncio.Queue()
+        await events.put({'type': 'lifespan.startup'})
+        lifespan_sent = []
+
+        async def send(message):
+            lifespan_sent.append(message)
+
+        lifespan = asyncio.ensure_future(app({'type': 'lifespan'}, events.get, send))
+        while not lifespan_sent:
+            await asyncio.sleep(0.01)
+        response = await _request(app, '/api/summary')
+        await events.put({'type': 'lifespan.shutdown'})
+        await lifespan
+        return lifespan_sent, response
+
+    lifespan_sent, response = asyncio.run(run())
+    assert lifespan_sent[0] == {'type': 'lifespan.startup.complete'}
+    assert response[0]['status'] == 200
+    assert json.loads(response[1]['body'])['total_items'] == 3
+
+
+def test_lifespan_startup_failure_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setenv('INVENTORY_FILE', str(tmp_path / 'missing.xls'))
+    monkeypatch.setattr(asgi_app, 'inventory', None)
+    app = asgi_app.InventoryASGIApp(lambda: asgi_app.inventory, startup=asgi_app.load_from_environment)
+    sent = []
+
+    async def receive():
+        return {'type': 'lifespan.startup'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({'type': 'lifespan'}, receive, send))
+    assert [message['type'] for message in sent] == ['lifespan.startup.failed']
+
+
+def test_stream_failure_after_start_aborts_the_response():
+    app = asgi_app.InventoryASGIApp(lambda: None)
+
+    def chunks():
+        yield b'sku,name\n'
+        raise OSError('disk gone')
+
+    async def export(params, send):
+        await app._stream(send, chunks(), 'text/csv')
+
+    app.export = export
+    sent = []
+    with pytest.raises(asgi_app.StreamAborted):
+        asyncio.run(_request(app, '/api/export', sent))
+
+    assert [message['type'] for message in sent] == ['http.response.start', 'http.response.body']
+    assert sent[1]['more_body'] is True
+    assert 'inventory_http_errors_total{route="/api/export",error="OSError"} 1' in app.metrics.render()
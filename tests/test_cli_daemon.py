@@ -0,0 +1,104 @@
+"""search_cli commands answered by the inventory daemon."""
+
+import argparse
+import socket
+import threading
+import time
+
+import pytest
+
+import cli_daemon
+import search_cli
+from inventory_manager import InventoryManager
+from inventory_watcher import InventoryWatcher
+
+xlwt = pytest.importorskip('xlwt')
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='the daemon needs Unix sockets')
+
+
+def _write_workbook(path):
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet('Chanel')
+    for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+        sheet.write(0, column, header)
+    sheet.write(1, 0, 'CH01')
+    sheet.write(1, 1, 'Flap bag')
+    sheet.write(1, 2, 10.0)
+    workbook.save(str(path))
+
+
+def _args(path, **options):
+    args = dict(file=str(path), socket=str(path) + '.sock', workers=None, no_cache=False, compact=False)
+    return argparse.Namespace(**dict(args, **options))
+
+
+@pytest.fixture
+def daemon_args(tmp_path):
+    workbook = tmp_path / 'inventory.xls'
+    _write_workbook(workbook)
+    args = _args(workbook)
+    watcher = InventoryWatcher(InventoryManager(str(workbook), use_cache=False), interval=0)
+    daemon = cli_daemon.InventoryDaemon(watcher, args.socket)
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if (tmp_path / 'inventory.xls.sock').exists():
+            break
+        time.sleep(0.05)
+    return args
+
+
+def test_daemon_answers_with_the_settings_it_was_started_with(daemon_args):
+    inventory = search_cli.connect_daemon(daemon_args)
+    try:
+        assert inventory.status()['settings'] == {'workers': None, 'use_cache': False, 'compact': False}
+        assert inventory.search_by_sku('CH01')['product_name'] == 'Flap bag'
+    finally:
+        inventory.close()
+
+    # It was not started with these, so the command loads the workbook itself
+    assert search_cli.connect_daemon(_args(daemon_args.file, compact=True)) is None
+    assert search_cli.connect_daemon(_args(daemon_args.file, workers=2)) is None
+    inventory = search_cli.connect_daemon(_args(daemon_args.file, no_cache=True))
+    assert inventory is not None
+    inventory.close()
+
+
+def test_unanswered_call_times_out(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / 'silent.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+    try:
+        monkeypatch.setattr(cli_daemon, 'DAEMON_TIMEOUT', 0.2)
+        assert search_cli.connect_daemon(_args(tmp_path / 'inventory.xls', socket=path)) is None
+        assert 'did not answer' in capsys.readouterr().out
+    finally:
+        listener.close()
+
+
+@pytest.mark.parametrize('reply', [
+    b'not json\n',
+    b'{"error": "boom", "type": "ZeroDivisionError"}\n',
+    b'{"error": "Unknown method \'status\'", "type": "ValueError"}\n',
+    b'{"result": {"settings": {}}}\n',
+])
+def test_bad_status_reply_falls_back_to_a_local_load(tmp_path, capsys, reply):
+    path = str(tmp_path / 'broken.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+
+    def answer():
+        connection, _ = listener.accept()
+        with connection:
+            connection.makefile('rb').readline()
+            connection.sendall(reply)
+
+    thread = threading.Thread(target=answer, daemon=True)
+    thread.start()
+    try:
+        assert search_cli.connect_daemon(_args(tmp_path / 'inventory.xls', socket=path)) is None
+        assert 'loading here instead' in capsys.readouterr().out
+    finally:
+        thread.join(timeout=5)
+        listener.close()
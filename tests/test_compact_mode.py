@@ -0,0 +1,86 @@
+"""Compact mode answers every lookup exactly as the standard mode does."""
+
+from datetime import datetime
+
+import pytest
+
+from inventory_manager import InventoryManager, MAIN_SHEET_NAME
+
+xlwt = pytest.importorskip('xlwt')
+
+HEADERS = ['SKU', 'Bag Name', 'Bag Cost', 'Bag Price', 'Sold Date', 'Gross Profit', 'Notes']
+
+
+def _write_workbook(path):
+    """The main sheet, brand sheets with repeated values and gaps, and a sheet without SKUs."""
+    date_style = xlwt.easyxf(num_format_str='YYYY-MM-DD')
+    workbook = xlwt.Workbook()
+    sku = 500
+    for brand in (MAIN_SHEET_NAME, 'Chanel', 'Gucci', 'Louis Vuitton'):
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(HEADERS):
+            sheet.write(0, column, header)
+        for row in range(1, 16):
+            sku += 1
+            sheet.write(row, 0, sku if row % 3 == 0 else f'{brand[:2].upper()}{sku}')
+            sheet.write(row, 1, f'{brand.split()[-1]} {"Mini Flap" if row % 2 else "Wallet"}')
+            if row % 7:
+                sheet.write(row, 2, 100.0 * (row % 4))
+            sheet.write(row, 3, 250.0 * (row % 4))
+            if row % 4 == 0:
+                sheet.write(row, 4, datetime(2024, 5, row), date_style)
+                sheet.write(row, 5, 150.0 * (row % 4))
+            sheet.write(row, 6, 'consignment' if row % 5 == 0 else '')
+        sheet.write(16, 1, 'row without a SKU')
+    notes = workbook.add_sheet('Notes')
+    notes.write(0, 0, 'Supplier')
+    notes.write(1, 0, 'Paris')
+    workbook.save(str(path))
+
+
+@pytest.fixture(scope='module')
+def inventories(tmp_path_factory):
+    path = tmp_path_factory.mktemp('compact') / 'inventory.xls'
+    _write_workbook(path)
+    return (InventoryManager(str(path), use_cache=False),
+            InventoryManager(str(path), use_cache=False, compact=True))
+
+
+def _answers(inventory):
+    """Everything a client can ask of an inventory, in a comparable form."""
+    skus = [str(sku) for sku in inventory.data['SKU']] + ['missing', ' ch501 ']
+    answers = {
+        'summary': inventory.get_inventory_summary(),
+        'brands': inventory.get_all_brands(),
+        'sku': [inventory.search_by_sku(sku) for sku in skus],
+        'skus': inventory.search_by_skus(skus),
+        'export': list(inventory.export_rows(chunk_size=7)),
+        # Compact sheets are slices of the cleaned data, so only their names compare
+        'sheets': list(inventory.all_sheets_data),
+    }
+    for keyword in ('', 'mini', 'wallet', 'ch5', '5', 'flap w', 'zz'):
+        answers[f'keyword {keyword}'] = inventory.search_by_keyword(keyword, max_results=100)
+        for status in ('', 'available', 'sold'):
+            answers[f'query {keyword} {status}'] = inventory.query(keyword=keyword, brand='gu', status=status)
+    for brand in ('chanel', 'Mixed', 'vuitton', 'nope'):
+        answers[f'brand {brand}'] = (inventory.search_by_brand(brand, limit=5, offset=2),
+                                     inventory.count_by_brand(brand))
+    for prefix in ('m', 'wa', 'ch', '5', 'louis'):
+        answers[f'suggest {prefix}'] = inventory.suggest(prefix, limit=20)
+    return answers
+
+
+def test_compact_mode_returns_the_same_results(inventories):
+    standard, compact = inventories
+    assert compact.compact and not standard.compact
+    expected = _answers(standard)
+    found = _answers(compact)
+    assert found.keys() == expected.keys()
+    for name in expected:
+        assert found[name] == expected[name], name
+
+
+def test_compact_mode_holds_less(inventories):
+    standard, compact = inventories
+    assert compact.memory_report()['total_bytes'] < standard.memory_report()['total_bytes']
+    assert len(compact.data.columns) < len(standard.data.columns)
@@ -0,0 +1,42 @@
+"""Reloading by InventoryWatcher."""
+
+import os
+
+import pytest
+
+from inventory_manager import InventoryManager
+from inventory_watcher import InventoryWatcher
+
+xlwt = pytest.importorskip('xlwt')
+
+
+def _write_workbook(path, cost):
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet('Chanel')
+    for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+        sheet.write(0, column, header)
+    sheet.write(1, 0, 'CH01')
+    sheet.write(1, 1, 'Flap bag')
+    sheet.write(1, 2, cost)
+    workbook.save(str(path))
+
+
+def test_touched_workbook_is_not_reloaded(tmp_path):
+    workbook = tmp_path / 'inventory.xls'
+    _write_workbook(workbook, 1.0)
+    reloaded = []
+    watcher = InventoryWatcher(InventoryManager(str(workbook), use_cache=False), interval=0,
+                               on_reload=reloaded.append)
+    first = watcher.current
+
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert watcher.check() is False
+    assert watcher.current is first
+    assert watcher.reloads == 0 and reloaded == []
+
+    _write_workbook(workbook, 2.0)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    assert watcher.check() is True
+    assert watcher.current.search_by_sku('CH01')['cost'] == '$2.00'
+    assert reloaded == [watcher.current]
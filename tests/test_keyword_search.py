@@ -0,0 +1,74 @@
+"""search_by_keyword's trigram index against a plain substring scan."""
+
+import random
+
+import pytest
+
+from inventory_manager import InventoryManager
+
+xlwt = pytest.importorskip('xlwt')
+
+NAMES = [
+    'Classic Flap Bag', 'Mini (Black) Wallet', 'Boy Bag [25cm]', 'Speedy 30 $ Edition', 'Neverfull MM+',
+    'Kelly 28 * Gold', 'Évelyne PM', 'Pochette Métis?', 'Dionysus ^Mini^', 'Jackie|1961', 'a.b.c Tote',
+    'Back\\slash Clutch', 'GG Marmont {Small}', 'Birkin 30 Étoupe', 'Aaa aaa', 'Lady Dior',
+]
+
+KEYWORDS = [
+    # Shorter than a trigram
+    'a', 'b', 'é', '1', '.', '(', '*', '$', 'aa', 'ag', 'mm', '30', 'g\\', '+',
+    # Regular expression metacharacters
+    '(black)', '[25cm]', '$ e', 'mm+', '* g', 'métis?', '^mini^', 'jackie|1961', 'a.b', '.b.', 'k\\s',
+    '{small}', 'e|1', '.*', 'a+',
+    # Words, phrases and SKUs
+    'bag', 'flap bag', 'aaa', 'aaa aaa', 'étoupe', 'kelly 28', 'ch-1', '100', 'gu-', 'zzz', 'bag bag',
+]
+
+
+def _write_workbook(path):
+    """Sheets of shuffled names with text and numeric SKUs."""
+    rng = random.Random(5)
+    workbook = xlwt.Workbook()
+    sku = 1000
+    for brand in ('Chanel', 'Gucci', 'Hermès'):
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+            sheet.write(0, column, header)
+        for row in range(1, 41):
+            sku += 3
+            sheet.write(row, 0, sku if row % 4 == 0 else f'{brand[:2].upper()}-{sku}')
+            sheet.write(row, 1, rng.choice(NAMES))
+            sheet.write(row, 2, 10.0 * row)
+    workbook.save(str(path))
+
+
+@pytest.fixture(scope='module')
+def inventory(tmp_path_factory):
+    path = tmp_path_factory.mktemp('keyword') / 'inventory.xls'
+    _write_workbook(path)
+    return InventoryManager(str(path), use_cache=False)
+
+
+def _scan(inventory, keyword):
+    """SKU matches, then name matches of the other rows, found with str.contains."""
+    skus = inventory.data['SKU'].str.lower().reset_index(drop=True)
+    names = inventory.data['Product_Name'].astype(str).str.lower().reset_index(drop=True)
+    in_sku = skus.str.contains(keyword, regex=False)
+    in_name = names.str.contains(keyword, regex=False) & ~in_sku
+    original = inventory.data['SKU'].reset_index(drop=True)
+    return original[in_sku].tolist() + original[in_name].tolist()
+
+
+@pytest.mark.parametrize('keyword', KEYWORDS)
+def test_trigram_search_matches_a_plain_scan(inventory, keyword):
+    expected = _scan(inventory, keyword)
+    total = len(inventory.data)
+    assert [item['sku'] for item in inventory.search_by_keyword(keyword, max_results=total)] == expected
+    for limit in (1, 3, 17):
+        assert [item['sku'] for item in inventory.search_by_keyword(keyword, max_results=limit)] == expected[:limit]
+
+
+def test_keyword_case_and_surrounding_space_are_ignored(inventory):
+    total = len(inventory.data)
+    assert inventory.search_by_keyword('  FLAP Bag ', total) == inventory.search_by_keyword('flap bag', total)
+    assert inventory.search_by_keyword('   ', total) == []
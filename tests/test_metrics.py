@@ -0,0 +1,40 @@
+"""Prometheus metrics of the web apps."""
+
+from metrics import Metrics
+
+
+class _Inventory:
+    """The attributes Metrics reads from an InventoryManager."""
+
+    def __init__(self, data_version):
+        self.data_version = data_version
+        self.compact = False
+        self.load_timings = {'total': 0.5}
+        self.memory_reports = 0
+
+    def memory_report(self):
+        self.memory_reports += 1
+        return {'rows': 3, 'compact': False, 'components': {'data': 1000}}
+
+
+def test_memory_is_measured_at_load_not_on_render():
+    metrics = Metrics()
+    inventory = _Inventory('v1')
+    metrics.observe_load(inventory)
+    assert inventory.memory_reports == 1
+
+    for _ in range(3):
+        text = metrics.render(inventory)
+    assert inventory.memory_reports == 1
+    assert 'inventory_rows 3' in text
+    assert 'inventory_memory_bytes{component="data"} 1000' in text
+
+
+def test_inventory_not_observed_is_rendered_without_memory():
+    metrics = Metrics()
+    metrics.observe_load(_Inventory('v1'))
+    newer = _Inventory('v2')
+    text = metrics.render(newer)
+    assert newer.memory_reports == 0
+    assert 'inventory_rows' not in text
+    assert 'inventory_info{version="v2",compact="false"} 1' in text
@@ -0,0 +1,82 @@
+"""The prefork master restarting workers that exit, without forking any."""
+
+import gc
+
+import pytest
+
+import prefork_server
+
+
+@pytest.fixture
+def master(monkeypatch):
+    """A server with two worker slots whose workers are fake pids, on a manual clock."""
+    clock = [100.0]
+    exited = set()
+    server = prefork_server.PreforkServer(app=None, workers=2)
+    server.started = []
+
+    def spawn(slot):
+        pid = 1000 + len(server.started)
+        server.started.append(slot)
+        server._workers[pid] = (server.generation, slot, clock[0])
+
+    monkeypatch.setattr(prefork_server.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(prefork_server.os, 'waitpid',
+                        lambda pid, options: (pid, 256) if pid in exited else (0, 0))
+    monkeypatch.setattr(server, '_spawn_worker', spawn)
+    server._spawn_workers()
+    yield server, clock, exited
+    gc.unfreeze()
+
+
+def _exit(server, exited, slot):
+    exited.update(pid for pid, (_, worker_slot, _) in server._workers.items() if worker_slot == slot)
+
+
+def test_startup_failures_are_restarted_with_backoff(master):
+    server, clock, exited = master
+    for delay in (0.5, 1.0, 2.0):
+        _exit(server, exited, 0)
+        server._reap_workers()
+        started = len(server.started)
+        clock[0] += delay - 0.1
+        server._reap_workers()
+        assert len(server.started) == started
+        clock[0] += 0.1
+        server._reap_workers()
+        assert server.started[-1] == 0 and len(server.started) == started + 1
+    assert len(server._workers) == 2
+
+
+def test_worker_that_ran_for_a_while_is_restarted_at_once(master):
+    server, clock, exited = master
+    _exit(server, exited, 1)
+    server._reap_workers()
+    clock[0] += 0.5
+    server._reap_workers()
+    assert server._failures[1] == 1
+
+    clock[0] += prefork_server.WORKER_STARTUP_SECONDS
+    _exit(server, exited, 1)
+    server._reap_workers()
+    assert server.started[-1] == 1 and len(server._workers) == 2
+    assert server._failures[1] == 0
+
+
+def test_crash_looping_generation_stops_the_server(master):
+    server, clock, exited = master
+    with pytest.raises(RuntimeError, match='generation 1 keep failing'):
+        for _ in range(prefork_server.CRASH_LOOP_LIMIT):
+            _exit(server, exited, 0)
+            server._reap_workers()
+            clock[0] += prefork_server.RESPAWN_DELAY_MAX
+            server._reap_workers()
+    assert server._failures[0] == prefork_server.CRASH_LOOP_LIMIT
+
+
+def test_old_generation_exits_are_not_restarted(master):
+    server, clock, exited = master
+    server._spawn_workers()
+    exited.update(pid for pid, (generation, _, _) in server._workers.items() if generation == 1)
+    server._reap_workers()
+    assert len(server._workers) == 2 and len(server.started) == 4
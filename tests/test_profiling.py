@@ -0,0 +1,36 @@
+"""SlowRequestSampler's percentile over its window of recent requests."""
+
+import random
+
+from profiling import SlowRequestSampler
+
+
+class _Profile:
+    profiler = None
+
+    def __init__(self, total):
+        self.total = total
+
+    def breakdown(self):
+        return {'total_ms': self.total * 1000}
+
+
+def _percentile(totals, percent):
+    ordered = sorted(totals)
+    return ordered[min(int(len(ordered) * (1 - percent / 100)), len(ordered) - 1)]
+
+
+def test_threshold_is_the_percentile_of_the_window():
+    rng = random.Random(3)
+    sampler = SlowRequestSampler(5, keep=1000, window=200)
+    totals = []
+    for i in range(1000):
+        total = round(rng.expovariate(20), 4) if i % 7 else 0.05
+        totals.append(total)
+        sampler.observe(_Profile(total), f'/api/search?{i}')
+        expected = _percentile(totals[-200:], 5) if len(totals) >= 20 else None
+        assert sampler.threshold() == expected
+        if expected is not None and total >= expected:
+            assert sampler._kept[-1]['request'] == f'/api/search?{i}'
+    assert sampler.status()['requests'] == 1000
+    assert sorted(sampler._totals) == sampler._sorted_totals == sorted(totals[-200:])
@@ -0,0 +1,104 @@
+"""InventoryManager.query: filters, cursor paging and stale cursors."""
+
+from datetime import datetime
+
+import pytest
+
+from inventory_manager import InventoryManager, RESULT_FIELDS
+
+xlwt = pytest.importorskip('xlwt')
+
+BRANDS = ['Chanel', 'Gucci', 'Louis Vuitton']
+
+# Brand filters and the brands they select
+BRAND_FILTERS = {'': None, 'chanel': {'Chanel'}, 'gu': {'Gucci'}, 'vuitton': {'Louis Vuitton'}}
+
+KEYWORDS = ['', 'bag', 'ch', 'mini', 'gu0', 'flap 1', 'zz']
+
+
+def _write_workbook(path, rows=13, price=100.0):
+    """One sheet per brand; every third row is sold and some SKUs contain 'bag'."""
+    date_style = xlwt.easyxf(num_format_str='YYYY-MM-DD')
+    workbook = xlwt.Workbook()
+    for brand in BRANDS:
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Price', 'Sold Date']):
+            sheet.write(0, column, header)
+        for row in range(1, rows + 1):
+            prefix = 'BAG' if row % 5 == 0 else brand[:2].upper()
+            sheet.write(row, 0, f'{prefix}{row:02d}{brand[0]}')
+            sheet.write(row, 1, f'{brand} {"Mini" if row % 2 else "Flap"} {row} Bag')
+            sheet.write(row, 2, price * row)
+            if row % 3 == 0:
+                sheet.write(row, 3, datetime(2024, 3, row), date_style)
+    workbook.save(str(path))
+
+
+def _expected(inventory, keyword, brand, status):
+    """The results of a query worked out with a plain scan over every row."""
+    rows = [dict(zip(RESULT_FIELDS, row)) for chunk in inventory.export_rows() for row in chunk]
+    brands = BRAND_FILTERS[brand]
+    rows = [row for row in rows
+            if (brands is None or row['brand'] in brands)
+            and (not status or row['status'] == status.upper())]
+    if not keyword:
+        return rows
+    sku_matches = [row for row in rows if keyword in row['sku'].lower()]
+    name_matches = [row for row in rows
+                    if keyword not in row['sku'].lower() and keyword in row['product_name'].lower()]
+    return sku_matches + name_matches
+
+
+def _all_pages(inventory, limit, **filters):
+    results, cursor = [], None
+    while True:
+        page = inventory.query(limit=limit, cursor=cursor, **filters)
+        assert len(page['results']) <= limit
+        results += page['results']
+        cursor = page['next_cursor']
+        if cursor is None:
+            return results, page['total']
+
+
+@pytest.fixture(scope='module')
+def inventory(tmp_path_factory):
+    path = tmp_path_factory.mktemp('query') / 'inventory.xls'
+    _write_workbook(path)
+    return InventoryManager(str(path), use_cache=False)
+
+
+@pytest.mark.parametrize('keyword', KEYWORDS)
+@pytest.mark.parametrize('brand', list(BRAND_FILTERS))
+@pytest.mark.parametrize('status', ['', 'available', 'sold'])
+def test_pages_join_up_to_the_filtered_results(inventory, keyword, brand, status):
+    expected = _expected(inventory, keyword, brand, status)
+    for limit in (1, 4, 100):
+        results, total = _all_pages(inventory, limit, keyword=keyword, brand=brand, status=status)
+        assert total == len(expected)
+        assert [row['sku'] for row in results] == [row['sku'] for row in expected]
+    assert results == [{field: row[field] for field in RESULT_FIELDS} for row in expected]
+
+
+def test_cursor_only_resumes_its_own_query(inventory):
+    cursor = inventory.query(keyword='bag', limit=2)['next_cursor']
+    with pytest.raises(ValueError, match='different search'):
+        inventory.query(keyword='bag', brand='chanel', limit=2, cursor=cursor)
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        inventory.query(keyword='bag', limit=2, cursor=cursor[:-4])
+    with pytest.raises(ValueError, match='Unknown status'):
+        inventory.query(status='lost')
+
+
+def test_cursor_from_before_a_reload_is_rejected(tmp_path):
+    path = tmp_path / 'inventory.xls'
+    _write_workbook(path)
+    inventory = InventoryManager(str(path), use_cache=False)
+    cursor = inventory.query(keyword='mini', limit=2)['next_cursor']
+    assert cursor is not None
+
+    _write_workbook(path, price=150.0)
+    reloaded = InventoryManager(str(path), use_cache=False, previous=inventory)
+    assert reloaded.data_version != inventory.data_version
+    with pytest.raises(ValueError, match='changed since this cursor'):
+        reloaded.query(keyword='mini', limit=2, cursor=cursor)
+    assert reloaded.query(keyword='mini', limit=2)['total'] == inventory.query(keyword='mini')['total']
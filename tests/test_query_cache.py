@@ -0,0 +1,31 @@
+"""The search result cache in front of InventoryManager."""
+
+from query_cache import QueryCache, CachedInventory
+
+
+class _Inventory:
+    data_version = 'v1'
+
+    def __init__(self):
+        self.keyword_searches = 0
+
+    def search_by_skus(self, skus):
+        return {sku: [{'sku': sku}] for sku in skus}
+
+    def search_by_keyword(self, keyword, max_results=10):
+        self.keyword_searches += 1
+        return [{'sku': 'A1', 'product_name': keyword}]
+
+
+def test_bulk_sku_lookups_do_not_evict_cached_searches():
+    cache = QueryCache(maxsize=4)
+    inventory = _Inventory()
+    cached = CachedInventory(inventory, cache)
+    cached.search_by_keyword('wallet')
+
+    found = cached.search_by_skus([f'SKU{i}' for i in range(100)])
+    assert found['SKU7'] == [{'sku': 'SKU7'}]
+    assert cache.stats()['size'] == 1
+
+    cached.search_by_keyword('Wallet ')
+    assert inventory.keyword_searches == 1
@@ -0,0 +1,28 @@
+import pytest
+
+web_app = pytest.importorskip('web_app')
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    web_app._response_cache.clear()
+    yield
+    web_app._response_cache.clear()
+
+
+def test_body_of_outgoing_version_is_not_served_under_new_one():
+    def make_old():
+        # A reload finishes while the old body is being built
+        assert web_app._cached(('data', None), 'new', lambda: b'new') == b'new'
+        return b'old'
+
+    assert web_app._cached(('data', None), 'old', make_old) == b'old'
+    assert web_app._cached(('data', None), 'new', lambda: b'rebuilt') in (b'new', b'rebuilt')
+    assert web_app._cached(('data', None), 'new', lambda: b'rebuilt') != b'old'
+
+
+def test_cache_holds_one_version():
+    web_app._cached(('data', None), 'a', lambda: b'a')
+    web_app._cached(('data', 'gzip'), 'a', lambda: b'a.gz')
+    web_app._cached(('data', None), 'b', lambda: b'b')
+    assert set(web_app._response_cache) == {('b', 'data', None)}
@@ -0,0 +1,147 @@
+"""The static page's keyword search against InventoryManager.search_by_keyword.
+
+The page's own script from index.html runs in node on an exported site, so
+both the search index and the page's use of it are checked.
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+import extract_data
+from inventory_manager import InventoryManager, TOKEN_PATTERN
+
+xlwt = pytest.importorskip('xlwt')
+NODE = shutil.which('node')
+pytestmark = pytest.mark.skipif(NODE is None, reason='node is needed to run the page script')
+
+INDEX_HTML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'index.html')
+
+# Runs performSearch() for each keyword with a stub DOM and fetch() reading
+# the site directory; prints the [sku, product_name] pairs found per keyword
+PAGE_HARNESS = r'''
+const fs = require('fs');
+const path = require('path');
+const [indexHtml, site, keywordFile] = process.argv.slice(2);
+const code = fs.readFileSync(indexHtml, 'utf8').split('<script>')[1].split('</script>')[0];
+const elements = {};
+const element = id => elements[id] || (elements[id] = {
+    id, innerHTML: '', value: '', style: {}, appendChild() {}, addEventListener() {},
+});
+global.document = { getElementById: element, createElement: () => ({ style: {}, appendChild() {} }) };
+global.window = {};
+const print = console.log;
+console.log = () => {};
+global.fetch = async url => {
+    const file = path.join(site, url);
+    if (!fs.existsSync(file)) return { ok: false, status: 404 };
+    return { ok: true, status: 200, json: async () => JSON.parse(fs.readFileSync(file, 'utf8')) };
+};
+eval(code + `;(async () => {
+    await loadInventoryData();
+    const found = {};
+    for (const keyword of JSON.parse(fs.readFileSync(keywordFile, 'utf8'))) {
+        element('search-input').value = keyword;
+        currentResults = [];
+        await performSearch();
+        found[keyword] = currentResults.map(item => [item.sku, item.product_name]);
+    }
+    print(JSON.stringify(found));
+})()`);
+'''
+
+BRANDS = {
+    'Chanel': ['Classic Flap Bag', 'Mini-Wallet / Black', '2.55 Reissue', 'Boy Bag 25cm'],
+    'Gucci': ['GG Marmont Flap', 'Dionysus Mini', 'Jackie 1961 Bag', 'Marmont-Mini Bag'],
+    'Louis Vuitton': ['Épi Speedy 30', 'Neverfull MM', 'Pochette Métis', 'Speedy Bandoulière 25'],
+    'Hermès': ['Birkin 30 Étoupe', 'Kelly 28', 'Évelyne PM', '𝐁irkin Ｓpecial'],
+}
+
+
+def _write_workbook(path):
+    """One sheet per brand with text and numeric SKUs and a numeric name."""
+    workbook = xlwt.Workbook()
+    sku = 1000
+    for brand, names in BRANDS.items():
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+            sheet.write(0, column, header)
+        for row, name in enumerate(names + names[:2], start=1):
+            sku += 7
+            sheet.write(row, 0, sku if row % 2 else f'{brand[:2].upper()}-{sku}')
+            sheet.write(row, 1, name)
+            sheet.write(row, 2, 100.0 * row)
+        sheet.write(len(names) + 3, 0, sku + 1)
+        sheet.write(len(names) + 3, 1, 2550)
+    workbook.save(str(path))
+
+
+def _sample_keywords(texts, count=40, seed=0):
+    """Keywords exercising the index: words, parts of words, SKUs, phrases and separators."""
+    rng = random.Random(seed)
+    keywords = {'a', '1', '-', ' / ', 'nan', 'zzzz-no-match', 'bag', ' bag', 'flap ', 'mini-', '-mini b',
+                'speedy 3', 'épi', 'étoupe', '𝐁irkin', 'ｓpecial', 'ch-', '2.55', '255'}
+    for _ in range(count):
+        text = rng.choice(texts)
+        words = TOKEN_PATTERN.findall(text) or ['x']
+        word = rng.choice(words)
+        keywords.update({text, text.upper(), text[:2], word, word[1:4], word[-3:], word.title()})
+        space = text.find(' ')
+        if space > 0:
+            keywords.update({text[max(space - 3, 0):space + 3], text[space:], text[:space + 1]})
+    return sorted(keywords)
+
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    root = tmp_path_factory.mktemp('site')
+    _write_workbook(root / 'inventory.xls')
+    inventory = InventoryManager(str(root / 'inventory.xls'), use_cache=False)
+    extract_data.write_sharded(inventory, str(root))
+    return inventory, root
+
+
+def _page_results(root, keywords):
+    keyword_file = root / 'keywords.json'
+    keyword_file.write_text(json.dumps(keywords), encoding='utf-8')
+    harness = root / 'harness.js'
+    harness.write_text(PAGE_HARNESS, encoding='utf-8')
+    output = subprocess.run([NODE, str(harness), INDEX_HTML, str(root), str(keyword_file)],
+                            capture_output=True, text=True, check=True, timeout=60).stdout
+    return json.loads(output)
+
+
+def test_page_search_matches_inventory_manager(site):
+    inventory, root = site
+    total = inventory.get_inventory_summary()['total_items']
+    texts = [name for names in BRANDS.values() for name in names]
+    texts += [str(item['sku']) for brand in BRANDS for item in inventory.search_by_brand(brand)]
+    keywords = _sample_keywords(texts)
+
+    found = _page_results(root, keywords)
+    mismatches = []
+    for keyword in keywords:
+        expected = [[str(item['sku']), str(item['product_name'])]
+                    for item in inventory.search_by_keyword(keyword, max_results=total)]
+        page = [[str(sku), str(name)] for sku, name in found[keyword]]
+        if page != expected:
+            mismatches.append((keyword, page, expected))
+    assert not mismatches
+
+
+def test_page_without_manifest_searches_the_single_file(site, tmp_path):
+    inventory, _ = site
+    count = extract_data.write_inventory_json(inventory, str(tmp_path / extract_data.LEGACY_FILE))
+    total = inventory.get_inventory_summary()['total_items']
+    assert count == total
+
+    keywords = ['bag', 'mini-', '2550', 'zzzz-no-match']
+    found = _page_results(tmp_path, keywords)
+    for keyword in keywords:
+        expected = {(str(item['sku']), str(item['product_name']))
+                    for item in inventory.search_by_keyword(keyword, max_results=total)}
+        assert {(str(sku), str(name)) for sku, name in found[keyword]} == expected
@@ -0,0 +1,58 @@
+"""Which sheets a reload reuses, and the fallback to parsing every sheet."""
+
+import pandas as pd
+import pytest
+
+import inventory_manager
+from inventory_manager import InventoryManager
+
+xlwt = pytest.importorskip('xlwt')
+
+
+def _write_workbook(path, gucci_cost=1.0, gucci_name='Gucci bag'):
+    workbook = xlwt.Workbook()
+    for brand, name, cost in (('Chanel', 'Chanel bag', 10.0), ('Gucci', gucci_name, gucci_cost)):
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+            sheet.write(0, column, header)
+        sheet.write(1, 0, f'{brand[:2].upper()}01')
+        sheet.write(1, 1, name)
+        sheet.write(1, 2, cost)
+    workbook.save(str(path))
+
+
+def _reload(tmp_path, **changes):
+    path = tmp_path / 'inventory.xls'
+    _write_workbook(path)
+    inventory = InventoryManager(str(path), use_cache=False)
+    _write_workbook(path, **changes)
+    return InventoryManager(str(path), use_cache=False, previous=inventory)
+
+
+def test_numeric_edit_reuses_the_other_sheets(tmp_path):
+    reloaded = _reload(tmp_path, gucci_cost=2.0)
+    assert reloaded.load_timings['reused_sheets'] == 1
+    assert reloaded.search_by_sku('GU01')['cost'] == '$2.00'
+
+
+def test_new_string_changes_every_sheet(tmp_path):
+    reloaded = _reload(tmp_path, gucci_name='Gucci tote')
+    assert reloaded.load_timings['reused_sheets'] == 0
+    assert reloaded.search_by_sku('GU01')['product_name'] == 'Gucci tote'
+
+
+def test_without_xlrd_sheet_offsets_every_sheet_is_parsed(tmp_path, monkeypatch):
+    monkeypatch.setattr(inventory_manager, '_XLRD_LAYOUT_ATTRS',
+                        inventory_manager._XLRD_LAYOUT_ATTRS + ('_no_such_attribute',))
+    reloaded = _reload(tmp_path, gucci_cost=2.0)
+    assert reloaded.sheet_fingerprints == {}
+    assert reloaded.load_timings['reused_sheets'] == 0
+    assert reloaded.search_by_sku('GU01')['cost'] == '$2.00'
+
+
+def test_xlsx_workbooks_are_not_fingerprinted(tmp_path):
+    pytest.importorskip('openpyxl')
+    path = tmp_path / 'inventory.xlsx'
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame({'SKU': ['CH01'], 'Bag Name': ['Chanel bag']}).to_excel(writer, sheet_name='Chanel', index=False)
+    assert inventory_manager._sheet_fingerprints(inventory_manager._open_workbook(str(path))) == {}
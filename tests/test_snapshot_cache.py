@@ -0,0 +1,75 @@
+"""Writing snapshot entries: temporary directories and concurrent writers."""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import snapshot_cache
+
+pytest.importorskip('pyarrow')
+
+
+def _key(tmp_path):
+    workbook = tmp_path / 'inventory.xls'
+    workbook.write_bytes(b'workbook')
+    return snapshot_cache.find_snapshot(str(workbook), str(tmp_path / 'cache'))[1]
+
+
+def _data():
+    return pd.DataFrame({'SKU': ['CH01', 'GU01'], 'Cost': [1.0, 2.0]})
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def test_failed_write_removes_its_temporary_directory(tmp_path):
+    key = _key(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    with pytest.raises(Exception):
+        snapshot_cache.save_snapshot(key, _data(), {'Broken': object()}, cache_dir)
+    assert os.listdir(cache_dir) == []
+
+
+def test_abandoned_temporary_directories_are_pruned(tmp_path):
+    key = _key(tmp_path)
+    cache_dir = tmp_path / 'cache'
+    abandoned = cache_dir / f'0123456789abcdef.tmp{_dead_pid()}'
+    in_progress = cache_dir / f'fedcba9876543210.tmp{os.getppid()}'
+    abandoned.mkdir(parents=True)
+    in_progress.mkdir()
+
+    entry_dir, _ = snapshot_cache.find_snapshot(str(tmp_path / 'inventory.xls'), str(cache_dir))
+    assert entry_dir is None
+    assert not abandoned.exists()
+    assert in_progress.exists()
+
+    os.utime(in_progress, (0, 0))
+    snapshot_cache.save_snapshot(key, _data(), {}, str(cache_dir))
+    assert sorted(os.listdir(cache_dir)) == [key['sha256'][:16]]
+
+
+def test_losing_the_rename_to_another_writer_is_not_an_error(tmp_path, monkeypatch):
+    key = _key(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    replace = os.replace
+
+    def other_writer_first(src, dst):
+        if not os.path.isdir(src):
+            return replace(src, dst)
+        # Another writer's entry lands between the rmtree and the rename
+        shutil.copytree(src, dst)
+        raise OSError(39, 'Directory not empty')
+
+    monkeypatch.setattr(os, 'replace', other_writer_first)
+    entry_dir = snapshot_cache.save_snapshot(key, _data(), {'Chanel': _data()}, cache_dir)
+
+    assert os.listdir(cache_dir) == [os.path.basename(entry_dir)]
+    data, sheets, _ = snapshot_cache.load_snapshot(entry_dir)
+    assert data['SKU'].tolist() == ['CH01', 'GU01']
@@ -0,0 +1,104 @@
+"""Hot reloads of an inventory that was started from a snapshot."""
+
+from datetime import datetime
+
+import pytest
+
+from inventory_manager import InventoryManager
+
+xlwt = pytest.importorskip('xlwt')
+
+
+def _write_workbook(path, gucci_cost):
+    """Two brand sheets mixing numeric and text SKUs; only Gucci depends on gucci_cost."""
+    workbook = xlwt.Workbook()
+    for brand, numeric_sku, cost in (('Chanel', 4242, 10.0), ('Gucci', 12345, gucci_cost)):
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost']):
+            sheet.write(0, column, header)
+        sheet.write(1, 0, numeric_sku)
+        sheet.write(1, 1, f'{brand} bag')
+        sheet.write(1, 2, cost)
+        sheet.write(2, 0, f'{brand[:2].upper()}01')
+        sheet.write(2, 1, f'{brand} wallet')
+        sheet.write(2, 2, 5.0)
+    workbook.save(str(path))
+
+
+def test_reload_after_snapshot_start_keeps_numeric_skus(tmp_path):
+    workbook = tmp_path / 'inventory.xls'
+    cache_dir = str(tmp_path / 'cache')
+    _write_workbook(workbook, gucci_cost=1.0)
+    InventoryManager(str(workbook), cache_dir=cache_dir)
+    warm = InventoryManager(str(workbook), cache_dir=cache_dir)
+    assert warm.cache_status == 'hit'
+
+    # Only the Gucci sheet changes, so the Chanel sheet is reused from the snapshot
+    _write_workbook(workbook, gucci_cost=2.0)
+    reloaded = InventoryManager(str(workbook), cache_dir=cache_dir, previous=warm)
+    assert reloaded.load_timings['reused_sheets'] == 1
+
+    assert reloaded.search_by_sku('4242')['brand'] == 'Chanel'
+    assert reloaded.search_by_sku('12345')['cost'] == '$2.00'
+    assert reloaded.search_by_sku('CH01') is not None
+
+
+def test_snapshot_of_older_format_is_replaced(tmp_path, monkeypatch):
+    import snapshot_cache
+
+    workbook = tmp_path / 'inventory.xls'
+    cache_dir = str(tmp_path / 'cache')
+    _write_workbook(workbook, gucci_cost=1.0)
+    monkeypatch.setattr(snapshot_cache, 'SNAPSHOT_FORMAT', snapshot_cache.SNAPSHOT_FORMAT - 1)
+    InventoryManager(str(workbook), cache_dir=cache_dir)
+    monkeypatch.undo()
+
+    assert InventoryManager(str(workbook), cache_dir=cache_dir).cache_status == 'miss'
+    assert InventoryManager(str(workbook), cache_dir=cache_dir).cache_status == 'hit'
+
+
+def _write_sold_workbook(path):
+    """Brand sheets with repeated prices, a missing cost and some sale dates."""
+    date_style = xlwt.easyxf(num_format_str='YYYY-MM-DD')
+    workbook = xlwt.Workbook()
+    for brand in ('Chanel', 'Gucci', 'Hermès'):
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost', 'Sold Date']):
+            sheet.write(0, column, header)
+        for row in range(1, 9):
+            sheet.write(row, 0, f'{brand[:2].upper()}{row:02d}')
+            sheet.write(row, 1, f'{brand} {"mini flap" if row % 2 else "wallet"} {row}')
+            if row != 3:
+                sheet.write(row, 2, 1000.0 * (row % 3))
+            if row % 4 == 0:
+                sheet.write(row, 3, datetime(2024, 1, row), date_style)
+    workbook.save(str(path))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_warm_start_restores_the_derived_structures(tmp_path, monkeypatch, compact):
+    import inventory_manager
+
+    workbook = tmp_path / 'inventory.xls'
+    cache_dir = str(tmp_path / 'cache')
+    _write_sold_workbook(workbook)
+    cold = InventoryManager(str(workbook), cache_dir=cache_dir, compact=compact)
+
+    def not_rebuilt(*args):
+        raise AssertionError('rebuilt instead of restored from the snapshot')
+
+    monkeypatch.setattr(inventory_manager, '_build_trigram_index', not_rebuilt)
+    monkeypatch.setattr(InventoryManager, '_format_currency_column', not_rebuilt)
+    warm = InventoryManager(str(workbook), cache_dir=cache_dir, compact=compact)
+    assert warm.cache_status == 'hit'
+    if not compact:
+        # Sheets are only read from the snapshot when a reload reuses them
+        assert warm.all_sheets_data.loaded() == {}
+
+    for keyword in ('', 'mini', 'wallet 4', 'ch0', 'è', 'zz'):
+        assert warm.search_by_keyword(keyword, max_results=50) == cold.search_by_keyword(keyword, max_results=50)
+    for prefix in ('', 'c', 'gu', 'w', 'he'):
+        assert warm.suggest(prefix) == cold.suggest(prefix)
+    assert warm.search_by_brand('gucci') == cold.search_by_brand('gucci')
+    assert warm.query(status='sold') == cold.query(status='sold')
+    assert warm.get_inventory_summary() == cold.get_inventory_summary()
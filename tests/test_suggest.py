@@ -0,0 +1,90 @@
+"""InventoryManager.suggest: which completions come back, in which order, and how many."""
+
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from inventory_manager import InventoryManager, MAX_SUGGESTIONS, RESULT_FIELDS, TOKEN_PATTERN
+
+xlwt = pytest.importorskip('xlwt')
+
+KINDS = ['brand', 'name', 'sku']
+
+
+def _write_workbook(path):
+    """Brands, words and SKUs sharing prefixes, with different numbers of sold rows."""
+    date_style = xlwt.easyxf(num_format_str='YYYY-MM-DD')
+    workbook = xlwt.Workbook()
+    rows = {
+        'Bottega': ['Bottega Cassette', 'Cassette Mini', 'Bottega Pouch', 'Bottega Pouch'],
+        'Balenciaga': ['City Bag', 'Cabas Bag', 'Le Cagole', 'Bottega Knot Bag', 'City Bag'],
+        'Celine': ['Belt Bag', 'Box Bag', 'Cabas', 'Classic Box'],
+        'Burberry': ['Bucket Bag', 'Banner', 'Baby Belt', 'Bum Bag', 'Briefcase', 'Bowling Bag'],
+    }
+    for brand, names in rows.items():
+        sheet = workbook.add_sheet(brand)
+        for column, header in enumerate(['SKU', 'Bag Name', 'Bag Cost', 'Sold Date']):
+            sheet.write(0, column, header)
+        for row, name in enumerate(names, start=1):
+            sheet.write(row, 0, f'{brand[:2].upper()}{row}' if row != 2 else f'BAG{len(name)}')
+            sheet.write(row, 1, name)
+            sheet.write(row, 2, 10.0)
+            if (row + len(brand)) % 3 == 0:
+                sheet.write(row, 3, datetime(2024, 6, row), date_style)
+    workbook.save(str(path))
+
+
+@pytest.fixture(scope='module')
+def inventory(tmp_path_factory):
+    path = tmp_path_factory.mktemp('suggest') / 'inventory.xls'
+    _write_workbook(path)
+    return InventoryManager(str(path), use_cache=False)
+
+
+def _completions(inventory):
+    """Every completion with its counts, worked out row by row: {(key, kind): [text, rows, available]}."""
+    completions = defaultdict(lambda: [None, 0, 0])
+    for chunk in inventory.export_rows():
+        for row in chunk:
+            item = dict(zip(RESULT_FIELDS, row))
+            keys = [(item['brand'].strip().lower(), 'brand', item['brand'].strip()),
+                    (item['sku'].lower(), 'sku', item['sku'])]
+            keys += [(word, 'name', word) for word in set(TOKEN_PATTERN.findall(item['product_name'].lower()))]
+            for key, kind, text in keys:
+                completion = completions[key, kind]
+                if completion[0] is None:
+                    completion[0] = text
+                completion[1] += 1
+                completion[2] += item['status'] == 'AVAILABLE'
+    return completions
+
+
+def _expected(inventory, prefix, limit):
+    """Most available first, then most rows, then by key, then brand before name before SKU."""
+    found = [(key, kind, *values) for (key, kind), values in _completions(inventory).items()
+             if key.startswith(prefix)]
+    found.sort(key=lambda c: (-c[4], -c[3], c[0], KINDS.index(c[1])))
+    return [{'text': text, 'kind': kind, 'count': count, 'available': available}
+            for _, kind, text, count, available in found[:limit]]
+
+
+@pytest.mark.parametrize('prefix', ['b', 'B', 'ba', 'bo', 'bag', 'bottega', 'c', 'ca', 'cab', 'ce', 'le', 'x'])
+def test_suggestions_are_ranked_by_availability_then_rows(inventory, prefix):
+    for limit in (1, 3, MAX_SUGGESTIONS):
+        assert inventory.suggest(prefix, limit=limit) == _expected(inventory, prefix.lower(), limit)
+
+
+def test_limit_is_capped_and_prefixes_are_trimmed(inventory):
+    assert inventory.suggest('', limit=5) == []
+    assert inventory.suggest('b', limit=0) == []
+    assert inventory.suggest('  Bo ', limit=4) == inventory.suggest('bo', limit=4)
+    assert len(_expected(inventory, 'b', 100)) > MAX_SUGGESTIONS
+    assert inventory.suggest('b', limit=100) == _expected(inventory, 'b', MAX_SUGGESTIONS)
+
+
+def test_short_prefixes_are_ranked_once(inventory):
+    assert inventory.suggest('c', limit=2) == inventory.suggest('c', limit=MAX_SUGGESTIONS)[:2]
+    assert 'c' in inventory._suggest_memo
+    assert inventory.suggest('cab', limit=2) == inventory.suggest('cab', limit=MAX_SUGGESTIONS)[:2]
+    assert 'cab' not in inventory._suggest_memo
@@ -3,14 +3,76 @@
 Web-based Inventory Management System
 """
 
-from flask import Flask, render_template_string, request, jsonify
-from inventory_manager import InventoryManager
+from flask import Flask, Response, g, render_template_string, request, jsonify
+from werkzeug.http import is_resource_modified
+from inventory_manager import InventoryManager, RESULT_FIELDS
+from inventory_watcher import InventoryWatcher
+from query_cache import QueryCache, CachedInventory
+from metrics import Metrics, InstrumentedInventory
+from profiling import Profile, SlowRequestSampler, phase
+from datetime import datetime, timezone
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import itertools
 import json
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
-# Global inventory manager
+# Global inventory manager; replaced as a whole by the watcher on reload, so
+# each request reads it once and works with that snapshot
 inventory = None
+watcher = None
+
+# Memoized search results, shared by the inventories that replace each other
+query_cache = QueryCache()
+
+# Request and search latencies, exposed on /metrics
+metrics = Metrics()
+
+# Opt-in profiling: with profile_requests, a request carrying the
+# X-Profile header or a profile parameter gets its timing breakdown in a
+# Server-Timing header ('cprofile' also dumps cProfile data into
+# profile_dir); with slow_sampler, the slowest requests are kept for
+# /api/profiles
+PROFILE_HEADER = 'X-Profile'
+profile_requests = False
+profile_dir = 'profiles'
+slow_sampler = None
+_profile_ids = itertools.count(1)
+
+# Results per /api/search page: the default and the most a client may ask for
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# SKUs accepted by one /api/skus request, and resolved per streamed chunk
+MAX_BULK_SKUS = 10000
+SKU_BATCH_SIZE = 256
+
+# /api/export formats and their content types
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+# Clients may keep API responses but must revalidate them, since the data
+# changes whenever the workbook does
+API_CACHE_CONTROL = 'no-cache'
+
+# Encoded bodies of the routes without parameters, for one data version at
+# a time: {(data_version, route, content_encoding): body}
+_response_cache = {}
+_response_cache_lock = threading.Lock()
 
 # HTML Template
 HTML_TEMPLATE = '''
@@ -189,7 +251,8 @@ HTML_TEMPLATE = '''
             <div class="search-form">
                 <div class="form-group">
                     <label for="search-input">Search by SKU or Keyword:</label>
-                    <input type="text" id="search-input" placeholder="Enter SKU or product name...">
+                    <input type="text" id="search-input" list="suggestions" autocomplete="off" placeholder="Enter SKU or product name...">
+                    <datalist id="suggestions"></datalist>
                 </div>
                 <div class="form-group">
                     <label for="brand-select">Filter by Brand:</label>
@@ -267,6 +330,75 @@ HTML_TEMPLATE = '''
             }
         }
 
+        function renderItem(item) {
+            return `
+                <div class="item-card">
+                    <div class="item-header">
+                        <span class="sku">${item.sku}</span>
+                        <span class="status ${item.status.toLowerCase()}">${item.status}</span>
+                    </div>
+                    <h4>${item.product_name}</h4>
+                    <div class="item-details">
+                        <div class="detail-item">
+                            <span class="detail-label">Brand:</span>
+                            <span>${item.brand}</span>
+                        </div>
+                        <div class="detail-item">
+                            <span class="detail-label">Cost:</span>
+                            <span>${item.cost}</span>
+                        </div>
+                        <div class="detail-item">
+                            <span class="detail-label">Price:</span>
+                            <span>${item.price}</span>
+                        </div>
+                        <div class="detail-item">
+                            <span class="detail-label">Gross Profit:</span>
+                            <span>${item.gross_profit}</span>
+                        </div>
+                        ${item.sold_date ? `
+                        <div class="detail-item">
+                            <span class="detail-label">Sold Date:</span>
+                            <span>${item.sold_date}</span>
+                        </div>
+                        ` : ''}
+                        ${item.entrupy_cost !== 'N/A' ? `
+                        <div class="detail-item">
+                            <span class="detail-label">Entrupy Cost:</span>
+                            <span>${item.entrupy_cost}</span>
+                        </div>
+                        ` : ''}
+                    </div>
+                </div>
+            `;
+        }
+
+        // Parameters of the current search, reused with a cursor by "Load more"
+        let searchParams = null;
+
+        async function loadMore(cursor) {
+            const button = document.getElementById('load-more');
+            button.disabled = true;
+            try {
+                const params = new URLSearchParams(searchParams);
+                params.append('cursor', cursor);
+                const response = await fetch('/api/search?' + params.toString());
+                const page = await response.json();
+                button.remove();
+                document.getElementById('result-list').insertAdjacentHTML('beforeend', page.results.map(renderItem).join(''));
+                showLoadMore(page.next_cursor);
+            } catch (error) {
+                button.disabled = false;
+                console.error('Search error:', error);
+            }
+        }
+
+        function showLoadMore(cursor) {
+            if (cursor) {
+                document.getElementById('results').insertAdjacentHTML('beforeend',
+                    `<button id="load-more" onclick="loadMore('${cursor}')">Load more</button>`);
+            }
+        }
+
         async function performSearch() {
             const searchInput = document.getElementById('search-input').value.trim();
             const brandFilter = document.getElementById('brand-select').value;
@@ -290,59 +422,20 @@ HTML_TEMPLATE = '''
                     params.append('brand', brandFilter);
                 }
                 
-                const response = await fetch(url + params.toString());
-                const results = await response.json();
+                searchParams = params.toString();
+                const response = await fetch(url + searchParams);
+                const page = await response.json();
                 
-                if (results.length === 0) {
+                if (page.total === 0) {
                     resultsDiv.innerHTML = '<p>No items found matching your search criteria.</p>';
                     return;
                 }
 
-                let html = `<h3>Found ${results.length} item(s):</h3>`;
-                
-                results.forEach(item => {
-                    html += `
-                        <div class="item-card">
-                            <div class="item-header">
-                                <span class="sku">${item.sku}</span>
-                                <span class="status ${item.status.toLowerCase()}">${item.status}</span>
-                            </div>
-                            <h4>${item.product_name}</h4>
-                            <div class="item-details">
-                                <div class="detail-item">
-                                    <span class="detail-label">Brand:</span>
-                                    <span>${item.brand}</span>
-                                </div>
-                                <div class="detail-item">
-                                    <span class="detail-label">Cost:</span>
-                                    <span>${item.cost}</span>
-                                </div>
-                                <div class="detail-item">
-                                    <span class="detail-label">Price:</span>
-                                    <span>${item.price}</span>
-                                </div>
-                                <div class="detail-item">
-                                    <span class="detail-label">Gross Profit:</span>
-                                    <span>${item.gross_profit}</span>
-                                </div>
-                                ${item.sold_date ? `
-                                <div class="detail-item">
-                                    <span class="detail-label">Sold Date:</span>
-                                    <span>${item.sold_date}</span>
-                                </div>
-                                ` : ''}
-                                ${item.entrupy_cost !== 'N/A' ? `
-                                <div class="detail-item">
-                                    <span class="detail-label">Entrupy Cost:</span>
-                                    <span>${item.entrupy_cost}</span>
-                                </div>
-                                ` : ''}
-                            </div>
-                        </div>
-                    `;
-                });
+                let html = `<h3>Found ${page.total} item(s):</h3>`;
+                html += `<div id="result-list">${page.results.map(renderItem).join('')}</div>`;
                 
                 resultsDiv.innerHTML = html;
+                showLoadMore(page.next_cursor);
                 
             } catch (error) {
                 resultsDiv.innerHTML = '<p class="error">Error searching inventory. Please try again.</p>';
@@ -350,6 +443,29 @@ HTML_TEMPLATE = '''
             }
         }
 
+        // Typeahead: completions of the text typed so far, on every keystroke
+        let suggestRequest = 0;
+        document.getElementById('search-input').addEventListener('input', async function(e) {
+            const prefix = e.target.value.trim();
+            const request = ++suggestRequest;
+            const list = document.getElementById('suggestions');
+            if (!prefix) {
+                list.innerHTML = '';
+                return;
+            }
+            try {
+                const response = await fetch('/api/suggest?' + new URLSearchParams({prefix: prefix}));
+                const suggestions = await response.json();
+                // Answers to earlier keystrokes may arrive late
+                if (request === suggestRequest) {
+                    list.innerHTML = suggestions.map(s =>
+                        `<option value="${s.text}">${s.kind}: ${s.available} of ${s.count} available</option>`).join('');
+                }
+            } catch (error) {
+                console.error('Suggest error:', error);
+            }
+        });
+
         // Allow search on Enter key
         document.getElementById('search-input').addEventListener('keypress', function(e) {
             if (e.key === 'Enter') {
@@ -361,75 +477,419 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# The page has no per-request content, so it is rendered once
+with app.app_context():
+    INDEX_PAGE = render_template_string(HTML_TEMPLATE).encode('utf-8')
+INDEX_ETAG = hashlib.sha1(INDEX_PAGE).hexdigest()[:16]
+
+def _cached(key, version, make):
+    """make() computed once per data version and key.
+    
+    version is the one of the inventory make() reads, so a body built from
+    an outgoing inventory during a reload is only ever served under its
+    own version, never under the new one.
+    """
+    key = (version,) + key
+    with _response_cache_lock:
+        value = _response_cache.get(key)
+    if value is None:
+        value = make()
+        with _response_cache_lock:
+            if any(cached[0] != version for cached in _response_cache):
+                _response_cache.clear()
+            _response_cache[key] = value
+    return value
+
+def _negotiate_encoding():
+    """Best compression the client accepts: brotli (if installed), gzip or None."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def _compress(body, encoding):
+    with phase('compress'):
+        if encoding == 'br':
+            return brotli.compress(body, quality=5)
+        return gzip.compress(body, compresslevel=6)
+
+def _versioned_response(make_body, etag, last_modified=None, mimetype='application/json',
+                        cache_key=None, version=None):
+    """Response with validators for a body that only changes with etag.
+
+    A client already holding the current body gets 304 without make_body
+    being called. Bodies of COMPRESS_MIN_BYTES or more are compressed as
+    negotiated; with cache_key, the body and its compressed forms are kept
+    until the data version changes.
+    """
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        if cache_key is not None:
+            body = _cached((cache_key, None), version, make_body)
+        else:
+            body = make_body()
+        encoding = _negotiate_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+        if encoding is not None:
+            if cache_key is not None:
+                body = _cached((cache_key, encoding), version, lambda: _compress(body, encoding))
+            else:
+                body = _compress(body, encoding)
+        response = Response(body, mimetype=mimetype)
+        if encoding is not None:
+            response.content_encoding = encoding
+    
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = API_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _data_response(inv, make_payload, cache_key=None):
+    """JSON response for data that only changes with the inventory's data version."""
+    def make_body():
+        payload = make_payload()
+        with phase('serialize'):
+            return jsonify(payload).get_data()
+    
+    last_modified = datetime.fromtimestamp(inv.source_mtime, timezone.utc)
+    return _versioned_response(make_body, inv.data_version, last_modified,
+                               cache_key=cache_key, version=inv.data_version)
+
+def _route_label():
+    # The route pattern rather than the path, so metrics have one series per route
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _error_response(e, status=500):
+    """JSON error response for an exception, counted in the metrics."""
+    metrics.observe_error(_route_label(), e)
+    return jsonify({'error': str(e)}), status
+
+def _requested_profile():
+    """'timing' or 'cprofile' if the request asks to be profiled, else None."""
+    value = request.headers.get(PROFILE_HEADER) or request.args.get('profile')
+    if not value:
+        return None
+    return 'cprofile' if value.strip().lower() == 'cprofile' else 'timing'
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    
+    # Profiling is off unless the server was started with it
+    g.profile = None
+    g.profile_requested = _requested_profile() if profile_requests else None
+    if g.profile_requested is not None:
+        g.profile = Profile(cprofile=g.profile_requested == 'cprofile')
+    elif slow_sampler is not None:
+        g.profile = slow_sampler.profile()
+    if g.profile is not None:
+        g.profile.start()
+
+@app.after_request
+def _record_request(response):
+    # Streamed bodies are timed until their response starts
+    metrics.observe_request(_route_label(), response.status_code, time.perf_counter() - g.request_started)
+    
+    profile = g.get('profile')
+    if profile is not None:
+        profile.stop()
+        if g.profile_requested is not None:
+            response.headers['Server-Timing'] = profile.server_timing()
+            if profile.profiler is not None:
+                os.makedirs(profile_dir, exist_ok=True)
+                path = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_profile_ids)}.prof")
+                profile.dump(path)
+                response.headers['X-Profile-Dump'] = path
+        if slow_sampler is not None:
+            slow_sampler.observe(profile, request.full_path)
+    return response
+
+@app.teardown_request
+def _stop_profile(error):
+    # A request that failed before after_request must not leave its profile active
+    profile = g.get('profile')
+    if profile is not None and profile.total is None:
+        profile.stop()
+
 @app.route('/')
 def index():
     """Main page."""
-    return render_template_string(HTML_TEMPLATE)
+    return _versioned_response(lambda: INDEX_PAGE, INDEX_ETAG, mimetype='text/html',
+                               cache_key='index', version=inventory.data_version)
 
 @app.route('/api/summary')
 def api_summary():
     """Get inventory summary."""
     try:
-        summary = inventory.get_inventory_summary()
-        return jsonify(summary)
+        inv = inventory
+        return _data_response(inv, inv.get_inventory_summary, cache_key='summary')
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
 
 @app.route('/api/brands')
 def api_brands():
     """Get all brands."""
     try:
-        brands = inventory.get_all_brands()
-        return jsonify(brands)
+        inv = inventory
+        return _data_response(inv, inv.get_all_brands, cache_key='brands')
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
+
+def page_size(value):
+    """The limit parameter of /api/search as a page size; raises ValueError if it is not a number."""
+    if not value:
+        return PAGE_SIZE
+    return min(max(int(value), 1), MAX_PAGE_SIZE)
+
+def search_inventory(inv, query, brand, status='', limit=PAGE_SIZE, cursor=None):
+    """Page of /api/search for stripped parameters: {'results', 'total', 'next_cursor'}."""
+    if not (query or brand or status):
+        return {'results': [], 'total': 0, 'next_cursor': None}
+    
+    if query and not (brand or status or cursor):
+        # Check if it's an exact SKU first; a SKU on several rows returns them all
+        sku_results = inv.search_by_skus([query])[query]
+        if sku_results:
+            return {'results': sku_results, 'total': len(sku_results), 'next_cursor': None}
+    
+    return inv.query(query, brand, status, limit, cursor)
+
+def inventory_status(inv, watcher):
+    """Payload of /api/status."""
+    if watcher is not None:
+        status = watcher.status()
+    else:
+        status = {
+            'data_version': inv.data_version,
+            'loaded_at': inv.loaded_at,
+            'total_items': len(inv.data),
+            'reloads': 0,
+        }
+    if isinstance(inv, CachedInventory):
+        status['query_cache'] = inv.cache.stats()
+    return status
+
+@app.route('/api/suggest')
+def api_suggest():
+    """Typeahead completions of a prefix."""
+    try:
+        inv = inventory
+        prefix = request.args.get('prefix', '')
+        limit = int(request.args.get('limit') or 8)
+        return _data_response(inv, lambda: inv.suggest(prefix, limit))
+    except ValueError as e:
+        return _error_response(e, 400)
+    except Exception as e:
+        return _error_response(e)
 
 @app.route('/api/search')
 def api_search():
     """Search inventory."""
     try:
+        inv = inventory
         query = request.args.get('query', '').strip()
         brand = request.args.get('brand', '').strip()
+        status = request.args.get('status', '').strip()
+        limit = page_size(request.args.get('limit', '').strip())
+        cursor = request.args.get('cursor', '').strip() or None
+        return _data_response(inv, lambda: search_inventory(inv, query, brand, status, limit, cursor))
         
-        results = []
-        
-        if query and brand:
-            # Search by keyword and filter by brand
-            keyword_results = inventory.search_by_keyword(query, 50)
-            results = [item for item in keyword_results if item['brand'].lower() == brand.lower()]
-        elif query:
-            # Check if it's an exact SKU first
-            sku_result = inventory.search_by_sku(query)
-            if sku_result:
-                results = [sku_result]
-            else:
-                # Search by keyword
-                results = inventory.search_by_keyword(query, 20)
-        elif brand:
-            # Search by brand only
-            results = inventory.search_by_brand(brand)[:20]  # Limit to 20 results
-        
-        return jsonify(results)
-        
+    except ValueError as e:
+        # Bad limit, status or cursor
+        return _error_response(e, 400)
+    except Exception as e:
+        return _error_response(e)
+
+def parse_skus(body, content_type):
+    """SKUs of a /api/skus request body: a JSON list, {"skus": [...]}, or one SKU per line.
+    
+    Raises ValueError for a malformed, empty or oversized list.
+    """
+    if 'json' in content_type:
+        payload = json.loads(body)
+        if isinstance(payload, dict):
+            payload = payload.get('skus')
+        if not isinstance(payload, list) or not all(isinstance(sku, (str, int)) for sku in payload):
+            raise ValueError('Expected a JSON list of SKUs or {"skus": [...]}')
+        skus = [str(sku) for sku in payload]
+    else:
+        skus = body.decode('utf-8').splitlines()
+    
+    skus = [sku.strip() for sku in skus if sku.strip()]
+    if not skus:
+        raise ValueError("No SKUs given")
+    if len(skus) > MAX_BULK_SKUS:
+        raise ValueError(f"At most {MAX_BULK_SKUS} SKUs per request")
+    return skus
+
+def sku_lines(inv, skus):
+    """Encoded NDJSON lines of /api/skus, one chunk per SKU_BATCH_SIZE SKUs.
+    
+    Every SKU gets a line in input order: {"sku", "found", "items"}, with
+    items empty for a miss and holding every row of a duplicated SKU.
+    """
+    for start in range(0, len(skus), SKU_BATCH_SIZE):
+        batch = skus[start:start + SKU_BATCH_SIZE]
+        found = inv.search_by_skus(batch)
+        yield ''.join(
+            json.dumps({'sku': sku, 'found': bool(found[sku]), 'items': found[sku]},
+                       sort_keys=True, separators=(',', ':')) + '\n'
+            for sku in batch
+        ).encode('utf-8')
+
+@app.route('/api/skus', methods=['POST'])
+def api_skus():
+    """Look up a batch of SKUs, streaming one NDJSON line per SKU."""
+    try:
+        inv = inventory
+        skus = parse_skus(request.get_data(), request.content_type or '')
+    except ValueError as e:
+        return _error_response(e, 400)
+    response = Response(sku_lines(inv, skus), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def export_request(inv, args):
+    """Chunks, columns and format of an /api/export request; raises ValueError for bad parameters."""
+    fmt = args.get('format', 'csv').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; use csv or ndjson")
+    columns = [column.strip() for column in args.get('columns', '').split(',') if column.strip()] or None
+    chunks = inv.export_rows(args.get('brand', '').strip(), args.get('status', '').strip(), columns)
+    return chunks, columns or RESULT_FIELDS, fmt
+
+def export_body(chunks, columns, fmt):
+    """Encoded /api/export body, one piece per chunk of rows."""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        # The header, if there were no rows
+        yield buffer.getvalue().encode('utf-8')
+    else:
+        for rows in chunks:
+            yield ''.join(
+                json.dumps(dict(zip(columns, row)), sort_keys=True, separators=(',', ':')) + '\n'
+                for row in rows
+            ).encode('utf-8')
+
+@app.route('/api/export')
+def api_export():
+    """Stream the inventory, optionally filtered by brand and status, as CSV or NDJSON."""
+    inv = inventory
+    try:
+        chunks, columns, fmt = export_request(inv, request.args)
+    except ValueError as e:
+        return _error_response(e, 400)
+    
+    last_modified = datetime.fromtimestamp(inv.source_mtime, timezone.utc)
+    if not is_resource_modified(request.environ, etag=inv.data_version, last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        response = Response(export_body(chunks, columns, fmt), mimetype=EXPORT_FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename=inventory.{fmt}'
+    response.set_etag(inv.data_version, weak=True)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = API_CACHE_CONTROL
+    return response
+
+@app.route('/api/status')
+def api_status():
+    """Get the loaded data version and reload statistics."""
+    try:
+        response = jsonify(inventory_status(inventory, watcher))
+        response.headers['Cache-Control'] = 'no-store'
+        return response
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error_response(e)
+
+@app.route('/api/profiles')
+def api_profiles():
+    """Profiles of the slowest requests, when slow-request sampling is on."""
+    if slow_sampler is None:
+        return jsonify({'error': 'Slow-request sampling is off; start the server with --profile-slowest'}), 404
+    response = jsonify({**slow_sampler.status(), 'profiles': slow_sampler.entries()})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/metrics')
+def metrics_page():
+    """Request, search and load metrics in the Prometheus text format."""
+    return Response(metrics.render(inventory, watcher), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _serving(loaded):
+    """A loaded InventoryManager wrapped for request handlers: instrumented, then cached."""
+    metrics.observe_load(loaded)
+    return CachedInventory(InstrumentedInventory(loaded, metrics), query_cache)
+
+def _swap_inventory(new_inventory):
+    """Publish a reloaded inventory to request handlers."""
+    global inventory
+    inventory = _serving(new_inventory)
 
 def main():
     """Main function to run the web app."""
-    global inventory
+    global inventory, watcher, query_cache, profile_requests, profile_dir, slow_sampler
+    
+    parser = argparse.ArgumentParser(description="Inventory Management Web App")
+    parser.add_argument('--file', default="/Users/yujunchen/Documents/Copy of Copy of LBP Updated Inventory Management With Cost-4.xls", help='Excel file path')
+    parser.add_argument('--no-cache', action='store_true', help='Parse the workbook even if a snapshot is cached')
+    parser.add_argument('--compact', action='store_true', help='Keep a single compact copy of the data (for large catalogs)')
+    parser.add_argument('--watch-interval', type=float, default=5.0, help='Seconds between checks for a changed workbook (0 disables reloading)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    parser.add_argument('--production', action='store_true',
+                        help='Serve from forked worker processes sharing the loaded data instead of the debug server')
+    parser.add_argument('--workers', type=int, help='Worker processes in production mode (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker process in production mode')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Search results kept in memory (0 disables the cache)')
+    parser.add_argument('--cache-ttl', type=float, default=300.0, help='Seconds a cached search result is kept')
+    parser.add_argument('--profile-requests', action='store_true',
+                        help=f'Profile requests carrying an {PROFILE_HEADER} header or a profile parameter')
+    parser.add_argument('--profile-dir', default='profiles', help='Directory for cProfile dumps of profiled requests')
+    parser.add_argument('--profile-slowest', type=float, metavar='PERCENT',
+                        help='Keep profiles of the slowest PERCENT of requests for /api/profiles')
+    parser.add_argument('--profile-cprofile-rate', type=float, default=0.0, metavar='RATE',
+                        help='Fraction of requests sampled for --profile-slowest that also run under cProfile')
+    args = parser.parse_args()
     
-    file_path = "/Users/yujunchen/Documents/Copy of Copy of LBP Updated Inventory Management With Cost-4.xls"
+    profile_requests = args.profile_requests
+    profile_dir = args.profile_dir
+    if args.profile_slowest:
+        slow_sampler = SlowRequestSampler(args.profile_slowest, cprofile_rate=args.profile_cprofile_rate)
     
     print("Loading inventory data...")
     try:
-        inventory = InventoryManager(file_path)
+        loaded = InventoryManager(args.file, use_cache=not args.no_cache, compact=args.compact)
+        query_cache = QueryCache(args.cache_size, args.cache_ttl)
+        inventory = _serving(loaded)
         print("✅ Data loaded successfully!")
         print(f"📊 Loaded {inventory.get_inventory_summary()['total_items']} items")
+        
+        if args.watch_interval > 0:
+            watcher = InventoryWatcher(loaded, interval=args.watch_interval, on_reload=_swap_inventory)
+            print(f"🔄 Watching {args.file} for changes every {args.watch_interval:g}s")
         print("\n🌐 Starting web server...")
-        print("📱 Open your browser and go to: http://127.0.0.1:5000")
+        print(f"📱 Open your browser and go to: http://{args.host}:{args.port}")
         print("💡 Press Ctrl+C to stop the server")
         
-        app.run(debug=True, host='127.0.0.1', port=5000)
+        if args.production:
+            # The master checks for changes itself and forks new workers
+            # holding the reloaded data; kill -HUP also restarts them
+            from prefork_server import PreforkServer
+            server = PreforkServer(app, host=args.host, port=args.port, workers=args.workers,
+                                   threads=args.threads, poll=watcher.check if watcher else None,
+                                   poll_interval=args.watch_interval)
+            server.serve_forever()
+        else:
+            if watcher is not None:
+                watcher.start()
+            app.run(debug=True, host=args.host, port=args.port)
         
     except Exception as e:
         print(f"❌ Error: {e}")